@@ -0,0 +1,172 @@
+"""
+Token budget for the conversation sent to the API, compacting old turns when it is
+about to be exceeded.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, cast
+
+from anthropic.types.beta import BetaContentBlockParam, BetaMessageParam
+
+# Rough number of characters per token of English text and code
+CHARS_PER_TOKEN = 4
+# Images are billed about width * height / 750 tokens, and scaled down to at most
+# about 1600 tokens
+PIXELS_PER_TOKEN = 750
+MAX_IMAGE_TOKENS = 1600
+
+SCREENSHOT_OMITTED = "[screenshot omitted to save context]"
+THINKING_OMITTED = "[thinking omitted to save context]"
+
+
+def estimate_tokens(message: BetaMessageParam) -> int:
+    """Estimate the number of input tokens of a message."""
+    content = message["content"]
+    if isinstance(content, str):
+        return _text_tokens(content)
+    return sum(_block_tokens(cast(dict[str, Any], block)) for block in content)
+
+
+def _text_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _block_tokens(block: dict[str, Any]) -> int:
+    if block["type"] == "text":
+        return _text_tokens(block["text"])
+    if block["type"] == "image":
+        return _image_tokens(block)
+    if block["type"] == "thinking":
+        return _text_tokens(block.get("thinking") or "")
+    if block["type"] == "tool_use":
+        return _text_tokens(json.dumps(block.get("input", {}))) + 10
+    if block["type"] == "tool_result":
+        content = block.get("content", [])
+        if isinstance(content, str):
+            return _text_tokens(content) + 10
+        return sum(_block_tokens(item) for item in content) + 10
+    return _text_tokens(json.dumps(block, default=str))
+
+
+def _image_tokens(block: dict[str, Any]) -> int:
+    # The size of a PNG is in its header: the 8 byte signature, the length and
+    # type of the IHDR chunk, then the width and height
+    source = block.get("source", {})
+    try:
+        header = base64.b64decode(source.get("data", "")[:32])
+    except (binascii.Error, ValueError):
+        return MAX_IMAGE_TOKENS
+    if len(header) < 24 or header[12:16] != b"IHDR":
+        return MAX_IMAGE_TOKENS
+    width = int.from_bytes(header[16:20], "big")
+    height = int.from_bytes(header[20:24], "big")
+    return min(width * height // PIXELS_PER_TOKEN + 1, MAX_IMAGE_TOKENS)
+
+
+class ContextBudget:
+    """
+    Keeps the input of each request under `max_tokens` by compacting old turns:
+    screenshots and thinking are dropped and long tool outputs are cut down to
+    their beginning and end.
+
+    Every compaction breaks the prompt cache from the first message it changes, so
+    it only starts once the budget is reached, always works from the oldest turn
+    forward, and goes on until the input is down to `target_ratio` of the budget.
+    The compacted prefix then stays the same, and cached, for many turns. The first
+    message (the task) and the `keep_recent_messages` most recent messages are
+    never compacted.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        *,
+        target_ratio: float = 0.6,
+        keep_recent_messages: int = 6,
+        tool_output_chars: int = 1000,
+    ):
+        self.max_tokens = max_tokens
+        self.target_ratio = target_ratio
+        self.keep_recent_messages = keep_recent_messages
+        self.tool_output_chars = tool_output_chars
+        # Tokens used by the system prompt and tools, measured from API usage
+        self.overhead = 0
+
+    def estimate(self, messages: list[BetaMessageParam]) -> int:
+        """Estimate the number of input tokens of a request with these messages."""
+        return self.overhead + sum(estimate_tokens(message) for message in messages)
+
+    def record_usage(self, messages: list[BetaMessageParam], input_tokens: int):
+        """
+        Calibrate the estimate with the input tokens the API reported for a request
+        with these messages, including cached ones.
+        """
+        self.overhead = max(
+            0, input_tokens - sum(estimate_tokens(message) for message in messages)
+        )
+
+    def compact(self, messages: list[BetaMessageParam]) -> int:
+        """
+        Compact old turns in place if the budget is reached. Returns the number of
+        tokens saved.
+        """
+        total = self.estimate(messages)
+        if total < self.max_tokens:
+            return 0
+
+        target = int(self.max_tokens * self.target_ratio)
+        saved = 0
+        for message in messages[1 : max(1, len(messages) - self.keep_recent_messages)]:
+            if total - saved <= target:
+                break
+            before = estimate_tokens(message)
+            self._compact_message(message)
+            saved += before - estimate_tokens(message)
+        return saved
+
+    def _compact_message(self, message: BetaMessageParam):
+        if isinstance(message["content"], str):
+            return
+        content = cast(list[dict[str, Any]], message["content"])
+        compacted = []
+        for block in content:
+            if block["type"] in ("thinking", "redacted_thinking"):
+                # Only the thinking of the latest assistant turn must be sent back
+                continue
+            if block["type"] == "image":
+                compacted.append({"type": "text", "text": SCREENSHOT_OMITTED})
+            elif block["type"] == "tool_result":
+                compacted.append(self._compact_tool_result(block))
+            else:
+                compacted.append(block)
+        if not compacted:
+            compacted.append({"type": "text", "text": THINKING_OMITTED})
+        message["content"] = cast(list[BetaContentBlockParam], compacted)
+
+    def _compact_tool_result(self, block: dict[str, Any]) -> dict[str, Any]:
+        content = block.get("content", [])
+        if isinstance(content, str):
+            return {**block, "content": self._shorten(content)}
+        compacted = []
+        for item in content:
+            if item["type"] == "image":
+                compacted.append({"type": "text", "text": SCREENSHOT_OMITTED})
+            elif item["type"] == "text":
+                compacted.append({**item, "text": self._shorten(item["text"])})
+            else:
+                compacted.append(item)
+        return {**block, "content": compacted}
+
+    def _shorten(self, text: str) -> str:
+        """Keep the beginning and end of a long tool output."""
+        if len(text) <= self.tool_output_chars:
+            return text
+        head = self.tool_output_chars * 6 // 10
+        tail = self.tool_output_chars * 2 // 10
+        omitted = len(text) - head - tail
+        return (
+            f"{text[:head]}\n[... {omitted} characters of output omitted to save "
+            f"context ...]\n{text[-tail:]}"
+        )
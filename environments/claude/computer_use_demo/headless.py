@@ -0,0 +1,320 @@
+"""
+Headless entry point that runs the agent on the task Overseer provides, without the
+Streamlit interface. Progress is reported as JSON on a local HTTP endpoint.
+
+Run with `python -m computer_use_demo.headless`.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, cast
+
+import httpx
+from anthropic.types.beta import BetaContentBlockParam, BetaMessageParam
+
+from .heartbeat import heartbeat
+from .journal import SessionJournal
+from .loop import APIProvider, SessionUsage, TurnUsage, sampling_loop
+from .tools import ToolResult, ToolVersion
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_TO_DEFAULT_MODEL_NAME: dict[APIProvider, str] = {
+    APIProvider.ANTHROPIC: "claude-3-7-sonnet-20250219",
+    APIProvider.BEDROCK: "anthropic.claude-3-5-sonnet-20241022-v2:0",
+    APIProvider.VERTEX: "claude-3-5-sonnet-v2@20241022",
+}
+
+STATUS_PORT = int(os.getenv("HEADLESS_STATUS_PORT", "8090"))
+# Exit once the task is done instead of idling with the status endpoint up
+EXIT_WHEN_DONE = os.getenv("HEADLESS_EXIT_WHEN_DONE", "").lower() in ("1", "true")
+# Where the task data is written for the agent to read
+DATA_DIR = Path(os.getenv("HEADLESS_DATA_DIR", "~/task_data")).expanduser()
+# Journal base directory when JOURNAL_DIR is not set. It is in the home directory,
+# which Overseer keeps on a volume, so a restarted environment continues its task.
+DEFAULT_JOURNAL_DIR = "~/.anthropic/journal"
+# Subdirectory of the journal base directory for the headless conversation, which
+# must not share its journal with the one of the Streamlit session
+JOURNAL_SUBDIR = "headless"
+# Written next to the journal once the task is completed, so it is not run again
+COMPLETED_FILE = "completed.json"
+
+_PART_RE = re.compile(r"^(?P<name>.+)\.part-(?P<index>\d{4})$")
+
+
+@dataclass(frozen=True)
+class Task:
+    requirement: str
+    tools: list[str]
+    data: dict[str, str]
+
+
+def load_task() -> Task | None:
+    """
+    The task of this environment: the files in `TASK_DIR` if it has a requirement,
+    otherwise the `REQUIREMENT`, `TOOLS` and `DATA_<KEY>` environment variables.
+    """
+    task_dir = os.getenv("TASK_DIR")
+    files = read_task_files(Path(task_dir)) if task_dir else {}
+    if files.get("requirement"):
+        return Task(
+            requirement=files["requirement"],
+            tools=_split_tools(files.get("tools", "")),
+            data={
+                name[len("data.") :]: content
+                for name, content in files.items()
+                if name.startswith("data.")
+            },
+        )
+    if requirement := os.getenv("REQUIREMENT"):
+        return Task(
+            requirement=requirement,
+            tools=_split_tools(os.getenv("TOOLS", "")),
+            data={
+                name[len("DATA_") :]: value
+                for name, value in os.environ.items()
+                if name.startswith("DATA_")
+            },
+        )
+    return None
+
+
+def read_task_files(task_dir: Path) -> dict[str, str]:
+    """Read the task files, joining the numbered parts of files that were split."""
+    if not task_dir.is_dir():
+        return {}
+    files: dict[str, str] = {}
+    parts: dict[str, dict[int, str]] = {}
+    for path in task_dir.iterdir():
+        # Skip the ..data and ..<timestamp> entries of a projected volume
+        if path.name.startswith(".") or not path.is_file():
+            continue
+        if match := _PART_RE.match(path.name):
+            parts.setdefault(match["name"], {})[int(match["index"])] = path.read_text()
+        else:
+            files[path.name] = path.read_text()
+    for name, indexed in parts.items():
+        files[name] = "".join(indexed[index] for index in sorted(indexed))
+    return files
+
+
+def _split_tools(tools: str) -> list[str]:
+    return [tool.strip() for tool in tools.split(",") if tool.strip()]
+
+
+def journal_dir() -> Path:
+    """The directory the headless conversation is journaled in."""
+    base = os.getenv("JOURNAL_DIR") or DEFAULT_JOURNAL_DIR
+    return Path(base).expanduser() / JOURNAL_SUBDIR
+
+
+def task_fingerprint(task: Task) -> str:
+    return hashlib.sha256(json.dumps(asdict(task), sort_keys=True).encode()).hexdigest()
+
+
+def load_completed(directory: Path, task: Task) -> dict[str, Any] | None:
+    """
+    The final status of `task` if it was completed before a restart, None if it
+    still has to be run. A different task in the same place runs again.
+    """
+    try:
+        completed = json.loads((directory / COMPLETED_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+    if completed.get("task") != task_fingerprint(task):
+        return None
+    return completed.get("status")
+
+
+def save_completed(directory: Path, task: Task, status: "RunStatus"):
+    """Record that `task` is completed, with its final status."""
+    directory.mkdir(parents=True, exist_ok=True)
+    completed = {"task": task_fingerprint(task), "status": json.loads(status.to_json())}
+    (directory / COMPLETED_FILE).write_text(json.dumps(completed))
+
+
+def task_prompt(task: Task, data_dir: Path) -> str:
+    """
+    The first message of the conversation. Data is written to files in `data_dir`
+    rather than put into the prompt, since it can be large.
+    """
+    if not task.data:
+        return task.requirement
+    data_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for key, value in sorted(task.data.items()):
+        # Keys are file names, never paths out of the data directory
+        name = Path(key).name
+        if name in ("", ".", ".."):
+            continue
+        path = data_dir / name
+        path.write_text(value)
+        paths.append(path)
+    listing = "\n".join(f"- {path}" for path in paths)
+    return f"{task.requirement}\n\nThe data for this task is in these files:\n{listing}"
+
+
+@dataclass
+class RunStatus:
+    """Progress of the headless run, served as JSON."""
+
+    state: str = "starting"
+    """starting, running, completed, failed or idle (no task)."""
+    started_at: str | None = None
+    finished_at: str | None = None
+    turns: int = 0
+    tool_calls: int = 0
+    tool_errors: int = 0
+    last_text: str | None = None
+    error: str | None = None
+    usage: dict[str, Any] = field(default_factory=dict)
+    _lock: threading.Lock = field(
+        default_factory=threading.Lock, repr=False, compare=False
+    )
+
+    def update(self, **changes: Any):
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self, name, value)
+
+    def to_json(self) -> bytes:
+        with self._lock:
+            return json.dumps(
+                {
+                    status_field.name: getattr(self, status_field.name)
+                    for status_field in fields(self)
+                    if not status_field.name.startswith("_")
+                }
+            ).encode()
+
+
+def serve_status(status: RunStatus, port: int = STATUS_PORT) -> ThreadingHTTPServer:
+    """Serve the status on `GET /status` (and `/`) from a background thread."""
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/", "/status"):
+                self.send_error(404)
+                return
+            body = status.to_json()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer(("", port), StatusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run(task: Task, status: RunStatus) -> list[BetaMessageParam]:
+    """Run the sampling loop on a task until the agent is done."""
+    provider = APIProvider(os.getenv("API_PROVIDER", "anthropic") or "anthropic")
+    journal = SessionJournal(journal_dir())
+    usage_log = os.getenv("USAGE_LOG")
+    session_usage = SessionUsage()
+
+    # The data files are written again after a restart, the prompt only if the
+    # conversation does not continue from the journal
+    prompt = task_prompt(task, DATA_DIR)
+    messages: list[BetaMessageParam] = []
+    if not len(journal):
+        messages.append({"role": "user", "content": prompt})
+
+    def output_callback(block: BetaContentBlockParam):
+        if block["type"] == "text":
+            status.update(last_text=block["text"])
+
+    def tool_output_callback(result: ToolResult, tool_use_id: str):
+        status.update(
+            tool_calls=status.tool_calls + 1,
+            tool_errors=status.tool_errors + bool(result.error),
+        )
+
+    def api_response_callback(
+        request: httpx.Request,
+        response: httpx.Response | object | None,
+        error: Exception | None,
+    ):
+        if error:
+            status.update(error=str(error))
+
+    def usage_callback(turn: TurnUsage, session: SessionUsage):
+        status.update(
+            turns=session.turns,
+            usage={**asdict(session), "cache_hit_rate": session.cache_hit_rate},
+        )
+
+    status.update(state="running", started_at=datetime.now().isoformat())
+    # Keeps the deployment from being paused as idle while nobody watches
+    async with heartbeat():
+        return await sampling_loop(
+            model=os.getenv("MODEL") or PROVIDER_TO_DEFAULT_MODEL_NAME[provider],
+            provider=provider,
+            system_prompt_suffix=os.getenv("SYSTEM_PROMPT_SUFFIX", ""),
+            messages=messages,
+            output_callback=output_callback,
+            tool_output_callback=tool_output_callback,
+            api_response_callback=api_response_callback,
+            api_key=os.getenv("ANTHROPIC_API_KEY", ""),
+            only_n_most_recent_images=3,
+            max_tokens=int(os.getenv("MAX_OUTPUT_TOKENS", "16384")),
+            tool_version=cast(
+                ToolVersion, os.getenv("TOOL_VERSION", "computer_use_20250124")
+            ),
+            context_budget=int(os.getenv("CONTEXT_BUDGET", "120000")) or None,
+            usage_callback=usage_callback,
+            usage_log=Path(usage_log) if usage_log else None,
+            session_usage=session_usage,
+            journal=journal,
+            tools=task.tools,
+        )
+
+
+async def main() -> int:
+    status = RunStatus()
+    server = serve_status(status)
+
+    task = load_task()
+    if task is None:
+        status.update(state="idle")
+        logger.info("No task found in TASK_DIR or REQUIREMENT, nothing to do")
+    elif (completed := load_completed(journal_dir(), task)) is not None:
+        status.update(**completed)
+        logger.info("Task was completed before a restart, not running it again")
+    else:
+        try:
+            await run(task, status)
+        except Exception as e:
+            status.update(state="failed", error=f"{type(e).__name__}: {e}")
+        else:
+            status.update(state="failed" if status.error else "completed")
+        status.update(finished_at=datetime.now().isoformat())
+        if status.state == "completed":
+            save_completed(journal_dir(), task, status)
+        logger.info("Task %s", status.state)
+
+    if not EXIT_WHEN_DONE:
+        # Idle with the status endpoint up until the environment is deleted
+        await asyncio.Event().wait()
+    server.shutdown()
+    return 0 if status.state in ("completed", "idle") else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    sys.exit(asyncio.run(main()))
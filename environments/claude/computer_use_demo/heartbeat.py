@@ -0,0 +1,60 @@
+"""
+Reports agent activity to Overseer, so that the deployment is not paused as idle
+while the agent is working without anyone connected over VNC.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Set by Overseer on the deployments it creates
+OVERSEER_URL = os.getenv("OVERSEER_URL", "")
+DEPLOYMENT_ID = os.getenv("DEPLOYMENT_ID", "")
+# Well below the idle timeout of Overseer, which is counted in minutes
+HEARTBEAT_SECONDS = float(os.getenv("HEARTBEAT_SECONDS", "60"))
+
+
+def heartbeat_url(
+    overseer_url: str = OVERSEER_URL, deployment_id: str = DEPLOYMENT_ID
+) -> str | None:
+    """The heartbeat endpoint of this deployment, None outside of Overseer."""
+    if not overseer_url or not deployment_id:
+        return None
+    return f"{overseer_url.rstrip('/')}/deployments/{deployment_id}/heartbeat"
+
+
+async def _send_heartbeats(url: str, interval: float):
+    async with httpx.AsyncClient(timeout=10) as client:
+        while True:
+            try:
+                response = await client.post(url)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                # A missed heartbeat is retried at the next interval
+                logger.warning("Heartbeat to %s failed: %s", url, e)
+            await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def heartbeat(
+    url: str | None = None, interval: float = HEARTBEAT_SECONDS
+) -> AsyncIterator[None]:
+    """
+    Send a heartbeat right away and then every `interval` seconds while the body
+    runs. Does nothing when the environment is not deployed by Overseer.
+    """
+    url = url or heartbeat_url()
+    if url is None:
+        yield
+        return
+    task = asyncio.create_task(_send_heartbeats(url, interval))
+    try:
+        yield
+    finally:
+        task.cancel()
@@ -0,0 +1,156 @@
+"""
+Append-only journal of a conversation on disk, to resume it after a restart.
+"""
+
+import base64
+import copy
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, cast
+
+from anthropic.types.beta import BetaMessageParam
+
+MESSAGES_FILE = "messages.jsonl"
+BLOBS_DIR = "blobs"
+
+
+class SessionJournal:
+    """
+    Writes each message of a conversation as one JSON line to `messages.jsonl` in
+    `directory`, as soon as it is part of the conversation. Images are stored once in
+    `blobs/`, named by the SHA-256 of their content, and referenced from the message.
+
+    Appending only writes the messages the journal does not have yet, so a turn
+    costs the size of its own messages. A line cut short by a crash is dropped when
+    the journal is opened again.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.path = directory / MESSAGES_FILE
+        self.blobs = directory / BLOBS_DIR
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self._written = self._recover()
+
+    def __len__(self) -> int:
+        return self._written
+
+    def load(self) -> list[BetaMessageParam]:
+        """Read the conversation, with the images inlined again."""
+        if not self.path.exists():
+            return []
+        with self.path.open() as f:
+            return [self._inline(json.loads(line)["message"]) for line in f]
+
+    def append(self, messages: list[BetaMessageParam]):
+        """Write the messages of the conversation the journal does not have yet."""
+        if len(messages) <= self._written:
+            return
+        lines = [
+            json.dumps({"index": index, "message": self._externalize(message)})
+            for index, message in enumerate(messages[self._written :], self._written)
+        ]
+        with self.path.open("a") as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._written = len(messages)
+
+    def resume(self, messages: list[BetaMessageParam]):
+        """
+        Continue a conversation from the journal: messages it has beyond `messages`
+        are added to them, and messages it lacks are written to it.
+        """
+        if len(messages) < self._written:
+            messages.extend(self.load()[len(messages) :])
+        self.append(messages)
+
+    def clear(self):
+        """Start a new conversation. Blobs are kept, new messages may use them again."""
+        self.path.unlink(missing_ok=True)
+        self._written = 0
+
+    def _recover(self) -> int:
+        """Count the complete messages, dropping a last line cut short by a crash."""
+        if not self.path.exists():
+            return 0
+        count = 0
+        complete = 0
+        with self.path.open("rb") as f:
+            for line in f:
+                try:
+                    json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                count += 1
+                complete += len(line)
+        if complete < self.path.stat().st_size:
+            with self.path.open("r+b") as f:
+                f.truncate(complete)
+        return count
+
+    def _externalize(self, message: BetaMessageParam) -> dict[str, Any]:
+        message = cast(BetaMessageParam, copy.deepcopy(message))
+        if isinstance(message["content"], list):
+            for block in cast(list[dict[str, Any]], message["content"]):
+                # Cache breakpoints are placed again for every request
+                block.pop("cache_control", None)
+                if block.get("type") == "image":
+                    self._store_image(block)
+                elif block.get("type") == "tool_result" and isinstance(
+                    block.get("content"), list
+                ):
+                    for item in block["content"]:
+                        item.pop("cache_control", None)
+                        if item.get("type") == "image":
+                            self._store_image(item)
+        return cast(dict[str, Any], message)
+
+    def _store_image(self, block: dict[str, Any]):
+        source = block["source"]
+        if source.get("type") != "base64":
+            return
+        data = base64.b64decode(source["data"])
+        digest = hashlib.sha256(data).hexdigest()
+        blob = self.blobs / digest
+        if not blob.exists():
+            partial = blob.with_suffix(".tmp")
+            with partial.open("wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(partial, blob)
+        block["source"] = {
+            "type": "blob",
+            "media_type": source["media_type"],
+            "sha256": digest,
+        }
+
+    def _inline(self, message: dict[str, Any]) -> BetaMessageParam:
+        if isinstance(message["content"], list):
+            for block in message["content"]:
+                if block.get("type") == "image":
+                    self._load_image(block)
+                elif block.get("type") == "tool_result" and isinstance(
+                    block.get("content"), list
+                ):
+                    for item in block["content"]:
+                        if item.get("type") == "image":
+                            self._load_image(item)
+        return cast(BetaMessageParam, message)
+
+    def _load_image(self, block: dict[str, Any]):
+        source = block["source"]
+        if source.get("type") != "blob":
+            return
+        block["source"] = {
+            "type": "base64",
+            "media_type": source["media_type"],
+            "data": base64.b64encode(
+                (self.blobs / source["sha256"]).read_bytes()
+            ).decode(),
+        }
@@ -2,20 +2,28 @@
 Agentic sampling loop that calls the Anthropic API and local implementation of anthropic-defined computer use tools.
 """
 
+import asyncio
+import importlib.util
+import json
 import platform
+import time
+import weakref
 from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from enum import StrEnum
+from pathlib import Path
 from typing import Any, cast
 
 import httpx
 from anthropic import (
-    Anthropic,
-    AnthropicBedrock,
-    AnthropicVertex,
     APIError,
     APIResponseValidationError,
     APIStatusError,
+    AsyncAnthropic,
+    AsyncAnthropicBedrock,
+    AsyncAnthropicVertex,
+    DefaultAsyncHttpxClient,
 )
 from anthropic.types.beta import (
     BetaCacheControlEphemeralParam,
@@ -29,15 +37,98 @@ from anthropic.types.beta import (
     BetaToolUseBlockParam,
 )
 
+from .context import ContextBudget
+from .journal import SessionJournal
+from .screenshots import ScreenshotDeduplicator
 from .tools import (
     TOOL_GROUPS_BY_VERSION,
     ToolCollection,
     ToolResult,
+    ToolScheduler,
     ToolVersion,
+    select_tools,
 )
 
 PROMPT_CACHING_BETA_FLAG = "prompt-caching-2024-07-31"
 
+RESTART_TOOL_ERROR = (
+    "tool execution was interrupted by a restart, its effect is unknown"
+)
+
+# Keep connections open across turns, which are often tens of seconds apart
+# while tools run, so that each turn does not pay for a new TLS handshake
+KEEPALIVE_EXPIRY_SECONDS = 300
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class TurnTiming:
+    """
+    Latencies of one turn of the sampling loop, in seconds since its request was sent.
+    """
+
+    first_token: float | None = None
+    """First streamed text, thinking or tool input (streaming only)."""
+    first_action: float | None = None
+    """First tool started, None if the turn used no tool."""
+    response: float | None = None
+    """Complete response received."""
+
+
+@dataclass
+class TurnUsage:
+    """
+    Tokens, request size and latencies of one turn of the sampling loop.
+    """
+
+    turn: int
+    """Number of the turn in the session, counted from 1."""
+    timing: TurnTiming
+    tool_seconds: dict[str, float] = field(default_factory=dict)
+    """Time each tool call took to run, by tool use ID."""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    request_bytes: int = 0
+    """Size of the request body sent to the API."""
+
+
+@dataclass
+class SessionUsage:
+    """
+    Totals of the turns of a session, which can span several calls of the sampling loop.
+    """
+
+    turns: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    request_bytes: int = 0
+    model_seconds: float = 0.0
+    tool_seconds: float = 0.0
+
+    def add(self, turn: TurnUsage):
+        self.turns += 1
+        self.input_tokens += turn.input_tokens
+        self.output_tokens += turn.output_tokens
+        self.cache_creation_input_tokens += turn.cache_creation_input_tokens
+        self.cache_read_input_tokens += turn.cache_read_input_tokens
+        self.request_bytes += turn.request_bytes
+        self.model_seconds += turn.timing.response or 0.0
+        self.tool_seconds += sum(turn.tool_seconds.values())
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of the input tokens read from the prompt cache."""
+        total = (
+            self.input_tokens
+            + self.cache_creation_input_tokens
+            + self.cache_read_input_tokens
+        )
+        return self.cache_read_input_tokens / total if total else 0.0
+
 
 class APIProvider(StrEnum):
     ANTHROPIC = "anthropic"
@@ -45,6 +136,15 @@ class APIProvider(StrEnum):
     VERTEX = "vertex"
 
 
+AsyncClient = AsyncAnthropic | AsyncAnthropicBedrock | AsyncAnthropicVertex
+
+# Connections of an async client belong to the event loop that opened them, so
+# clients are shared per event loop (and go away with it)
+_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[tuple[APIProvider, str | None], AsyncClient]
+] = weakref.WeakKeyDictionary()
+
+
 # This system prompt is optimized for the Docker environment in this repository and
 # specific tool combinations enabled.
 # We encourage modifying this system prompt to ensure the model has context for the
@@ -85,16 +185,65 @@ async def sampling_loop(
     tool_version: ToolVersion,
     thinking_budget: int | None = None,
     token_efficient_tools_beta: bool = False,
+    stream: bool = False,
+    timing_callback: Callable[[TurnTiming], None] | None = None,
+    context_budget: int | None = None,
+    usage_callback: Callable[[TurnUsage, SessionUsage], None] | None = None,
+    usage_log: Path | None = None,
+    session_usage: SessionUsage | None = None,
+    journal: SessionJournal | None = None,
+    tools: list[str] | None = None,
 ):
     """
     Agentic sampling loop for the assistant/tool interaction of computer use.
+
+    `tools` names the tools of the session (by default all tools of `tool_version`);
+    the others are neither set up nor sent to the API.
+
+    With `stream`, text and thinking are forwarded to `output_callback` paragraph by
+    paragraph while the response is generated, and each tool call starts as soon as
+    its input is complete instead of once the whole response has arrived.
+
+    Independent tool calls of a response run concurrently, see `ToolScheduler`; their
+    results are still returned in the order of the calls.
+
+    With `context_budget`, old turns are compacted in place once a request would
+    take more input tokens than that, see `ContextBudget`. Screenshots that show the
+    same screen as the previous one are replaced with a note in the conversation.
+
+    The tokens, request size and latencies of every turn go to `usage_callback`
+    together with the totals of `session_usage`, and are appended to the JSON lines
+    file `usage_log`.
+
+    With `journal`, every message is written to it as soon as it is part of the
+    conversation, and a conversation cut short by a restart continues from it: the
+    journaled messages missing from `messages` are added, and tool calls left
+    without results are answered with an error.
     """
     tool_group = TOOL_GROUPS_BY_VERSION[tool_version]
-    tool_collection = ToolCollection(*(ToolCls() for ToolCls in tool_group.tools))
+    tool_collection = ToolCollection(
+        *(ToolCls() for ToolCls in select_tools(tool_group, tools))
+    )
     system = BetaTextBlockParam(
         type="text",
         text=f"{SYSTEM_PROMPT}{' ' + system_prompt_suffix if system_prompt_suffix else ''}",
     )
+    # Bedrock and Vertex take their credentials from the environment
+    client = get_client(
+        provider, api_key if provider == APIProvider.ANTHROPIC else None
+    )
+    budget = ContextBudget(context_budget) if context_budget else None
+    track_usage = usage_callback is not None or usage_log is not None
+    if session_usage is None:
+        session_usage = SessionUsage()
+    if journal is not None:
+        journal.resume(messages)
+        if messages and messages[-1]["role"] == "assistant":
+            if not _heal_interrupted_tool_use(messages):
+                # The conversation already ended with a response
+                return messages
+            journal.append(messages)
+    screenshots = ScreenshotDeduplicator(messages)
 
     while True:
         enable_prompt_caching = False
@@ -103,12 +252,11 @@ async def sampling_loop(
             betas.append("token-efficient-tools-2025-02-19")
         image_truncation_threshold = only_n_most_recent_images or 0
         if provider == APIProvider.ANTHROPIC:
-            client = Anthropic(api_key=api_key, max_retries=4)
             enable_prompt_caching = True
-        elif provider == APIProvider.VERTEX:
-            client = AnthropicVertex()
-        elif provider == APIProvider.BEDROCK:
-            client = AnthropicBedrock()
+
+        if budget:
+            # The recent turns, which hold the cache breakpoints, are left alone
+            budget.compact(messages)
 
         if enable_prompt_caching:
             betas.append(PROMPT_CACHING_BETA_FLAG)
@@ -132,58 +280,312 @@ async def sampling_loop(
                 "thinking": {"type": "enabled", "budget_tokens": thinking_budget}
             }
 
-        # Call the API
-        # we use raw_response to provide debug information to streamlit. Your
-        # implementation may be able call the SDK directly with:
-        # `response = client.messages.create(...)` instead.
-        try:
-            raw_response = client.beta.messages.with_raw_response.create(
-                max_tokens=max_tokens,
-                messages=messages,
-                model=model,
-                system=[system],
-                tools=tool_collection.to_params(),
-                betas=betas,
-                extra_body=extra_body,
+        request_params = dict(
+            max_tokens=max_tokens,
+            messages=messages,
+            model=model,
+            system=[system],
+            tools=tool_collection.to_params(),
+            betas=betas,
+            extra_body=extra_body,
+        )
+        timing = TurnTiming()
+        started = time.monotonic()
+
+        scheduler = ToolScheduler(tool_collection)
+        tool_runs: list[tuple[str, asyncio.Task[ToolResult]]] = []
+
+        if stream:
+            try:
+                response, request = await _stream_response(
+                    client,
+                    request_params,
+                    scheduler,
+                    output_callback,
+                    api_response_callback,
+                    tool_runs,
+                    timing,
+                    started,
+                )
+            except (APIStatusError, APIResponseValidationError) as e:
+                scheduler.cancel()
+                api_response_callback(e.request, e.response, e)
+                return messages
+            except APIError as e:
+                scheduler.cancel()
+                api_response_callback(e.request, e.body, e)
+                return messages
+            except BaseException:
+                scheduler.cancel()
+                raise
+
+            if budget:
+                _record_usage(budget, messages, response)
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": _response_to_params(response),
+                }
+            )
+        else:
+            # Call the API
+            # we use raw_response to provide debug information to streamlit. Your
+            # implementation may be able call the SDK directly with:
+            # `response = client.messages.create(...)` instead.
+            try:
+                raw_response = await client.beta.messages.with_raw_response.create(
+                    **request_params
+                )
+            except (APIStatusError, APIResponseValidationError) as e:
+                api_response_callback(e.request, e.response, e)
+                return messages
+            except APIError as e:
+                api_response_callback(e.request, e.body, e)
+                return messages
+            timing.response = time.monotonic() - started
+
+            api_response_callback(
+                raw_response.http_response.request, raw_response.http_response, None
             )
-        except (APIStatusError, APIResponseValidationError) as e:
-            api_response_callback(e.request, e.response, e)
-            return messages
-        except APIError as e:
-            api_response_callback(e.request, e.body, e)
-            return messages
 
-        api_response_callback(
-            raw_response.http_response.request, raw_response.http_response, None
-        )
+            request = raw_response.http_response.request
+            response = await raw_response.parse()
 
-        response = raw_response.parse()
+            if budget:
+                _record_usage(budget, messages, response)
+            response_params = _response_to_params(response)
+            messages.append(
+                {
+                    "role": "assistant",
+                    "content": response_params,
+                }
+            )
 
-        response_params = _response_to_params(response)
-        messages.append(
-            {
-                "role": "assistant",
-                "content": response_params,
-            }
-        )
+            for content_block in response_params:
+                output_callback(content_block)
+                if content_block["type"] == "tool_use":
+                    if timing.first_action is None:
+                        timing.first_action = time.monotonic() - started
+                    tool_runs.append(
+                        (
+                            content_block["id"],
+                            scheduler.submit(
+                                content_block["name"],
+                                cast(dict[str, Any], content_block["input"]),
+                            ),
+                        )
+                    )
+
+        if journal is not None:
+            journal.append(messages)
 
         tool_result_content: list[BetaToolResultBlockParam] = []
-        for content_block in response_params:
-            output_callback(content_block)
-            if content_block["type"] == "tool_use":
-                result = await tool_collection.run(
-                    name=content_block["name"],
-                    tool_input=cast(dict[str, Any], content_block["input"]),
-                )
+        try:
+            for tool_use_id, tool_run in tool_runs:
+                result = await tool_run
                 tool_result_content.append(
-                    _make_api_tool_result(result, content_block["id"])
+                    screenshots.dedupe(_make_api_tool_result(result, tool_use_id))
                 )
-                tool_output_callback(result, content_block["id"])
+                tool_output_callback(result, tool_use_id)
+        except BaseException:
+            scheduler.cancel()
+            raise
+        if timing_callback:
+            timing_callback(timing)
+        if track_usage:
+            turn = _turn_usage(
+                session_usage.turns + 1,
+                timing,
+                request,
+                response,
+                {
+                    tool_use_id: duration
+                    for (tool_use_id, _), duration in zip(
+                        tool_runs, scheduler.durations
+                    )
+                    if duration is not None
+                },
+            )
+            session_usage.add(turn)
+            if usage_callback:
+                usage_callback(turn, session_usage)
+            if usage_log:
+                _log_usage(usage_log, turn, session_usage)
 
         if not tool_result_content:
             return messages
 
         messages.append({"content": tool_result_content, "role": "user"})
+        if journal is not None:
+            journal.append(messages)
+
+
+def get_client(provider: APIProvider, api_key: str | None = None) -> AsyncClient:
+    """
+    Get the async API client for a provider, shared by all sessions on the running
+    event loop that use the same credentials. Reusing it keeps the HTTP connection
+    pool and the Bedrock/Vertex credentials resolved on the first request.
+    """
+    clients = _clients.setdefault(asyncio.get_running_loop(), {})
+    if (provider, api_key) not in clients:
+        clients[provider, api_key] = _create_client(provider, api_key)
+    return clients[provider, api_key]
+
+
+def _create_client(provider: APIProvider, api_key: str | None) -> AsyncClient:
+    http_client = DefaultAsyncHttpxClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=100,
+            max_keepalive_connections=20,
+            keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+        ),
+    )
+    if provider == APIProvider.ANTHROPIC:
+        return AsyncAnthropic(api_key=api_key, max_retries=4, http_client=http_client)
+    if provider == APIProvider.VERTEX:
+        return AsyncAnthropicVertex(http_client=http_client)
+    if provider == APIProvider.BEDROCK:
+        return AsyncAnthropicBedrock(http_client=http_client)
+    raise ValueError(f"Unknown API provider: {provider}")
+
+
+async def _stream_response(
+    client: AsyncClient,
+    request_params: dict[str, Any],
+    scheduler: ToolScheduler,
+    output_callback: Callable[[BetaContentBlockParam], None],
+    api_response_callback: Callable[
+        [httpx.Request, httpx.Response | object | None, Exception | None], None
+    ],
+    tool_runs: list[tuple[str, asyncio.Task[ToolResult]]],
+    timing: TurnTiming,
+    started: float,
+) -> tuple[BetaMessage, httpx.Request]:
+    """
+    Stream a response, forwarding text and thinking as it arrives and starting each
+    tool call as soon as its block is complete. The tool runs are appended to
+    `tool_runs` in the order of the response. Returns the response and the request.
+    """
+    pending = {"text": "", "thinking": ""}
+
+    def forward(kind: str, final: bool = False):
+        # Forward complete paragraphs, and the remainder once the block is done
+        text = pending[kind]
+        cut = len(text) if final else text.rfind("\n\n") + 2
+        if cut < 2 and not final:
+            return
+        pending[kind] = text[cut:]
+        if text[:cut].strip():
+            output_callback(
+                cast(BetaContentBlockParam, {"type": kind, kind: text[:cut]})
+            )
+
+    async with client.beta.messages.stream(**request_params) as stream:
+        async for event in stream:
+            if event.type in ("text", "thinking", "input_json"):
+                if timing.first_token is None:
+                    timing.first_token = time.monotonic() - started
+                if event.type != "input_json":
+                    pending[event.type] += getattr(event, event.type)
+                    forward(event.type)
+            elif event.type == "content_block_stop":
+                block = event.content_block
+                if block.type in ("text", "thinking"):
+                    forward(block.type, final=True)
+                elif block.type == "tool_use":
+                    tool_use = cast(BetaToolUseBlockParam, block.model_dump())
+                    output_callback(tool_use)
+                    if timing.first_action is None:
+                        timing.first_action = time.monotonic() - started
+                    tool_runs.append(
+                        (
+                            tool_use["id"],
+                            scheduler.submit(
+                                tool_use["name"],
+                                cast(dict[str, Any], tool_use["input"]),
+                            ),
+                        )
+                    )
+        response = await stream.get_final_message()
+        timing.response = time.monotonic() - started
+        # The HTTP response, like in the non-streaming case; its body was consumed
+        # as events, the parsed message is returned instead
+        api_response_callback(stream.response.request, stream.response, None)
+    return response, stream.response.request
+
+
+def _heal_interrupted_tool_use(messages: list[BetaMessageParam]) -> bool:
+    """
+    Answer the tool calls of a final assistant message with an error. Returns False if
+    it has no tool calls.
+    """
+    content = messages[-1]["content"]
+    tool_use_ids = [
+        block["id"]
+        for block in (content if isinstance(content, list) else [])
+        if isinstance(block, dict) and block["type"] == "tool_use"
+    ]
+    if not tool_use_ids:
+        return False
+    messages.append(
+        {
+            "role": "user",
+            "content": [
+                BetaToolResultBlockParam(
+                    type="tool_result",
+                    tool_use_id=tool_use_id,
+                    content=RESTART_TOOL_ERROR,
+                    is_error=True,
+                )
+                for tool_use_id in tool_use_ids
+            ],
+        }
+    )
+    return True
+
+
+def _turn_usage(
+    number: int,
+    timing: TurnTiming,
+    request: httpx.Request,
+    response: BetaMessage,
+    tool_seconds: dict[str, float],
+) -> TurnUsage:
+    usage = response.usage
+    return TurnUsage(
+        turn=number,
+        timing=timing,
+        tool_seconds=tool_seconds,
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        cache_creation_input_tokens=usage.cache_creation_input_tokens or 0,
+        cache_read_input_tokens=usage.cache_read_input_tokens or 0,
+        request_bytes=len(request.content),
+    )
+
+
+def _log_usage(path: Path, turn: TurnUsage, session: SessionUsage):
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        **asdict(turn),
+        "session": {**asdict(session), "cache_hit_rate": session.cache_hit_rate},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def _record_usage(
+    budget: ContextBudget, messages: list[BetaMessageParam], response: BetaMessage
+):
+    usage = response.usage
+    budget.record_usage(
+        messages,
+        usage.input_tokens
+        + (usage.cache_creation_input_tokens or 0)
+        + (usage.cache_read_input_tokens or 0),
+    )
 
 
 def _maybe_filter_to_n_most_recent_images(
@@ -0,0 +1,109 @@
+"""
+Deduplication of screenshots that show the same screen as the one before them.
+"""
+
+import base64
+import binascii
+import io
+from typing import Any, cast
+
+from anthropic.types.beta import BetaMessageParam, BetaToolResultBlockParam
+from PIL import Image, UnidentifiedImageError
+
+# Screenshots are compared as grayscale thumbnails of this size, where a typed
+# character or a moved pointer still changes a cell by several levels
+FINGERPRINT_SIZE = (32, 24)
+# Largest difference of a thumbnail cell (0-255) between screens considered the same
+FINGERPRINT_TOLERANCE = 2
+
+
+def fingerprint(base64_image: str) -> bytes | None:
+    """A perceptual fingerprint of a screenshot, None if it cannot be decoded."""
+    try:
+        with Image.open(io.BytesIO(base64.b64decode(base64_image))) as image:
+            return image.convert("L").resize(FINGERPRINT_SIZE, Image.BOX).tobytes()
+    except (binascii.Error, OSError, UnidentifiedImageError, ValueError):
+        return None
+
+
+def same_screen(first: bytes, second: bytes) -> bool:
+    """Whether two fingerprints show effectively the same screen."""
+    return len(first) == len(second) and all(
+        abs(a - b) <= FINGERPRINT_TOLERANCE for a, b in zip(first, second)
+    )
+
+
+class ScreenshotDeduplicator:
+    """
+    Replaces the screenshot of a tool result with a short note when the screen has
+    not changed since the last screenshot that was kept. Steps are the tool calls of
+    the conversation, counted from 1.
+
+    Old screenshots can later be dropped from `messages` (by context compaction or
+    image truncation). A note only refers to a screenshot that is still there, so
+    the first unchanged screen after that is kept again.
+    """
+
+    def __init__(self, messages: list[BetaMessageParam]):
+        self._messages = messages
+        self._step = 0
+        # Fingerprint, step and tool use ID of the last screenshot that was kept
+        self._last: tuple[bytes, int, str] | None = None
+        last_image = None
+        for message in messages:
+            if not isinstance(message["content"], list):
+                continue
+            for block in cast(list[dict[str, Any]], message["content"]):
+                if block.get("type") != "tool_result":
+                    continue
+                self._step += 1
+                if image := _image_data(block):
+                    last_image = (image, self._step, block["tool_use_id"])
+        if last_image and (last := fingerprint(last_image[0])):
+            self._last = (last, last_image[1], last_image[2])
+
+    def dedupe(self, tool_result: BetaToolResultBlockParam) -> BetaToolResultBlockParam:
+        """Replace the screenshot of the next tool result if the screen is unchanged."""
+        self._step += 1
+        image = _image_data(cast(dict[str, Any], tool_result))
+        if image is None or (current := fingerprint(image)) is None:
+            return tool_result
+        if (
+            self._last
+            and same_screen(current, self._last[0])
+            and self._still_shown(self._last[2])
+        ):
+            note = f"[screen unchanged since step {self._last[1]}]"
+            tool_result["content"] = [
+                {"type": "text", "text": note}
+                if isinstance(item, dict) and item.get("type") == "image"
+                else item
+                for item in tool_result["content"]
+            ]
+            return tool_result
+        self._last = (current, self._step, tool_result["tool_use_id"])
+        return tool_result
+
+    def _still_shown(self, tool_use_id: str) -> bool:
+        """Whether the screenshot of a tool result is still in the conversation."""
+        for message in reversed(self._messages):
+            if not isinstance(message["content"], list):
+                continue
+            for block in cast(list[dict[str, Any]], message["content"]):
+                if (
+                    block.get("type") == "tool_result"
+                    and block.get("tool_use_id") == tool_use_id
+                ):
+                    return _image_data(block) is not None
+        # Not added yet: a result of the same response
+        return True
+
+
+def _image_data(tool_result: dict[str, Any]) -> str | None:
+    content = tool_result.get("content")
+    if not isinstance(content, list):
+        return None
+    for item in content:
+        if isinstance(item, dict) and item.get("type") == "image":
+            return item["source"].get("data")
+    return None
@@ -20,16 +20,28 @@ import streamlit as st
 from anthropic import RateLimitError
 from anthropic.types.beta import (
     BetaContentBlockParam,
+    BetaMessageParam,
     BetaTextBlockParam,
     BetaToolResultBlockParam,
 )
 from streamlit.delta_generator import DeltaGenerator
 
+from computer_use_demo.heartbeat import heartbeat
+from computer_use_demo.journal import SessionJournal
 from computer_use_demo.loop import (
     APIProvider,
+    SessionUsage,
+    TurnTiming,
+    TurnUsage,
     sampling_loop,
 )
-from computer_use_demo.tools import ToolResult, ToolVersion
+from computer_use_demo.tools import (
+    TOOL_GROUPS_BY_VERSION,
+    ToolResult,
+    ToolVersion,
+    select_tools,
+    tool_name,
+)
 
 PROVIDER_TO_DEFAULT_MODEL_NAME: dict[APIProvider, str] = {
     APIProvider.ANTHROPIC: "claude-3-7-sonnet-20250219",
@@ -63,8 +75,13 @@ MODEL_TO_MODEL_CONF: dict[str, ModelConfig] = {
     "claude-3-7-sonnet-20250219": SONNET_3_7,
 }
 
+TOOL_NAMES = ("computer", "str_replace_editor", "bash")
+
 CONFIG_DIR = PosixPath("~/.anthropic").expanduser()
 API_KEY_FILE = CONFIG_DIR / "api_key"
+USAGE_LOG_FILE = CONFIG_DIR / "usage.jsonl"
+# Conversations are journaled here, if set, and continue from it after a restart
+JOURNAL_DIR = os.getenv("JOURNAL_DIR")
 STREAMLIT_STYLE = """
 <style>
     /* Highlight the stop button in red */
@@ -95,8 +112,16 @@ class Sender(StrEnum):
 
 
 def setup_state():
+    if "journal" not in st.session_state:
+        st.session_state.journal = (
+            SessionJournal(PosixPath(JOURNAL_DIR)) if JOURNAL_DIR else None
+        )
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        st.session_state.messages = (
+            st.session_state.journal.load()
+            if st.session_state.journal is not None
+            else []
+        )
     if "api_key" not in st.session_state:
         # Try to load API key from file first, then environment
         st.session_state.api_key = load_from_storage("api_key") or os.getenv(
@@ -119,17 +144,67 @@ def setup_state():
     if "responses" not in st.session_state:
         st.session_state.responses = {}
     if "tools" not in st.session_state:
-        st.session_state.tools = {}
+        st.session_state.tools = _tool_results_from_messages(st.session_state.messages)
     if "only_n_most_recent_images" not in st.session_state:
         st.session_state.only_n_most_recent_images = 3
+    if "context_budget" not in st.session_state:
+        st.session_state.context_budget = 120_000
     if "custom_system_prompt" not in st.session_state:
         st.session_state.custom_system_prompt = load_from_storage("system_prompt") or ""
     if "hide_images" not in st.session_state:
         st.session_state.hide_images = False
     if "token_efficient_tools_beta" not in st.session_state:
         st.session_state.token_efficient_tools_beta = False
+    if "stream" not in st.session_state:
+        st.session_state.stream = True
+    if "enabled_tools" not in st.session_state:
+        # Start from the TOOLS Overseer sets for the deployment
+        st.session_state.enabled_tools = [
+            tool_name(tool)
+            for tool in select_tools(
+                TOOL_GROUPS_BY_VERSION[st.session_state.tool_version],
+                [tool.strip() for tool in os.getenv("TOOLS", "").split(",")],
+            )
+        ]
+    if "usage" not in st.session_state:
+        st.session_state.usage = SessionUsage()
     if "in_sampling_loop" not in st.session_state:
-        st.session_state.in_sampling_loop = False
+        # A journaled conversation that stopped in the middle of tool calls was
+        # interrupted by a restart, so the next message answers them
+        last_message = (st.session_state.messages or [None])[-1]
+        st.session_state.in_sampling_loop = bool(
+            last_message
+            and last_message["role"] == "assistant"
+            and isinstance(last_message["content"], list)
+            and any(block["type"] == "tool_use" for block in last_message["content"])
+        )
+
+
+def _tool_results_from_messages(
+    messages: list[BetaMessageParam],
+) -> dict[str, ToolResult]:
+    """
+    Rebuild the rendered tool results of a conversation loaded from the journal, from
+    what was sent back to the API.
+    """
+    tools = {}
+    for message in messages:
+        if not isinstance(message["content"], list):
+            continue
+        for block in message["content"]:
+            if not isinstance(block, dict) or block["type"] != "tool_result":
+                continue
+            content = block.get("content", [])
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            text = "\n".join(item["text"] for item in content if item["type"] == "text")
+            images = [item for item in content if item["type"] == "image"]
+            tools[block["tool_use_id"]] = ToolResult(
+                output=None if block.get("is_error") else text,
+                error=text if block.get("is_error") else None,
+                base64_image=images[0]["source"]["data"] if images else None,
+            )
+    return tools
 
 
 def _reset_model():
@@ -196,6 +271,13 @@ async def main():
             key="only_n_most_recent_images",
             help="To decrease the total tokens sent, remove older screenshots from the conversation",
         )
+        st.number_input(
+            "Context budget (tokens)",
+            min_value=0,
+            step=10_000,
+            key="context_budget",
+            help="When the conversation reaches this many input tokens, drop screenshots and thinking from old turns and shorten their tool outputs. 0 disables compaction.",
+        )
         st.text_area(
             "Custom System Prompt Suffix",
             key="custom_system_prompt",
@@ -208,6 +290,11 @@ async def main():
         st.checkbox(
             "Enable token-efficient tools beta", key="token_efficient_tools_beta"
         )
+        st.checkbox(
+            "Stream responses",
+            key="stream",
+            help="Show text as it is generated and start each action as soon as it is complete.",
+        )
         versions = get_args(ToolVersion)
         st.radio(
             "Tool Versions",
@@ -215,6 +302,12 @@ async def main():
             options=versions,
             index=versions.index(st.session_state.tool_version),
         )
+        st.multiselect(
+            "Tools",
+            options=TOOL_NAMES,
+            key="enabled_tools",
+            help="Tools Claude can use in this session, at least one. Leaving out the computer tool saves tokens on text-only tasks.",
+        )
 
         st.number_input("Max Output Tokens", key="output_tokens", step=1)
 
@@ -229,6 +322,8 @@ async def main():
 
         if st.button("Reset", type="primary"):
             with st.spinner("Resetting..."):
+                if st.session_state.journal is not None:
+                    st.session_state.journal.clear()
                 st.session_state.clear()
                 setup_state()
 
@@ -295,31 +390,47 @@ async def main():
             # we don't have a user message to respond to, exit early
             return
 
+        if not st.session_state.enabled_tools:
+            # An empty selection would fall back to every tool, so it is not run
+            st.warning("Select at least one tool to continue.")
+            return
+
+        # report activity to Overseer while the agent works, so the deployment is
+        # not paused as idle
         with track_sampling_loop():
-            # run the agent sampling loop with the newest message
-            st.session_state.messages = await sampling_loop(
-                system_prompt_suffix=st.session_state.custom_system_prompt,
-                model=st.session_state.model,
-                provider=st.session_state.provider,
-                messages=st.session_state.messages,
-                output_callback=partial(_render_message, Sender.BOT),
-                tool_output_callback=partial(
-                    _tool_output_callback, tool_state=st.session_state.tools
-                ),
-                api_response_callback=partial(
-                    _api_response_callback,
-                    tab=http_logs,
-                    response_state=st.session_state.responses,
-                ),
-                api_key=st.session_state.api_key,
-                only_n_most_recent_images=st.session_state.only_n_most_recent_images,
-                tool_version=st.session_state.tool_version,
-                max_tokens=st.session_state.output_tokens,
-                thinking_budget=st.session_state.thinking_budget
-                if st.session_state.thinking
-                else None,
-                token_efficient_tools_beta=st.session_state.token_efficient_tools_beta,
-            )
+            async with heartbeat():
+                # run the agent sampling loop with the newest message
+                st.session_state.messages = await sampling_loop(
+                    system_prompt_suffix=st.session_state.custom_system_prompt,
+                    model=st.session_state.model,
+                    provider=st.session_state.provider,
+                    messages=st.session_state.messages,
+                    output_callback=partial(_render_message, Sender.BOT),
+                    tool_output_callback=partial(
+                        _tool_output_callback, tool_state=st.session_state.tools
+                    ),
+                    api_response_callback=partial(
+                        _api_response_callback,
+                        tab=http_logs,
+                        response_state=st.session_state.responses,
+                    ),
+                    api_key=st.session_state.api_key,
+                    only_n_most_recent_images=st.session_state.only_n_most_recent_images,
+                    tool_version=st.session_state.tool_version,
+                    tools=st.session_state.enabled_tools,
+                    max_tokens=st.session_state.output_tokens,
+                    thinking_budget=st.session_state.thinking_budget
+                    if st.session_state.thinking
+                    else None,
+                    token_efficient_tools_beta=st.session_state.token_efficient_tools_beta,
+                    stream=st.session_state.stream,
+                    timing_callback=partial(_timing_callback, tab=http_logs),
+                    context_budget=st.session_state.context_budget or None,
+                    usage_callback=partial(_usage_callback, tab=http_logs),
+                    usage_log=USAGE_LOG_FILE,
+                    session_usage=st.session_state.usage,
+                    journal=st.session_state.journal,
+                )
 
 
 def maybe_add_interruption_blocks():
@@ -418,6 +529,39 @@ def _api_response_callback(
     _render_api_response(request, response, response_id, tab)
 
 
+def _timing_callback(timing: TurnTiming, tab: DeltaGenerator):
+    """Render the latencies of a turn to the HTTP exchange logs."""
+    parts = [
+        f"{label} {seconds:.2f}s"
+        for label, seconds in (
+            ("first token", timing.first_token),
+            ("first action", timing.first_action),
+            ("response", timing.response),
+        )
+        if seconds is not None
+    ]
+    with tab:
+        st.caption(f"Turn latency: {', '.join(parts)}")
+
+
+def _usage_callback(turn: TurnUsage, session: SessionUsage, tab: DeltaGenerator):
+    """Render the tokens of a turn and the session totals to the HTTP exchange logs."""
+    session_input = (
+        session.input_tokens
+        + session.cache_read_input_tokens
+        + session.cache_creation_input_tokens
+    )
+    with tab:
+        st.caption(
+            f"Turn {turn.turn} tokens: {turn.input_tokens} input, "
+            f"{turn.cache_read_input_tokens} cache read, "
+            f"{turn.cache_creation_input_tokens} cache write, "
+            f"{turn.output_tokens} output; request {turn.request_bytes / 1024:.0f} KiB. "
+            f"Session: {session_input} input ({session.cache_hit_rate:.0%} from cache), "
+            f"{session.output_tokens} output tokens over {session.turns} turns"
+        )
+
+
 def _tool_output_callback(
     tool_output: ToolResult, tool_id: str, tool_state: dict[str, ToolResult]
 ):
@@ -445,7 +589,11 @@ def _render_api_response(
                 st.markdown(
                     f"`{response.status_code}`{newline}{newline.join(f'`{k}: {v}`' for k, v in response.headers.items())}"
                 )
-                st.json(response.text)
+                try:
+                    st.json(response.text)
+                except httpx.ResponseNotRead:
+                    # Streamed responses are consumed as events, not read as a whole
+                    st.write("(streamed response)")
             else:
                 st.write(response)
 
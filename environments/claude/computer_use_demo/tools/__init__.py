@@ -3,7 +3,8 @@ from .bash import BashTool20241022, BashTool20250124
 from .collection import ToolCollection
 from .computer import ComputerTool20241022, ComputerTool20250124
 from .edit import EditTool20241022, EditTool20250124
-from .groups import TOOL_GROUPS_BY_VERSION, ToolVersion
+from .groups import TOOL_GROUPS_BY_VERSION, ToolVersion, select_tools, tool_name
+from .scheduler import ToolScheduler
 
 __ALL__ = [
     BashTool20241022,
@@ -15,6 +16,9 @@ __ALL__ = [
     EditTool20250124,
     ToolCollection,
     ToolResult,
+    ToolScheduler,
     ToolVersion,
     TOOL_GROUPS_BY_VERSION,
+    select_tools,
+    tool_name,
 ]
@@ -1,5 +1,6 @@
+from collections.abc import Iterable
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, Protocol, cast
 
 from .base import BaseAnthropicTool
 from .bash import BashTool20241022, BashTool20250124
@@ -31,3 +32,35 @@ TOOL_GROUPS: list[ToolGroup] = [
 ]
 
 TOOL_GROUPS_BY_VERSION = {tool_group.version: tool_group for tool_group in TOOL_GROUPS}
+
+
+class NamedTool(Protocol):
+    """
+    A tool class, read for the name Claude calls the tool by. Each tool narrows the
+    name to its own literal, so the base class cannot declare it as a `str`.
+    """
+
+    @property
+    def name(self) -> str: ...
+
+
+def tool_name(tool: type[BaseAnthropicTool]) -> str:
+    """The name Claude calls a tool by."""
+    return cast(NamedTool, tool).name
+
+
+# Other names a tool can be selected by
+TOOL_ALIASES = {"edit": "str_replace_editor", "editor": "str_replace_editor"}
+
+
+def select_tools(
+    tool_group: ToolGroup, names: Iterable[str] | None
+) -> list[type[BaseAnthropicTool]]:
+    """
+    The tools of a group named in a selection, such as the `TOOLS` variable Overseer
+    sets. Names that are not tools of the group are ignored; a selection without any
+    of them (or no selection) gets every tool.
+    """
+    selected = {TOOL_ALIASES.get(name, name) for name in names or []}
+    tools = [tool for tool in tool_group.tools if tool_name(tool) in selected]
+    return tools or tool_group.tools
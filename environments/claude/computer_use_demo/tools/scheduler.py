@@ -0,0 +1,103 @@
+"""Scheduling of the tool calls of one response."""
+
+import asyncio
+import os
+import time
+from typing import Any
+
+from .base import ToolResult
+from .collection import ToolCollection
+
+# A resource a tool call uses, and whether it changes it
+Access = tuple[str, bool]
+
+# Resources that conflict with every other call
+EVERYTHING = "*"
+
+# Commands of the edit tool that only read their path
+READ_ONLY_EDIT_COMMANDS = {"view"}
+
+
+def tool_accesses(name: str, tool_input: dict[str, Any]) -> frozenset[Access]:
+    """
+    The resources a tool call uses. Every `computer` action changes the display
+    (even a screenshot must see the actions before it), edits read or write their
+    path, and the bash session can touch the display and any file, so bash calls
+    and calls to unknown tools are ordered against everything.
+    """
+    if name == "computer":
+        return frozenset({("display", True)})
+    if name == "str_replace_editor" and isinstance(tool_input.get("path"), str):
+        path = os.path.normpath(tool_input["path"])
+        writes = tool_input.get("command") not in READ_ONLY_EDIT_COMMANDS
+        return frozenset({(f"file:{path}", writes)})
+    return frozenset({(EVERYTHING, True)})
+
+
+def _overlaps(first: str, second: str) -> bool:
+    if EVERYTHING in (first, second):
+        return True
+    if first.startswith("file:") and second.startswith("file:"):
+        # A directory view lists the files below it
+        first, second = first[len("file:") :], second[len("file:") :]
+        return (
+            first == second
+            or second.startswith(first.rstrip("/") + "/")
+            or first.startswith(second.rstrip("/") + "/")
+        )
+    return first == second
+
+
+def conflicts(first: frozenset[Access], second: frozenset[Access]) -> bool:
+    """Whether two calls use a resource in common that at least one of them changes."""
+    return any(
+        (first_writes or second_writes) and _overlaps(first_resource, second_resource)
+        for first_resource, first_writes in first
+        for second_resource, second_writes in second
+    )
+
+
+class ToolScheduler:
+    """
+    Runs the tool calls of a response as they are submitted: concurrently where
+    they are independent, and each one after the earlier calls it conflicts with,
+    so that the result of every call is the one it would have had in sequence.
+    """
+
+    def __init__(self, tool_collection: ToolCollection):
+        self.tool_collection = tool_collection
+        self._runs: list[tuple[frozenset[Access], asyncio.Task[ToolResult]]] = []
+        # Seconds each call took to run, not counting the wait for earlier calls,
+        # in the order of submission (None until it has finished)
+        self.durations: list[float | None] = []
+
+    def submit(self, name: str, tool_input: dict[str, Any]) -> asyncio.Task[ToolResult]:
+        """Start a tool call once the earlier calls it conflicts with have finished."""
+        accesses = tool_accesses(name, tool_input)
+        earlier = [task for other, task in self._runs if conflicts(accesses, other)]
+        self.durations.append(None)
+        task = asyncio.create_task(
+            self._run(len(self.durations) - 1, earlier, name, tool_input)
+        )
+        self._runs.append((accesses, task))
+        return task
+
+    def cancel(self):
+        """Cancel the calls that have not finished."""
+        for _, task in self._runs:
+            task.cancel()
+
+    async def _run(
+        self,
+        index: int,
+        earlier: list[asyncio.Task[ToolResult]],
+        name: str,
+        tool_input: dict[str, Any],
+    ) -> ToolResult:
+        if earlier:
+            await asyncio.wait(earlier)
+        started = time.monotonic()
+        try:
+            return await self.tool_collection.run(name=name, tool_input=tool_input)
+        finally:
+            self.durations[index] = time.monotonic() - started
@@ -25,6 +25,9 @@ python http_server.py > /tmp/server_logs.txt 2>&1 &
 
 STREAMLIT_SERVER_PORT=8501 python -m streamlit run computer_use_demo/streamlit.py > /tmp/streamlit_stdout.log &
 
+# Work on the task Overseer provides, if any, without waiting for the Streamlit page
+python -m computer_use_demo.headless > /tmp/headless_logs.txt 2>&1 &
+
 echo "✨ Computer Use Demo is ready!"
 echo "➡️  Open http://localhost:8080 in your browser to begin"
 
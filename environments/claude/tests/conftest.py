@@ -3,6 +3,8 @@ from unittest import mock
 
 import pytest
 
+from computer_use_demo import loop
+
 
 @pytest.fixture(autouse=True)
 def mock_screen_dimensions():
@@ -10,3 +12,10 @@ def mock_screen_dimensions():
         os.environ, {"HEIGHT": "768", "WIDTH": "1024", "DISPLAY_NUM": "1"}
     ):
         yield
+
+
+@pytest.fixture(autouse=True)
+def clear_client_cache():
+    loop._clients.clear()
+    yield
+    loop._clients.clear()
@@ -0,0 +1,97 @@
+import base64
+
+from computer_use_demo.context import (
+    SCREENSHOT_OMITTED,
+    ContextBudget,
+    estimate_tokens,
+)
+
+
+def png(width, height):
+    header = (
+        b"\x89PNG\r\n\x1a\n"
+        + (13).to_bytes(4, "big")
+        + b"IHDR"
+        + width.to_bytes(4, "big")
+        + height.to_bytes(4, "big")
+    )
+    return base64.b64encode(header + b"\x00" * 100).decode()
+
+
+def turn(index, output="x" * 4000):
+    return [
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "thinking", "thinking": "hmm " * 100, "signature": "s"},
+                {"type": "tool_use", "id": str(index), "name": "bash", "input": {}},
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": str(index),
+                    "content": [
+                        {"type": "text", "text": output},
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": "image/png",
+                                "data": png(1024, 768),
+                            },
+                        },
+                    ],
+                }
+            ],
+        },
+    ]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens({"role": "user", "content": "x" * 400}) == 101
+    image = turn(0)[1]
+    assert 1000 + 1048 < estimate_tokens(image) < 1100 + 1048
+
+
+def test_compact_below_budget_does_nothing():
+    messages = [{"role": "user", "content": "Task"}, *turn(0), *turn(1)]
+    assert ContextBudget(100_000).compact(messages) == 0
+    assert messages[1]["content"][0]["type"] == "thinking"
+
+
+def test_compact_old_turns_first():
+    messages = [{"role": "user", "content": "Task"}]
+    for index in range(10):
+        messages += turn(index)
+    budget = ContextBudget(20_000, keep_recent_messages=4)
+    before = budget.estimate(messages)
+
+    saved = budget.compact(messages)
+
+    assert saved > 0
+    assert before - saved == budget.estimate(messages) <= 12_000
+    assert messages[0] == {"role": "user", "content": "Task"}
+    # The oldest turn is compacted
+    assert [block["type"] for block in messages[1]["content"]] == ["tool_use"]
+    result = messages[2]["content"][0]["content"]
+    assert len(result[0]["text"]) < 1000
+    assert result[1] == {"type": "text", "text": SCREENSHOT_OMITTED}
+    # Compaction stops once under the target, the latest turns are kept as they are
+    assert messages[-4:] == turn(8) + turn(9)
+    assert messages[-6]["content"][0]["type"] == "thinking"
+
+    # Compacting again leaves the compacted prefix as it is
+    compacted = [message["content"] for message in messages[1:3]]
+    assert ContextBudget(5_000, keep_recent_messages=4).compact(messages) > 0
+    assert [message["content"] for message in messages[1:3]] == compacted
+
+
+def test_record_usage_calibrates_overhead():
+    messages = [{"role": "user", "content": "x" * 400}]
+    budget = ContextBudget(1000)
+    budget.record_usage(messages, 2101)
+    assert budget.overhead == 2000
+    assert budget.estimate(messages) == 2101
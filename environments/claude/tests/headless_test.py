@@ -0,0 +1,171 @@
+import asyncio
+import os
+import subprocess
+import sys
+from unittest import mock
+
+import httpx
+from anthropic.types import TextBlock
+from anthropic.types.beta import BetaMessage, BetaUsage
+
+from computer_use_demo import headless
+from computer_use_demo.headless import RunStatus, Task, load_task, serve_status
+
+
+def test_load_task_from_task_dir(tmp_path):
+    (tmp_path / "requirement.part-0001").write_text("world")
+    (tmp_path / "requirement.part-0000").write_text("Hello ")
+    (tmp_path / "tools").write_text("bash, edit")
+    (tmp_path / "data.notes.txt").write_text("Notes")
+    (tmp_path / "..data").mkdir()
+
+    with mock.patch.dict(os.environ, {"TASK_DIR": str(tmp_path)}):
+        assert load_task() == Task(
+            requirement="Hello world",
+            tools=["bash", "edit"],
+            data={"notes.txt": "Notes"},
+        )
+
+
+def test_load_task_from_environment(tmp_path):
+    environment = {
+        "TASK_DIR": str(tmp_path / "missing"),
+        "REQUIREMENT": "Do it",
+        "TOOLS": "computer",
+        "DATA_input": "1,2,3",
+    }
+    with mock.patch.dict(os.environ, environment):
+        assert load_task() == Task(
+            requirement="Do it", tools=["computer"], data={"input": "1,2,3"}
+        )
+    with mock.patch.dict(os.environ, {"TASK_DIR": str(tmp_path)}, clear=True):
+        assert load_task() is None
+
+
+def test_headless_does_not_import_streamlit():
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, computer_use_demo.headless; "
+            "assert 'streamlit' not in sys.modules",
+        ],
+        check=True,
+    )
+
+
+async def test_run_reports_progress(tmp_path):
+    raw_response = mock.Mock()
+    raw_response.http_response.request = httpx.Request(
+        "POST", "https://api.anthropic.com/v1/messages", content=b"{}"
+    )
+    raw_response.parse = mock.AsyncMock()
+    raw_response.parse.return_value = mock.Mock(
+        spec=BetaMessage,
+        content=[TextBlock(type="text", text="Done!")],
+        usage=BetaUsage(input_tokens=10, output_tokens=2),
+    )
+    heartbeat_sent = asyncio.Event()
+
+    async def heartbeat_post(url):
+        heartbeat_sent.set()
+        return httpx.Response(200, request=httpx.Request("POST", url))
+
+    async def create(**kwargs):
+        # The agent is working while the heartbeats are sent
+        await asyncio.wait_for(heartbeat_sent.wait(), timeout=5)
+        return raw_response
+
+    client = mock.Mock()
+    client.beta.messages.with_raw_response.create = create
+    status = RunStatus()
+    server = serve_status(status, port=0)
+
+    with (
+        mock.patch("computer_use_demo.loop.AsyncAnthropic", return_value=client),
+        mock.patch.object(headless, "DATA_DIR", tmp_path / "data"),
+        mock.patch.dict(os.environ, {"JOURNAL_DIR": str(tmp_path / "journal")}),
+        mock.patch(
+            "computer_use_demo.heartbeat.heartbeat_url",
+            return_value="http://overseer/deployments/a8s-claude-1/heartbeat",
+        ),
+        mock.patch.object(
+            httpx.AsyncClient, "post", side_effect=heartbeat_post
+        ) as post,
+    ):
+        messages = await headless.run(
+            Task(requirement="Do it", tools=[], data={"input": "1,2,3"}), status
+        )
+
+    assert (tmp_path / "data" / "input").read_text() == "1,2,3"
+    assert str(tmp_path / "data" / "input") in messages[0]["content"]
+    assert status.state == "running"
+    assert status.last_text == "Done!"
+    assert status.turns == 1
+    post.assert_awaited_with("http://overseer/deployments/a8s-claude-1/heartbeat")
+    # The Streamlit session keeps its own journal in JOURNAL_DIR
+    assert (tmp_path / "journal" / "headless" / "messages.jsonl").exists()
+    assert not (tmp_path / "journal" / "messages.jsonl").exists()
+
+    async with httpx.AsyncClient() as http_client:
+        response = await http_client.get(
+            f"http://127.0.0.1:{server.server_port}/status"
+        )
+    server.shutdown()
+    assert response.json()["last_text"] == "Done!"
+
+
+def serve_on_any_port(status):
+    return serve_status(status, port=0)
+
+
+async def test_completed_task_is_not_run_again(tmp_path):
+    task = Task(requirement="Do it", tools=[], data={})
+
+    async def run(task, status):
+        status.update(state="running", turns=3, last_text="Done!")
+
+    with (
+        mock.patch.dict(os.environ, {"JOURNAL_DIR": str(tmp_path)}),
+        mock.patch.object(headless, "load_task", return_value=task),
+        mock.patch.object(headless, "serve_status", side_effect=serve_on_any_port),
+        mock.patch.object(headless, "EXIT_WHEN_DONE", True),
+        mock.patch.object(headless, "run", side_effect=run) as run_mock,
+    ):
+        assert await headless.main() == 0
+        # After a restart, the final status is served without running the task
+        assert await headless.main() == 0
+        assert run_mock.await_count == 1
+        completed = headless.load_completed(headless.journal_dir(), task)
+        assert completed["state"] == "completed"
+        assert completed["turns"] == 3
+
+        # A different task is run
+        headless.load_task.return_value = Task(
+            requirement="Do something else", tools=[], data={}
+        )
+        assert await headless.main() == 0
+        assert run_mock.await_count == 2
+
+
+async def test_idle_keeps_serving_the_status(tmp_path):
+    servers = []
+
+    def serve(status):
+        servers.append(serve_status(status, port=0))
+        return servers[-1]
+
+    with (
+        mock.patch.object(headless, "load_task", return_value=None),
+        mock.patch.object(headless, "serve_status", side_effect=serve),
+    ):
+        main = asyncio.create_task(headless.main())
+        await asyncio.sleep(0.1)
+        async with httpx.AsyncClient() as http_client:
+            response = await http_client.get(
+                f"http://127.0.0.1:{servers[0].server_port}/status"
+            )
+        assert not main.done()
+        main.cancel()
+        servers[0].shutdown()
+    assert response.json()["state"] == "idle"
@@ -0,0 +1,43 @@
+import asyncio
+from unittest import mock
+
+import httpx
+
+from computer_use_demo.heartbeat import heartbeat, heartbeat_url
+
+
+def test_heartbeat_url():
+    assert (
+        heartbeat_url("http://overseer:8000/", "a8s-claude-1")
+        == "http://overseer:8000/deployments/a8s-claude-1/heartbeat"
+    )
+    assert heartbeat_url("", "a8s-claude-1") is None
+    assert heartbeat_url("http://overseer:8000", "") is None
+
+
+async def test_heartbeat_while_running():
+    url = "http://overseer:8000/deployments/a8s-claude-1/heartbeat"
+    retried = asyncio.Event()
+
+    async def post(url):
+        if post_mock.await_count == 1:
+            raise httpx.ConnectError("refused")
+        retried.set()
+        return httpx.Response(200, request=httpx.Request("POST", url))
+
+    with mock.patch.object(httpx.AsyncClient, "post", side_effect=post) as post_mock:
+        async with heartbeat(url, interval=0.01):
+            await asyncio.wait_for(retried.wait(), timeout=5)
+        sent = post_mock.await_count
+        await asyncio.sleep(0.05)
+
+    # A failed heartbeat does not stop the next ones, and none are sent afterwards
+    assert post_mock.await_count == sent
+    post_mock.assert_awaited_with(url)
+
+
+async def test_heartbeat_outside_overseer():
+    with mock.patch.object(httpx.AsyncClient, "post") as post:
+        async with heartbeat(None):
+            await asyncio.sleep(0)
+    post.assert_not_called()
@@ -0,0 +1,140 @@
+import base64
+from unittest import mock
+
+from anthropic.types import TextBlock
+from anthropic.types.beta import BetaMessage
+
+from computer_use_demo.journal import SessionJournal
+from computer_use_demo.loop import RESTART_TOOL_ERROR, APIProvider, sampling_loop
+
+IMAGE = base64.b64encode(b"\x89PNG fake image").decode()
+
+
+def conversation():
+    return [
+        {"role": "user", "content": "Task"},
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "tool_use", "id": "1", "name": "computer", "input": {}}
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "tool_result",
+                    "tool_use_id": "1",
+                    "content": [
+                        {
+                            "type": "image",
+                            "source": {
+                                "type": "base64",
+                                "media_type": "image/png",
+                                "data": IMAGE,
+                            },
+                        }
+                    ],
+                    "is_error": False,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+        },
+    ]
+
+
+def test_journal_round_trip(tmp_path):
+    messages = conversation()
+    journal = SessionJournal(tmp_path)
+    journal.append(messages[:2])
+    journal.append(messages)
+    journal.append(messages)
+
+    lines = (tmp_path / "messages.jsonl").read_text().splitlines()
+    assert len(lines) == 3
+    assert IMAGE not in lines[2]
+    assert len(list((tmp_path / "blobs").iterdir())) == 1
+
+    loaded = SessionJournal(tmp_path).load()
+    del messages[2]["content"][0]["cache_control"]
+    assert loaded == messages
+
+
+def test_journal_drops_torn_line(tmp_path):
+    journal = SessionJournal(tmp_path)
+    journal.append(conversation()[:2])
+    with (tmp_path / "messages.jsonl").open("a") as f:
+        f.write('{"index": 2, "mess')
+
+    journal = SessionJournal(tmp_path)
+    assert len(journal) == 2
+    journal.append(conversation())
+    assert SessionJournal(tmp_path).load()[2]["role"] == "user"
+
+
+async def test_loop_resumes_from_journal(tmp_path):
+    journal = SessionJournal(tmp_path)
+    # The process stopped while the tool was running
+    journal.append(conversation()[:2])
+
+    client = mock.Mock()
+    client.beta.messages.with_raw_response.create = mock.AsyncMock()
+    client.beta.messages.with_raw_response.create.return_value.parse = mock.AsyncMock()
+    client.beta.messages.with_raw_response.create.return_value.parse.return_value = (
+        mock.Mock(spec=BetaMessage, content=[TextBlock(type="text", text="Done!")])
+    )
+
+    with mock.patch("computer_use_demo.loop.AsyncAnthropic", return_value=client):
+        messages = await sampling_loop(
+            model="test-model",
+            provider=APIProvider.ANTHROPIC,
+            system_prompt_suffix="",
+            messages=[],
+            output_callback=mock.Mock(),
+            tool_output_callback=mock.Mock(),
+            api_response_callback=mock.Mock(),
+            api_key="test-key",
+            tool_version="computer_use_20250124",
+            journal=journal,
+        )
+
+    assert [message["role"] for message in messages] == [
+        "user",
+        "assistant",
+        "user",
+        "assistant",
+    ]
+    assert messages[2]["content"][0]["content"] == RESTART_TOOL_ERROR
+    loaded = SessionJournal(tmp_path).load()
+    assert len(loaded) == 4
+    assert loaded[2]["content"][0]["content"] == RESTART_TOOL_ERROR
+    assert "cache_control" not in loaded[2]["content"][0]
+
+
+async def test_loop_journals_new_conversation(tmp_path):
+    # An empty journal has a length of 0, but must still be written to
+    journal = SessionJournal(tmp_path)
+
+    client = mock.Mock()
+    client.beta.messages.with_raw_response.create = mock.AsyncMock()
+    client.beta.messages.with_raw_response.create.return_value.parse = mock.AsyncMock()
+    client.beta.messages.with_raw_response.create.return_value.parse.return_value = (
+        mock.Mock(spec=BetaMessage, content=[TextBlock(type="text", text="Done!")])
+    )
+
+    with mock.patch("computer_use_demo.loop.AsyncAnthropic", return_value=client):
+        await sampling_loop(
+            model="test-model",
+            provider=APIProvider.ANTHROPIC,
+            system_prompt_suffix="",
+            messages=[{"role": "user", "content": "Hello"}],
+            output_callback=mock.Mock(),
+            tool_output_callback=mock.Mock(),
+            api_response_callback=mock.Mock(),
+            api_key="test-key",
+            tool_version="computer_use_20250124",
+            journal=journal,
+        )
+
+    loaded = SessionJournal(tmp_path).load()
+    assert [message["role"] for message in loaded] == ["user", "assistant"]
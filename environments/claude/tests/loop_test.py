@@ -1,14 +1,29 @@
+import asyncio
+import json
 from unittest import mock
 
+import httpx
 from anthropic.types import TextBlock, ToolUseBlock
-from anthropic.types.beta import BetaMessage, BetaMessageParam, BetaTextBlockParam
+from anthropic.types.beta import (
+    BetaMessage,
+    BetaMessageParam,
+    BetaTextBlockParam,
+    BetaUsage,
+)
 
-from computer_use_demo.loop import APIProvider, sampling_loop
+from computer_use_demo.loop import (
+    APIProvider,
+    SessionUsage,
+    get_client,
+    sampling_loop,
+)
 
 
 async def test_loop():
     client = mock.Mock()
+    client.beta.messages.with_raw_response.create = mock.AsyncMock()
     client.beta.messages.with_raw_response.create.return_value = mock.Mock()
+    client.beta.messages.with_raw_response.create.return_value.parse = mock.AsyncMock()
     client.beta.messages.with_raw_response.create.return_value.parse.side_effect = [
         mock.Mock(
             spec=BetaMessage,
@@ -32,8 +47,8 @@ async def test_loop():
     api_response_callback = mock.Mock()
 
     with mock.patch(
-        "computer_use_demo.loop.Anthropic", return_value=client
-    ), mock.patch(
+        "computer_use_demo.loop.AsyncAnthropic", return_value=client
+    ) as anthropic_cls, mock.patch(
         "computer_use_demo.loop.ToolCollection", return_value=tool_collection
     ):
         messages: list[BetaMessageParam] = [{"role": "user", "content": "Test message"}]
@@ -56,6 +71,7 @@ async def test_loop():
         assert result[3]["role"] == "assistant"
 
         assert client.beta.messages.with_raw_response.create.call_count == 2
+        anthropic_cls.assert_called_once()
         tool_collection.run.assert_called_once_with(
             name="computer", tool_input={"action": "test"}
         )
@@ -65,3 +81,274 @@ async def test_loop():
         assert output_callback.call_count == 3
         assert tool_output_callback.call_count == 1
         assert api_response_callback.call_count == 2
+
+
+async def test_get_client_is_shared_per_provider_and_key():
+    with mock.patch("computer_use_demo.loop.AsyncAnthropic") as anthropic_cls:
+        anthropic_cls.side_effect = lambda **kwargs: mock.Mock()
+        first = get_client(APIProvider.ANTHROPIC, "key-1")
+        assert get_client(APIProvider.ANTHROPIC, "key-1") is first
+        assert get_client(APIProvider.ANTHROPIC, "key-2") is not first
+        assert anthropic_cls.call_count == 2
+        assert anthropic_cls.call_args.kwargs["http_client"] is not None
+
+
+async def test_loop_does_not_block_event_loop():
+    ticks = 0
+
+    async def slow_create(**kwargs):
+        await asyncio.sleep(0.05)
+        response = mock.Mock()
+        response.parse = mock.AsyncMock()
+        response.parse.return_value = mock.Mock(
+            spec=BetaMessage, content=[TextBlock(type="text", text="Done!")]
+        )
+        return response
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    client = mock.Mock()
+    client.beta.messages.with_raw_response.create = slow_create
+
+    with mock.patch("computer_use_demo.loop.AsyncAnthropic", return_value=client):
+        ticking = asyncio.create_task(ticker())
+        await sampling_loop(
+            model="test-model",
+            provider=APIProvider.ANTHROPIC,
+            system_prompt_suffix="",
+            messages=[{"role": "user", "content": "Test message"}],
+            output_callback=mock.Mock(),
+            tool_output_callback=mock.Mock(),
+            api_response_callback=mock.Mock(),
+            api_key="test-key",
+            tool_version="computer_use_20250124",
+        )
+        ticking.cancel()
+
+    assert ticks > 1
+
+
+class FakeStream:
+    def __init__(self, events, final_message, order):
+        self.events = events
+        self.final_message = final_message
+        self.order = order
+        self.response = httpx.Response(
+            200, request=httpx.Request("POST", "https://api.anthropic.com/v1/messages")
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def __aiter__(self):
+        for event in self.events:
+            yield event
+            # Give dispatched tools a chance to start before the stream goes on
+            await asyncio.sleep(0.01)
+        self.order.append("stream end")
+
+    async def get_final_message(self):
+        return self.final_message
+
+
+async def test_loop_streaming_dispatches_tools_early():
+    order = []
+    tool_use = ToolUseBlock(
+        type="tool_use", id="1", name="computer", input={"action": "test"}
+    )
+    first = FakeStream(
+        [
+            mock.Mock(type="text", text="Hello\n\nWor"),
+            mock.Mock(type="text", text="ld"),
+            mock.Mock(
+                type="content_block_stop",
+                content_block=TextBlock(type="text", text="Hello\n\nWorld"),
+            ),
+            mock.Mock(type="content_block_stop", content_block=tool_use),
+            mock.Mock(type="message_delta"),
+        ],
+        mock.Mock(
+            spec=BetaMessage,
+            content=[TextBlock(type="text", text="Hello\n\nWorld"), tool_use],
+        ),
+        order,
+    )
+    second = FakeStream(
+        [
+            mock.Mock(type="text", text="Done!"),
+            mock.Mock(
+                type="content_block_stop",
+                content_block=TextBlock(type="text", text="Done!"),
+            ),
+        ],
+        mock.Mock(spec=BetaMessage, content=[TextBlock(type="text", text="Done!")]),
+        order,
+    )
+    client = mock.Mock()
+    client.beta.messages.stream.side_effect = [first, second]
+
+    async def run_tool(**kwargs):
+        order.append("tool")
+        return mock.Mock(output="Tool output", error=None, base64_image=None)
+
+    tool_collection = mock.Mock()
+    tool_collection.run = mock.AsyncMock(side_effect=run_tool)
+
+    output_callback = mock.Mock()
+    api_response_callback = mock.Mock()
+    timing_callback = mock.Mock()
+
+    with mock.patch(
+        "computer_use_demo.loop.AsyncAnthropic", return_value=client
+    ), mock.patch(
+        "computer_use_demo.loop.ToolCollection", return_value=tool_collection
+    ):
+        result = await sampling_loop(
+            model="test-model",
+            provider=APIProvider.ANTHROPIC,
+            system_prompt_suffix="",
+            messages=[{"role": "user", "content": "Test message"}],
+            output_callback=output_callback,
+            tool_output_callback=mock.Mock(),
+            api_response_callback=api_response_callback,
+            api_key="test-key",
+            tool_version="computer_use_20250124",
+            stream=True,
+            timing_callback=timing_callback,
+        )
+
+    assert order[:2] == ["tool", "stream end"]
+    assert len(result) == 4
+    assert result[2]["content"][0]["tool_use_id"] == "1"
+    assert [call.args[0] for call in output_callback.call_args_list] == [
+        {"type": "text", "text": "Hello\n\n"},
+        {"type": "text", "text": "World"},
+        tool_use.model_dump(),
+        {"type": "text", "text": "Done!"},
+    ]
+    # The callback gets the HTTP response of each stream, as without streaming
+    assert [call.args[:2] for call in api_response_callback.call_args_list] == [
+        (first.response.request, first.response),
+        (second.response.request, second.response),
+    ]
+    first_turn = timing_callback.call_args_list[0].args[0]
+    assert first_turn.first_token <= first_turn.first_action <= first_turn.response
+
+
+async def test_loop_usage_accounting(tmp_path):
+    def raw_response(content, **usage):
+        raw = mock.Mock()
+        raw.http_response.request = httpx.Request(
+            "POST", "https://api.anthropic.com/v1/messages", content=b"x" * 100
+        )
+        raw.parse = mock.AsyncMock()
+        raw.parse.return_value = mock.Mock(
+            spec=BetaMessage,
+            content=content,
+            usage=BetaUsage(**usage),
+        )
+        return raw
+
+    client = mock.Mock()
+    client.beta.messages.with_raw_response.create = mock.AsyncMock(
+        side_effect=[
+            raw_response(
+                [ToolUseBlock(type="tool_use", id="1", name="bash", input={})],
+                input_tokens=10,
+                output_tokens=5,
+                cache_creation_input_tokens=1000,
+                cache_read_input_tokens=0,
+            ),
+            raw_response(
+                [TextBlock(type="text", text="Done!")],
+                input_tokens=20,
+                output_tokens=3,
+                cache_creation_input_tokens=50,
+                cache_read_input_tokens=1000,
+            ),
+        ]
+    )
+    tool_collection = mock.AsyncMock()
+    tool_collection.run.return_value = mock.Mock(
+        output="Tool output", error=None, base64_image=None
+    )
+    usage_callback = mock.Mock()
+    session_usage = SessionUsage()
+    usage_log = tmp_path / "usage.jsonl"
+
+    with mock.patch(
+        "computer_use_demo.loop.AsyncAnthropic", return_value=client
+    ), mock.patch(
+        "computer_use_demo.loop.ToolCollection", return_value=tool_collection
+    ):
+        await sampling_loop(
+            model="test-model",
+            provider=APIProvider.ANTHROPIC,
+            system_prompt_suffix="",
+            messages=[{"role": "user", "content": "Test message"}],
+            output_callback=mock.Mock(),
+            tool_output_callback=mock.Mock(),
+            api_response_callback=mock.Mock(),
+            api_key="test-key",
+            tool_version="computer_use_20250124",
+            usage_callback=usage_callback,
+            usage_log=usage_log,
+            session_usage=session_usage,
+        )
+
+    assert usage_callback.call_count == 2
+    first_turn = usage_callback.call_args_list[0].args[0]
+    assert first_turn.turn == 1
+    assert first_turn.cache_creation_input_tokens == 1000
+    assert first_turn.request_bytes == 100
+    assert list(first_turn.tool_seconds) == ["1"]
+    assert session_usage.turns == 2
+    assert session_usage.output_tokens == 8
+    assert session_usage.cache_read_input_tokens == 1000
+    assert session_usage.cache_hit_rate == 1000 / 2080
+
+    records = [json.loads(line) for line in usage_log.read_text().splitlines()]
+    assert [record["turn"] for record in records] == [1, 2]
+    assert records[1]["session"]["turns"] == 2
+    assert records[1]["timing"]["response"] is not None
+
+
+async def test_loop_sends_only_selected_tools():
+    client = mock.Mock()
+    client.beta.messages.with_raw_response.create = mock.AsyncMock()
+    client.beta.messages.with_raw_response.create.return_value.parse = mock.AsyncMock()
+    client.beta.messages.with_raw_response.create.return_value.parse.return_value = (
+        mock.Mock(spec=BetaMessage, content=[TextBlock(type="text", text="Done!")])
+    )
+
+    with mock.patch(
+        "computer_use_demo.loop.AsyncAnthropic", return_value=client
+    ), mock.patch(
+        "computer_use_demo.tools.computer.BaseComputerTool.__init__"
+    ) as computer_init:
+        await sampling_loop(
+            model="test-model",
+            provider=APIProvider.ANTHROPIC,
+            system_prompt_suffix="",
+            messages=[{"role": "user", "content": "Test message"}],
+            output_callback=mock.Mock(),
+            tool_output_callback=mock.Mock(),
+            api_response_callback=mock.Mock(),
+            api_key="test-key",
+            tool_version="computer_use_20250124",
+            tools=["bash", "edit"],
+        )
+
+    computer_init.assert_not_called()
+    request = client.beta.messages.with_raw_response.create.call_args.kwargs
+    assert [tool["name"] for tool in request["tools"]] == [
+        "str_replace_editor",
+        "bash",
+    ]
@@ -0,0 +1,80 @@
+import base64
+import io
+
+from PIL import Image, ImageDraw
+
+from computer_use_demo.context import SCREENSHOT_OMITTED
+from computer_use_demo.screenshots import ScreenshotDeduplicator, fingerprint
+
+
+def screenshot(text=""):
+    image = Image.new("RGB", (1024, 768), "white")
+    ImageDraw.Draw(image).text((100, 100), text, fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def tool_result(tool_use_id, image):
+    return {
+        "type": "tool_result",
+        "tool_use_id": tool_use_id,
+        "content": [
+            {"type": "text", "text": "done"},
+            {
+                "type": "image",
+                "source": {"type": "base64", "media_type": "image/png", "data": image},
+            },
+        ],
+        "is_error": False,
+    }
+
+
+def test_fingerprint():
+    assert fingerprint(screenshot()) == fingerprint(screenshot())
+    assert fingerprint(screenshot()) != fingerprint(screenshot("a"))
+    assert fingerprint("not an image") is None
+
+
+def test_dedupe_unchanged_screens():
+    messages = [
+        {"role": "user", "content": "Task"},
+        {"role": "user", "content": [tool_result("1", screenshot())]},
+    ]
+    screenshots = ScreenshotDeduplicator(messages)
+
+    second = screenshots.dedupe(tool_result("2", screenshot()))
+    assert second["content"] == [
+        {"type": "text", "text": "done"},
+        {"type": "text", "text": "[screen unchanged since step 1]"},
+    ]
+
+    # A typed character is a change
+    third = screenshots.dedupe(tool_result("3", screenshot("a")))
+    assert third["content"][1]["type"] == "image"
+
+    fourth = screenshots.dedupe(tool_result("4", screenshot("a")))
+    assert fourth["content"][1]["text"] == "[screen unchanged since step 3]"
+
+
+def test_dedupe_keeps_screen_after_reference_is_compacted():
+    first = tool_result("1", screenshot())
+    messages = [
+        {"role": "user", "content": "Task"},
+        {"role": "user", "content": [first]},
+    ]
+    screenshots = ScreenshotDeduplicator(messages)
+
+    # Within a response, the reference need not be in the conversation yet
+    second = screenshots.dedupe(tool_result("2", screenshot("a")))
+    third = screenshots.dedupe(tool_result("3", screenshot("a")))
+    assert third["content"][1]["text"] == "[screen unchanged since step 2]"
+    messages.append({"role": "user", "content": [second, third]})
+
+    # The screenshot of step 2 is dropped to save context
+    second["content"][1] = {"type": "text", "text": SCREENSHOT_OMITTED}
+    fourth = screenshots.dedupe(tool_result("4", screenshot("a")))
+    assert fourth["content"][1]["type"] == "image"
+
+    fifth = screenshots.dedupe(tool_result("5", screenshot("a")))
+    assert fifth["content"][1]["text"] == "[screen unchanged since step 4]"
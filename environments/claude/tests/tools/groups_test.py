@@ -0,0 +1,27 @@
+from computer_use_demo.tools import TOOL_GROUPS_BY_VERSION, select_tools, tool_name
+from computer_use_demo.tools.bash import BashTool20250124
+from computer_use_demo.tools.edit import EditTool20250124
+
+TOOL_GROUP = TOOL_GROUPS_BY_VERSION["computer_use_20250124"]
+
+
+def test_select_tools():
+    assert select_tools(TOOL_GROUP, ["bash", "edit"]) == [
+        EditTool20250124,
+        BashTool20250124,
+    ]
+    assert select_tools(TOOL_GROUP, ["str_replace_editor"]) == [EditTool20250124]
+
+
+def test_select_tools_without_known_tools_gets_all():
+    assert select_tools(TOOL_GROUP, None) == TOOL_GROUP.tools
+    assert select_tools(TOOL_GROUP, []) == TOOL_GROUP.tools
+    assert select_tools(TOOL_GROUP, ["web-search"]) == TOOL_GROUP.tools
+
+
+def test_tool_name():
+    assert [tool_name(tool) for tool in TOOL_GROUP.tools] == [
+        "computer",
+        "str_replace_editor",
+        "bash",
+    ]
@@ -0,0 +1,83 @@
+import asyncio
+from unittest import mock
+
+from computer_use_demo.tools.scheduler import ToolScheduler, conflicts, tool_accesses
+
+
+def test_conflicts():
+    def accesses(name, **tool_input):
+        return tool_accesses(name, tool_input)
+
+    view = accesses("str_replace_editor", command="view", path="/tmp/a.txt")
+    write = accesses(
+        "str_replace_editor", command="create", path="/tmp/a.txt", file_text=""
+    )
+    other_write = accesses(
+        "str_replace_editor", command="create", path="/tmp/b.txt", file_text=""
+    )
+    view_dir = accesses("str_replace_editor", command="view", path="/tmp/")
+    screenshot = accesses("computer", action="screenshot")
+    bash = accesses("bash", command="ls")
+
+    assert not conflicts(view, view)
+    assert not conflicts(view, other_write)
+    assert not conflicts(write, other_write)
+    assert not conflicts(write, screenshot)
+    assert conflicts(view, write)
+    assert conflicts(write, write)
+    assert conflicts(view_dir, other_write)
+    assert conflicts(screenshot, screenshot)
+    assert conflicts(bash, view)
+    assert conflicts(bash, screenshot)
+    assert conflicts(accesses("unknown"), view)
+
+
+async def test_scheduler_runs_independent_calls_concurrently_in_order():
+    events = []
+
+    async def run(*, name, tool_input):
+        events.append(f"start {tool_input['id']}")
+        await asyncio.sleep(0.01)
+        events.append(f"end {tool_input['id']}")
+        return tool_input["id"]
+
+    scheduler = ToolScheduler(mock.Mock(run=run))
+    tasks = [
+        scheduler.submit("computer", {"id": 1, "action": "left_click"}),
+        scheduler.submit(
+            "str_replace_editor", {"id": 2, "command": "view", "path": "/a"}
+        ),
+        scheduler.submit(
+            "str_replace_editor", {"id": 3, "command": "view", "path": "/a"}
+        ),
+        scheduler.submit("computer", {"id": 4, "action": "screenshot"}),
+        scheduler.submit(
+            "str_replace_editor",
+            {"id": 5, "command": "str_replace", "path": "/a", "old_str": "x"},
+        ),
+    ]
+
+    assert [await task for task in tasks] == [1, 2, 3, 4, 5]
+    # The click, both views and nothing else start right away
+    assert events[:3] == ["start 1", "start 2", "start 3"]
+    # The screenshot waits for the click, the write for both views
+    assert events.index("start 4") > events.index("end 1")
+    assert events.index("start 5") > max(events.index("end 2"), events.index("end 3"))
+
+
+async def test_scheduler_cancel():
+    started = asyncio.Event()
+
+    async def run(*, name, tool_input):
+        started.set()
+        await asyncio.sleep(10)
+
+    scheduler = ToolScheduler(mock.Mock(run=run))
+    first = scheduler.submit("computer", {"action": "left_click"})
+    second = scheduler.submit("computer", {"action": "screenshot"})
+    await started.wait()
+    scheduler.cancel()
+
+    await asyncio.wait([first, second])
+    assert first.cancelled()
+    assert second.cancelled()
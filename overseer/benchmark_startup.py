@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+"""
+Startup benchmark for the Overseer service.
+
+This script:
+1. Profiles the import of the application with ``python -X importtime``
+2. Reports the slowest modules and checks that heavy packages load lazily
+3. Starts the service and measures the time until the health check answers
+4. Reports the resident memory of the started service
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+# Packages that must not be imported when the application is imported
+LAZY_PACKAGES = ["kubernetes"]
+
+APP_MODULE = "overseer.main"
+
+
+def profile_import(module: str) -> Tuple[float, Dict[str, float], List[str]]:
+    """Import a module in a fresh interpreter with import time profiling.
+
+    Args:
+        module: The module to import.
+
+    Returns:
+        The total import time in seconds, the cumulative import time in seconds
+        of every module it imported, and the lazy packages that were imported.
+    """
+    check = f"import sys, {module}; print(','.join(p for p in {LAZY_PACKAGES!r} if p in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+
+    cumulative: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(total) / 1e6
+
+    loaded = [package for package in result.stdout.strip().split(",") if package]
+    return cumulative.get(module, 0.0), cumulative, loaded
+
+
+def free_port() -> int:
+    """Find a free local TCP port.
+
+    Returns:
+        The port number.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mib(pid: int) -> Optional[float]:
+    """Get the resident memory of a process.
+
+    Args:
+        pid: The process ID.
+
+    Returns:
+        The resident memory in MiB, or None where /proc is not available.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def time_to_health(timeout: float = 30.0) -> Tuple[float, Optional[float], Dict]:
+    """Start the service and wait for its health check to answer.
+
+    Args:
+        timeout: Seconds to wait for the health check.
+
+    Returns:
+        Seconds from process start to the first successful health check, the
+        resident memory of the service in MiB, and the health check response.
+    """
+    port = free_port()
+    started = time.monotonic()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{APP_MODULE}:app", "--port", str(port), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.monotonic() - started < timeout:
+            try:
+                response = httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0)
+                if response.status_code == 200:
+                    return time.monotonic() - started, rss_mib(process.pid), response.json()
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"Service exited with code {process.returncode}")
+            time.sleep(0.01)
+        raise TimeoutError(f"Health check did not answer within {timeout:g}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main() -> int:
+    """Run the startup benchmark.
+
+    Returns:
+        Exit code; 1 if a lazily loaded package was imported at startup.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the startup of the Overseer service.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of runs (default: 5)")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show (default: 15)")
+    parser.add_argument("--no-serve", action="store_true", help="Only profile the import")
+    args = parser.parse_args()
+
+    import_times = []
+    for _ in range(args.runs):
+        total, cumulative, loaded = profile_import(APP_MODULE)
+        import_times.append(total)
+
+    print(f"Import of {APP_MODULE}: median {statistics.median(import_times) * 1000:.0f} ms over {args.runs} runs")
+    print("Slowest imports (cumulative, last run):")
+    for name, seconds in sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+    if not args.no_serve:
+        health_times = []
+        for _ in range(args.runs):
+            seconds, rss, health = time_to_health()
+            health_times.append(seconds)
+        print(f"Time to first health check: median {statistics.median(health_times) * 1000:.0f} ms")
+        if rss is not None:
+            print(f"Resident memory at first health check: {rss:.1f} MiB")
+        print(f"Health check: {health}")
+
+    if loaded:
+        print(f"FAIL: imported at startup although loaded lazily: {', '.join(loaded)}")
+        return 1
+    print(f"OK: {', '.join(LAZY_PACKAGES)} not imported at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
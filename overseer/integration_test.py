@@ -477,6 +477,68 @@ def test_get_deployment_status(deployment_id: str) -> bool:
         return False
 
 
+def test_list_deployments_ndjson(deployment_id: str) -> bool:
+    """Test streaming the deployment list as newline-delimited JSON.
+
+    Args:
+        deployment_id: The deployment ID.
+
+    Returns:
+        True if the test passed, False otherwise.
+    """
+    print_step("Testing streaming deployment list endpoint")
+    try:
+        with httpx.stream(
+            "GET",
+            f"{OVERSEER_URL}/deployments/all",
+            headers={"Accept": "application/x-ndjson"},
+        ) as response:
+            if response.status_code != 200:
+                print_error(f"Streaming deployment list failed with status code {response.status_code}")
+                return False
+            
+            if not response.headers.get("content-type", "").startswith("application/x-ndjson"):
+                print_error(f"Unexpected content type: {response.headers.get('content-type')}")
+                return False
+            
+            ids = [json.loads(line)["id"] for line in response.iter_lines() if line]
+        
+        if deployment_id not in ids:
+            print_error(f"Deployment {deployment_id} missing from streamed list: {ids}")
+            return False
+        
+        print_success(f"Streaming deployment list passed: {len(ids)} deployments")
+        return True
+    except Exception as e:
+        print_error(f"Error testing streaming deployment list: {e}")
+        return False
+
+
+def test_fleet_stats() -> bool:
+    """Test the fleet statistics endpoint.
+
+    Returns:
+        True if the test passed, False otherwise.
+    """
+    print_step("Testing fleet statistics endpoint")
+    try:
+        response = httpx.get(f"{OVERSEER_URL}/deployments/stats")
+        if response.status_code != 200:
+            print_error(f"Fleet statistics failed with status code {response.status_code}")
+            return False
+        
+        data = response.json()
+        if data["total"] < 1 or data["by_environment_type"].get("claude", 0) < 1:
+            print_error(f"Fleet statistics do not count the test deployment: {data}")
+            return False
+        
+        print_success(f"Fleet statistics passed: {data}")
+        return True
+    except Exception as e:
+        print_error(f"Error testing fleet statistics: {e}")
+        return False
+
+
 def wait_for_deployment_running(deployment_id: str, timeout: int = TEST_TIMEOUT) -> bool:
     """Wait for a deployment to be running.
 
@@ -621,6 +683,14 @@ def run_integration_tests() -> bool:
     if not test_get_deployment_status(deployment_id):
         return False
     
+    # Test streaming deployment list
+    if not test_list_deployments_ndjson(deployment_id):
+        return False
+    
+    # Test fleet statistics
+    if not test_fleet_stats():
+        return False
+    
     # Wait for deployment to be running
     if not wait_for_deployment_running(deployment_id):
         # Clean up even if the test fails
@@ -2,39 +2,286 @@
 Deployment API endpoints.
 """
 
+import asyncio
 import logging
-import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
-
-from fastapi import APIRouter, Depends, HTTPException, status
-
-from overseer.k8s.client import KubernetesClient
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Union
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from overseer.environments import get_environment_registry
+from overseer.k8s.client import (
+    CALLBACK_EVENTS_ANNOTATION,
+    CALLBACK_URL_ANNOTATION,
+    FROM_SNAPSHOT_ANNOTATION,
+    OWNER_ANNOTATION,
+)
+from overseer.k8s.shards import (
+    NoCapacityError,
+    ShardedKubernetesClient,
+    load_shard_configs,
+)
+from overseer.k8s.task import TaskPayloadTooLarge
 from overseer.models.deployment import (
     DeploymentConnectionResponse,
+    DeploymentDataUpdate,
     DeploymentRequest,
     DeploymentResponse,
     DeploymentStatus,
     DeploymentStatusResponse,
 )
+from overseer.quotas import (
+    DEFAULT_OWNER,
+    AdmissionTimeout,
+    QuotaExceeded,
+    admission,
+    quota_manager,
+    resource_requests,
+)
+from overseer.snapshots import snapshot_store
+from overseer.stats import fleet_stats
+from overseer.webhooks import webhook_dispatcher
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/deployments", tags=["deployments"])
 
-# In-memory storage for deployments (in a production environment, this would be a database)
+# In-memory storage for deployments, rebuilt from the annotated Kubernetes objects
+# by restore_deployments (in a production environment, this would be a database)
 deployments: Dict[str, DeploymentResponse] = {}
 
-BASE_DOMAIN = os.getenv("BASE_DOMAIN", "cluster.local")
+STATUS_MESSAGES: Dict[DeploymentStatus, str] = {
+    DeploymentStatus.RUNNING: "Deployment is running",
+    DeploymentStatus.CREATING: "Deployment is being created",
+    DeploymentStatus.PAUSED: "Deployment is paused",
+    DeploymentStatus.FAILED: "Deployment failed",
+    DeploymentStatus.TERMINATED: "Deployment has been terminated",
+}
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Maximum time to wait for a resumed deployment to become ready when measuring resume latency
+RESUME_TIMEOUT_SECONDS = 600
+
+# Background tasks measuring resume latency (kept referenced until they finish)
+_resume_tasks: Set[asyncio.Task] = set()
 
 
-def get_k8s_client() -> KubernetesClient:
+# Created on first use, see get_k8s_client
+_k8s_client: Optional[ShardedKubernetesClient] = None
+_k8s_client_lock = threading.Lock()
+
+
+def get_k8s_client() -> ShardedKubernetesClient:
     """Get the Kubernetes client.
 
+    The client is shared by all requests so that state such as the shared
+    ingress route table and shard load lives for the lifetime of the process.
+    Creating it imports the kubernetes package and contacts every shard, so it
+    blocks and must not be called from the event loop directly.
+
     Returns:
-        A Kubernetes client instance.
+        A Kubernetes client instance routing to all configured shards.
     """
-    return KubernetesClient()
+    global _k8s_client
+
+    if _k8s_client is None:
+        with _k8s_client_lock:
+            if _k8s_client is None:
+                _k8s_client = ShardedKubernetesClient(load_shard_configs())
+    return _k8s_client
+
+
+def k8s_client_initialized() -> bool:
+    """Whether the Kubernetes client has been created."""
+    return _k8s_client is not None
+
+
+def set_status(deployment: DeploymentResponse, new_status: DeploymentStatus) -> None:
+    """Change the status of a stored deployment, record the transition and notify its callback.
+
+    Args:
+        deployment: The stored deployment.
+        new_status: The status the deployment has now.
+    """
+    old_status = deployment.status
+    deployment.status = new_status
+    if old_status == new_status:
+        return
+    if new_status == DeploymentStatus.RUNNING and deployment.ready_seconds is None:
+        created_at = datetime.fromisoformat(deployment.created_at)
+        deployment.ready_seconds = round((datetime.utcnow() - created_at).total_seconds(), 3)
+    fleet_stats.transition(deployment.id, deployment.environment_type, old_status, new_status)
+    quota_manager.transition(deployment.id, new_status)
+    webhook_dispatcher.notify(
+        deployment.id,
+        deployment.environment_type,
+        old_status,
+        new_status,
+        STATUS_MESSAGES.get(new_status),
+    )
+
+
+def refresh_deployment(
+    deployment: DeploymentResponse, k8s_client: ShardedKubernetesClient
+) -> DeploymentResponse:
+    """Update a stored deployment with its current status in Kubernetes.
+
+    Args:
+        deployment: The stored deployment.
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        The updated deployment.
+    """
+    # Terminated deployments are gone for good, there is nothing to read back, and
+    # terminating ones are being deleted whatever their pods still report
+    if deployment.status in (DeploymentStatus.TERMINATING, DeploymentStatus.TERMINATED):
+        return deployment
+    
+    k8s_status = k8s_client.get_deployment_status(deployment.id)
+    set_status(deployment, k8s_status)
+    if k8s_status in STATUS_MESSAGES:
+        deployment.message = STATUS_MESSAGES[k8s_status]
+    
+    # Set connection details once the deployment is running
+    if k8s_status == DeploymentStatus.RUNNING and not deployment.connection_details:
+        deployment.connection_details = k8s_client.get_connection_details(
+            deployment.id, deployment.environment_type
+        )
+    
+    return deployment
+
+
+def deployment_annotations(
+    owner: str,
+    from_snapshot: Optional[str] = None,
+    callback_url: Optional[str] = None,
+    callback_events: Optional[Iterable[DeploymentStatus]] = None,
+) -> Dict[str, str]:
+    """Get the annotations recording what a deployment is created with.
+
+    Args:
+        owner: The owner of the deployment.
+        from_snapshot: ID of the snapshot the deployment starts from.
+        callback_url: URL status changes are POSTed to.
+        callback_events: Statuses to send callbacks for (all if not given).
+
+    Returns:
+        The annotations for the Deployment object.
+    """
+    annotations = {OWNER_ANNOTATION: owner}
+    if from_snapshot:
+        annotations[FROM_SNAPSHOT_ANNOTATION] = from_snapshot
+    if callback_url:
+        annotations[CALLBACK_URL_ANNOTATION] = callback_url
+        if callback_events:
+            annotations[CALLBACK_EVENTS_ANNOTATION] = ",".join(
+                sorted(DeploymentStatus(event).value for event in callback_events)
+            )
+    return annotations
+
+
+def restore_deployments(k8s_client: ShardedKubernetesClient) -> int:
+    """Add the deployments found in Kubernetes that are missing from the store.
+
+    Restored deployments count against their owner's quota and in the fleet
+    statistics, and keep their callback subscription. Their idle time starts
+    over, since the last activity is not recorded in Kubernetes.
+
+    Args:
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        The number of restored deployments.
+    """
+    registry = get_environment_registry()
+    restored = 0
+    for managed in k8s_client.list_managed_deployments():
+        if managed.id in deployments:
+            continue
+        annotations = managed.annotations
+        owner = annotations.get(OWNER_ANNOTATION, DEFAULT_OWNER)
+        deployment = DeploymentResponse(
+            id=managed.id,
+            status=managed.status,
+            environment_type=managed.environment_type,
+            owner=owner,
+            from_snapshot=annotations.get(FROM_SNAPSHOT_ANNOTATION),
+            created_at=managed.created_at.isoformat(),
+            last_activity_at=datetime.utcnow().isoformat(),
+            message=STATUS_MESSAGES.get(managed.status),
+        )
+        if managed.status == DeploymentStatus.RUNNING:
+            deployment.connection_details = k8s_client.get_connection_details(
+                managed.id, managed.environment_type
+            )
+        deployments[managed.id] = deployment
+
+        cpu, memory = 0.0, 0.0
+        if managed.environment_type in registry.environments:
+            cpu, memory = resource_requests(registry.get(managed.environment_type))
+        quota_manager.restored(
+            managed.id, owner, cpu, memory, held=managed.status != DeploymentStatus.PAUSED
+        )
+        fleet_stats.restored(managed.id, managed.environment_type, managed.status)
+        if CALLBACK_URL_ANNOTATION in annotations:
+            events = annotations.get(CALLBACK_EVENTS_ANNOTATION)
+            webhook_dispatcher.subscribe(
+                managed.id,
+                annotations[CALLBACK_URL_ANNOTATION],
+                [DeploymentStatus(event) for event in events.split(",")] if events else None,
+            )
+        restored += 1
+    return restored
+
+
+def pause_deployment_by_id(
+    deployment_id: str, k8s_client: ShardedKubernetesClient
+) -> None:
+    """Scale a stored deployment to zero replicas.
+
+    Args:
+        deployment_id: The ID of the deployment.
+        k8s_client: The Kubernetes client.
+    """
+    k8s_client.scale_deployment(deployment_id, replicas=0)
+    deployment = deployments[deployment_id]
+    set_status(deployment, DeploymentStatus.PAUSED)
+    deployment.message = STATUS_MESSAGES[DeploymentStatus.PAUSED]
+    logger.info(f"Paused deployment {deployment_id}")
+
+
+async def _measure_resume(
+    deployment_id: str, started: float, k8s_client: ShardedKubernetesClient
+) -> None:
+    """Wait for a resumed deployment to become ready and record how long it took.
+
+    Args:
+        deployment_id: The ID of the deployment.
+        started: Monotonic time at which the resume was requested.
+        k8s_client: The Kubernetes client.
+    """
+    while time.monotonic() - started < RESUME_TIMEOUT_SECONDS:
+        k8s_status = await run_in_threadpool(k8s_client.get_deployment_status, deployment_id)
+        if k8s_status == DeploymentStatus.RUNNING:
+            resume_seconds = round(time.monotonic() - started, 3)
+            deployment = deployments.get(deployment_id)
+            if deployment:
+                set_status(deployment, DeploymentStatus.RUNNING)
+                deployment.resume_seconds = resume_seconds
+                deployment.last_activity_at = datetime.utcnow().isoformat()
+            logger.info(f"Resumed deployment {deployment_id} in {resume_seconds}s")
+            return
+        if k8s_status != DeploymentStatus.CREATING:
+            logger.warning(f"Stopped waiting for deployment {deployment_id} to resume: {k8s_status}")
+            return
+        await asyncio.sleep(0.5)
+    logger.warning(f"Timed out waiting for deployment {deployment_id} to resume")
 
 
 @router.post(
@@ -42,10 +289,15 @@ def get_k8s_client() -> KubernetesClient:
     response_model=DeploymentResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Create a new deployment",
-    description="Create a new deployment with the specified environment type, tools, data, and requirement.",
+    description=(
+        "Create a new deployment with the specified environment type, tools, data, and requirement. "
+        "The `owner` the deployment counts against for quotas and fair-share admission is taken "
+        "from the request body as given and is not authenticated, so it must come from a trusted "
+        "client or a gateway that sets it."
+    ),
 )
 async def create_deployment(
-    request: DeploymentRequest, k8s_client: KubernetesClient = Depends(get_k8s_client)
+    request: DeploymentRequest, k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
 ) -> DeploymentResponse:
     """Create a new deployment.
 
@@ -56,32 +308,99 @@ async def create_deployment(
     Returns:
         The deployment response.
     """
+    # Check the environment type and its tools before touching the cluster
+    registry = get_environment_registry()
     try:
-        # Create deployment in Kubernetes
-        deployment_id, connection_details = k8s_client.create_deployment(
-            environment_type=request.environment_type,
-            tools=request.tools,
-            data=request.data,
-            requirement=request.requirement,
-            ttl_seconds=request.ttl_seconds or 3600,
+        registry.validate_tools(request.environment_type, request.tools)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
         )
+
+    # A snapshot can only be restored into the environment type it was taken of
+    snapshot_url = None
+    if request.from_snapshot:
+        snapshot = snapshot_store.get(request.from_snapshot)
+        if snapshot is None or snapshot.environment_type != request.environment_type:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"No snapshot {request.from_snapshot} of environment type {request.environment_type!r}",
+            )
+        snapshot_url = snapshot_store.archive_url(snapshot.id)
+
+    # Hold the owner's quota from now on, so queued requests cannot overshoot it
+    owner = request.owner or DEFAULT_OWNER
+    cpu, memory = resource_requests(registry.get(request.environment_type))
+    try:
+        quota_manager.reserve(owner, cpu, memory)
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+        )
+
+    try:
+        # Create deployment in Kubernetes once admitted
+        async with admission.admit(owner):
+            deployment_id, connection_details = await run_in_threadpool(
+                k8s_client.create_deployment,
+                environment_type=request.environment_type,
+                tools=request.tools,
+                data=request.data,
+                requirement=request.requirement,
+                ttl_seconds=request.ttl_seconds or 3600,
+                snapshot_url=snapshot_url,
+                annotations=deployment_annotations(
+                    owner, request.from_snapshot, request.callback_url, request.callback_events
+                ),
+            )
+        quota_manager.created(deployment_id, owner, cpu, memory)
         
         # Create deployment response
         deployment = DeploymentResponse(
             id=deployment_id,
             status=DeploymentStatus.CREATING,
             environment_type=request.environment_type,
+            owner=owner,
+            from_snapshot=request.from_snapshot,
             created_at=datetime.utcnow().isoformat(),
+            last_activity_at=datetime.utcnow().isoformat(),
             connection_details=None,  # Will be updated when deployment is ready
             message="Deployment is being created",
         )
         
         # Store deployment in memory
         deployments[deployment_id] = deployment
+        fleet_stats.created(deployment_id, request.environment_type)
+        if request.callback_url:
+            webhook_dispatcher.subscribe(
+                deployment_id, request.callback_url, request.callback_events
+            )
+            webhook_dispatcher.notify(
+                deployment_id,
+                request.environment_type,
+                None,
+                DeploymentStatus.CREATING,
+                deployment.message,
+            )
         
         return deployment
         
+    except TaskPayloadTooLarge as e:
+        quota_manager.cancel(owner, cpu, memory)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+    except (NoCapacityError, AdmissionTimeout) as e:
+        quota_manager.cancel(owner, cpu, memory)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+        )
     except Exception as e:
+        quota_manager.cancel(owner, cpu, memory)
         logger.error(f"Error creating deployment: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -92,49 +411,73 @@ async def create_deployment(
     "/all",
     response_model=List[DeploymentResponse],
     summary="Get all deployments.",
-    description="Get a list of all deployments with optional status filter.",
+    description=(
+        "Get a list of all deployments with optional status filter. Send "
+        f"`Accept: {NDJSON_MEDIA_TYPE}` to stream one deployment per line instead."
+    ),
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
 )
 async def get_all_deployments(
+    request: Request,
     status: Optional[DeploymentStatus] = None,
-    k8s_client: KubernetesClient = Depends(get_k8s_client)
-) -> List[DeploymentResponse]:
+    k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
+) -> Union[List[DeploymentResponse], StreamingResponse]:
     """Get all deployments.
 
     Args:
+        request: The HTTP request, used to negotiate the response format.
         status: Optional status filter
         k8s_client: The Kubernetes client.
 
     Returns:
-        List of deployment responses.
+        List of deployment responses, or a stream of newline-delimited JSON
+        deployments if requested.
     """
-    result = []
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(
+            _stream_deployments(status, k8s_client), media_type=NDJSON_MEDIA_TYPE
+        )
     
-    for deployment_id, deployment in deployments.items():
-        # Update status from Kubernetes
-        k8s_status = k8s_client.get_deployment_status(deployment_id)
-        deployment.status = k8s_status
+    return [deployment async for deployment in _refreshed_deployments(status, k8s_client)]
+
+
+async def _refreshed_deployments(
+    status_filter: Optional[DeploymentStatus], k8s_client: ShardedKubernetesClient
+) -> AsyncIterator[DeploymentResponse]:
+    """Refresh the deployments from Kubernetes in the threadpool, one at a time.
+
+    Args:
+        status_filter: Optional status filter.
+        k8s_client: The Kubernetes client.
+
+    Yields:
+        The refreshed deployments matching the filter.
+    """
+    # Iterate over a snapshot of the IDs, the store may change while we are listing
+    for deployment_id in list(deployments):
+        deployment = deployments.get(deployment_id)
+        if deployment is None:
+            continue
+        await run_in_threadpool(refresh_deployment, deployment, k8s_client)
+        if not status_filter or deployment.status == status_filter:
+            yield deployment
+
+
+async def _stream_deployments(
+    status_filter: Optional[DeploymentStatus], k8s_client: ShardedKubernetesClient
+) -> AsyncIterator[str]:
+    """Yield deployments as newline-delimited JSON, one at a time as they are refreshed.
+
+    Args:
+        status_filter: Optional status filter.
+        k8s_client: The Kubernetes client.
+
+    Yields:
+        One JSON-encoded deployment per line.
+    """
+    async for deployment in _refreshed_deployments(status_filter, k8s_client):
+        yield deployment.model_dump_json() + "\n"
 
-        # Update message based on status
-        if k8s_status == DeploymentStatus.RUNNING:
-            deployment.message = "Deployment is running"
-            if not deployment.connection_details:
-                deployment.connection_details = {
-                    "service_url": f"http://{deployment_id}.{k8s_client.namespace}.svc.cluster.local",
-                    "ingress_host": f"{deployment_id}.{BASE_DOMAIN}",
-                    "novnc_port": "6080",
-                }
-        elif k8s_status == DeploymentStatus.CREATING:
-            deployment.message = "Deployment is being created"
-        elif k8s_status == DeploymentStatus.FAILED:
-            deployment.message = "Deployment failed"
-        elif k8s_status == DeploymentStatus.TERMINATED:
-            deployment.message = "Deployment has been terminated"
-
-        # Add to result if status matches filter or no filter
-        if not status or deployment.status == status:
-            result.append(deployment)
-
-    return result
 
 @router.get(
     "/{deployment_id}",
@@ -143,7 +486,7 @@ async def get_all_deployments(
     description="Get details for a specific deployment.",
 )
 async def get_deployment(
-    deployment_id: str, k8s_client: KubernetesClient = Depends(get_k8s_client)
+    deployment_id: str, k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
 ) -> DeploymentResponse:
     """Get deployment details.
 
@@ -161,31 +504,8 @@ async def get_deployment(
             detail=f"Deployment {deployment_id} not found",
         )
     
-    # Get deployment from memory
-    deployment = deployments[deployment_id]
-    
-    # Update status from Kubernetes
-    k8s_status = k8s_client.get_deployment_status(deployment_id)
-    deployment.status = k8s_status
-    
-    # Update message based on status
-    if k8s_status == DeploymentStatus.RUNNING:
-        deployment.message = "Deployment is running"
-        # Update connection details if not already set
-        if not deployment.connection_details:
-            deployment.connection_details = {
-                "service_url": f"http://{deployment_id}.{k8s_client.namespace}.svc.cluster.local",
-                "ingress_host": f"{deployment_id}.example.com",  # This would be configured based on your ingress setup
-                "novnc_port": "6080",
-            }
-    elif k8s_status == DeploymentStatus.CREATING:
-        deployment.message = "Deployment is being created"
-    elif k8s_status == DeploymentStatus.FAILED:
-        deployment.message = "Deployment failed"
-    elif k8s_status == DeploymentStatus.TERMINATED:
-        deployment.message = "Deployment has been terminated"
-    
-    return deployment
+    # Get deployment from memory and update its status from Kubernetes
+    return await run_in_threadpool(refresh_deployment, deployments[deployment_id], k8s_client)
 
 
 @router.get(
@@ -195,7 +515,7 @@ async def get_deployment(
     description="Get the status of a specific deployment.",
 )
 async def get_deployment_status(
-    deployment_id: str, k8s_client: KubernetesClient = Depends(get_k8s_client)
+    deployment_id: str, k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
 ) -> DeploymentStatusResponse:
     """Get deployment status.
 
@@ -213,29 +533,13 @@ async def get_deployment_status(
             detail=f"Deployment {deployment_id} not found",
         )
     
-    # Get deployment from memory
-    deployment = deployments[deployment_id]
-    
-    # Update status from Kubernetes
-    k8s_status = k8s_client.get_deployment_status(deployment_id)
-    deployment.status = k8s_status
-    
-    # Update message based on status
-    if k8s_status == DeploymentStatus.RUNNING:
-        message = "Deployment is running"
-    elif k8s_status == DeploymentStatus.CREATING:
-        message = "Deployment is being created"
-    elif k8s_status == DeploymentStatus.FAILED:
-        message = "Deployment failed"
-    elif k8s_status == DeploymentStatus.TERMINATED:
-        message = "Deployment has been terminated"
-    else:
-        message = None
+    # Get deployment from memory and update its status from Kubernetes
+    deployment = await run_in_threadpool(refresh_deployment, deployments[deployment_id], k8s_client)
     
     return DeploymentStatusResponse(
         id=deployment_id,
-        status=k8s_status,
-        message=message,
+        status=deployment.status,
+        message=STATUS_MESSAGES.get(deployment.status),
     )
 
 
@@ -246,7 +550,7 @@ async def get_deployment_status(
     description="Get connection details for a specific deployment.",
 )
 async def get_deployment_connection(
-    deployment_id: str, k8s_client: KubernetesClient = Depends(get_k8s_client)
+    deployment_id: str, k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
 ) -> DeploymentConnectionResponse:
     """Get deployment connection details.
 
@@ -264,34 +568,230 @@ async def get_deployment_connection(
             detail=f"Deployment {deployment_id} not found",
         )
     
-    # Get deployment from memory
+    # Deployments migrated off a drained node hand over to their replacement
     deployment = deployments[deployment_id]
+    while deployment.replaced_by in deployments:
+        deployment = deployments[deployment.replaced_by]
     
-    # Update status from Kubernetes
-    k8s_status = k8s_client.get_deployment_status(deployment_id)
-    deployment.status = k8s_status
+    # Get deployment from memory and update its status from Kubernetes
+    deployment = await run_in_threadpool(refresh_deployment, deployment, k8s_client)
     
     # Check if deployment is running
-    if k8s_status != DeploymentStatus.RUNNING:
+    if deployment.status != DeploymentStatus.RUNNING:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Deployment {deployment_id} is not running (status: {k8s_status})",
+            detail=f"Deployment {deployment.id} is not running (status: {deployment.status})",
         )
     
-    # Update connection details if not already set
-    if not deployment.connection_details:
-        deployment.connection_details = {
-            "service_url": f"http://{deployment_id}.{k8s_client.namespace}.svc.cluster.local",
-            "ingress_host": f"{deployment_id}.example.com",  # This would be configured based on your ingress setup
-            "novnc_port": "6080",
-        }
+    # Set on refresh once running, but the model allows a running deployment without them
+    if deployment.connection_details is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Connection details of deployment {deployment.id} are not available yet",
+        )
+    
+    # Connecting counts as activity for the idle detector
+    deployment.last_activity_at = datetime.utcnow().isoformat()
     
     return DeploymentConnectionResponse(
-        id=deployment_id,
+        id=deployment.id,
         connection_details=deployment.connection_details,
     )
 
 
+@router.post(
+    "/{deployment_id}/pause",
+    response_model=DeploymentStatusResponse,
+    summary="Pause a deployment",
+    description="Scale a deployment to zero replicas, keeping its home directory if persistent home is enabled.",
+)
+async def pause_deployment(
+    deployment_id: str, k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
+) -> DeploymentStatusResponse:
+    """Pause a deployment.
+
+    Args:
+        deployment_id: The ID of the deployment.
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        The deployment status response.
+    """
+    # Check if deployment exists in memory
+    if deployment_id not in deployments:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deployment {deployment_id} not found",
+        )
+    
+    deployment = await run_in_threadpool(refresh_deployment, deployments[deployment_id], k8s_client)
+    if deployment.status not in (DeploymentStatus.RUNNING, DeploymentStatus.CREATING):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Deployment {deployment_id} cannot be paused (status: {deployment.status})",
+        )
+    
+    try:
+        await run_in_threadpool(pause_deployment_by_id, deployment_id, k8s_client)
+    except Exception as e:
+        logger.error(f"Error pausing deployment: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error pausing deployment: {str(e)}",
+        )
+    
+    return DeploymentStatusResponse(
+        id=deployment_id, status=deployment.status, message=deployment.message
+    )
+
+
+@router.post(
+    "/{deployment_id}/resume",
+    response_model=DeploymentStatusResponse,
+    summary="Resume a deployment",
+    description="Scale a paused deployment back to one replica.",
+)
+async def resume_deployment(
+    deployment_id: str, k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
+) -> DeploymentStatusResponse:
+    """Resume a paused deployment.
+
+    The time until the deployment is ready again is measured in the background
+    and reported as ``resume_seconds`` on the deployment.
+
+    Args:
+        deployment_id: The ID of the deployment.
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        The deployment status response.
+    """
+    # Check if deployment exists in memory
+    if deployment_id not in deployments:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deployment {deployment_id} not found",
+        )
+    
+    deployment = await run_in_threadpool(refresh_deployment, deployments[deployment_id], k8s_client)
+    if deployment.status != DeploymentStatus.PAUSED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Deployment {deployment_id} is not paused (status: {deployment.status})",
+        )
+    
+    try:
+        quota_manager.resume(deployment_id)
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=str(e),
+        )
+    
+    try:
+        started = time.monotonic()
+        await run_in_threadpool(k8s_client.scale_deployment, deployment_id, replicas=1)
+    except Exception as e:
+        quota_manager.transition(deployment_id, DeploymentStatus.PAUSED)
+        logger.error(f"Error resuming deployment: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error resuming deployment: {str(e)}",
+        )
+    
+    set_status(deployment, DeploymentStatus.CREATING)
+    deployment.message = "Deployment is being resumed"
+    deployment.resume_seconds = None
+    
+    task = asyncio.create_task(_measure_resume(deployment_id, started, k8s_client))
+    _resume_tasks.add(task)
+    task.add_done_callback(_resume_tasks.discard)
+    
+    return DeploymentStatusResponse(
+        id=deployment_id, status=deployment.status, message=deployment.message
+    )
+
+
+@router.post(
+    "/{deployment_id}/heartbeat",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Report deployment activity",
+    description="Report agent activity so that the deployment is not paused by the idle detector.",
+)
+async def deployment_heartbeat(deployment_id: str) -> None:
+    """Record activity on a deployment.
+
+    Args:
+        deployment_id: The ID of the deployment.
+    """
+    # Check if deployment exists in memory
+    if deployment_id not in deployments:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deployment {deployment_id} not found",
+        )
+    
+    deployments[deployment_id].last_activity_at = datetime.utcnow().isoformat()
+
+
+@router.patch(
+    "/{deployment_id}/data",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Update deployment data",
+    description="Update the requirement and data files of a running deployment without restarting it.",
+)
+async def update_deployment_data(
+    deployment_id: str,
+    update: DeploymentDataUpdate,
+    k8s_client: ShardedKubernetesClient = Depends(get_k8s_client),
+) -> None:
+    """Update the task payload of a deployment.
+
+    Args:
+        deployment_id: The ID of the deployment.
+        update: The data entries and requirement to update.
+        k8s_client: The Kubernetes client.
+    """
+    # Check if deployment exists in memory
+    if deployment_id not in deployments:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deployment {deployment_id} not found",
+        )
+    
+    # The task ConfigMaps are gone (or going) once a deployment is deleted, and
+    # rewriting them would leave orphans behind
+    deployment = deployments[deployment_id]
+    if deployment.status in (
+        DeploymentStatus.FAILED,
+        DeploymentStatus.TERMINATING,
+        DeploymentStatus.TERMINATED,
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Deployment {deployment_id} is not running (status: {deployment.status})",
+        )
+    
+    try:
+        await run_in_threadpool(
+            k8s_client.update_task,
+            deployment_id,
+            data=update.data,
+            requirement=update.requirement,
+        )
+    except TaskPayloadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e),
+        )
+    except Exception as e:
+        logger.error(f"Error updating deployment data: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating deployment data: {str(e)}",
+        )
+
+
 @router.delete(
     "/{deployment_id}",
     status_code=status.HTTP_204_NO_CONTENT,
@@ -299,7 +799,7 @@ async def get_deployment_connection(
     description="Delete a specific deployment.",
 )
 async def delete_deployment(
-    deployment_id: str, k8s_client: KubernetesClient = Depends(get_k8s_client)
+    deployment_id: str, k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
 ) -> None:
     """Delete a deployment.
 
@@ -316,10 +816,10 @@ async def delete_deployment(
     
     try:
         # Delete deployment in Kubernetes
-        k8s_client.delete_deployment(deployment_id)
+        await run_in_threadpool(k8s_client.delete_deployment, deployment_id)
         
         # Update status in memory
-        deployments[deployment_id].status = DeploymentStatus.TERMINATED
+        set_status(deployments[deployment_id], DeploymentStatus.TERMINATED)
         deployments[deployment_id].message = "Deployment has been terminated"
         
     except Exception as e:
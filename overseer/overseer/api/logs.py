@@ -0,0 +1,146 @@
+"""
+Log streaming API endpoints.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from overseer.api.deployments import deployments, get_k8s_client
+from overseer.environments import get_environment_registry
+from overseer.k8s.client import LogStream
+from overseer.k8s.shards import ShardedKubernetesClient
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/deployments", tags=["logs"])
+
+# Maximum number of log streams served at the same time
+MAX_LOG_STREAMS = int(os.getenv("OVERSEER_MAX_LOG_STREAMS", "64"))
+
+# Followers block a thread while waiting for new output, so they get their own
+# pool instead of starving the one shared by all other endpoints
+_log_executor = ThreadPoolExecutor(max_workers=MAX_LOG_STREAMS, thread_name_prefix="logs")
+_log_streams = threading.BoundedSemaphore(MAX_LOG_STREAMS)
+
+_SINCE_RE = re.compile(r"^(?P<value>\d+)(?P<unit>[smh]?)$")
+_SINCE_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_since(since: str) -> int:
+    """Convert a duration such as ``90``, ``30s``, ``5m`` or ``2h`` to seconds."""
+    match = _SINCE_RE.match(since)
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid since {since!r}: expected seconds or a duration like 30s, 5m or 2h",
+        )
+    return int(match["value"]) * _SINCE_UNITS[match["unit"]]
+
+
+async def _relay(chunks: LogStream) -> AsyncIterator[bytes]:
+    """Relay log chunks to the client, reading the next one only once the last was sent.
+
+    Args:
+        chunks: The log stream; closed when the client goes away.
+
+    Yields:
+        Log chunks.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        try:
+            while True:
+                chunk = await loop.run_in_executor(_log_executor, next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            # A read may still be blocked in an executor thread, closing the
+            # connection under it ends it
+            chunks.close()
+    finally:
+        _log_streams.release()
+
+
+@router.get(
+    "/{deployment_id}/logs",
+    summary="Stream deployment logs",
+    description="Stream the container logs of a deployment, or one of the log files of its environment type.",
+)
+async def stream_deployment_logs(
+    deployment_id: str,
+    follow: bool = False,
+    since: Optional[str] = None,
+    file: Optional[str] = None,
+    k8s_client: ShardedKubernetesClient = Depends(get_k8s_client),
+) -> StreamingResponse:
+    """Stream the logs of a deployment.
+
+    Args:
+        deployment_id: The ID of the deployment.
+        follow: Whether to keep streaming new output.
+        since: Only return container logs newer than this duration.
+        file: Path of a log file in the container to stream instead.
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        A chunked plain text response.
+    """
+    # Check if deployment exists in memory
+    if deployment_id not in deployments:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deployment {deployment_id} not found",
+        )
+
+    environment_type = deployments[deployment_id].environment_type
+    if file is not None:
+        if file not in get_environment_registry().get(environment_type).log_files:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File {file!r} is not a log file of environment type {environment_type!r}",
+            )
+        if since is not None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="since is only supported for container logs",
+            )
+    since_seconds = _parse_since(since) if since is not None else None
+
+    if not _log_streams.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many log streams, try again later",
+        )
+
+    try:
+        if file is not None:
+            chunks = await run_in_threadpool(k8s_client.stream_file, deployment_id, file, follow)
+        else:
+            chunks = await run_in_threadpool(
+                k8s_client.stream_container_logs, deployment_id, follow, since_seconds
+            )
+    except LookupError as e:
+        _log_streams.release()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
+    except Exception as e:
+        _log_streams.release()
+        logger.error(f"Error streaming deployment logs: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error streaming deployment logs: {str(e)}",
+        )
+
+    return StreamingResponse(_relay(chunks), media_type="text/plain; charset=utf-8")
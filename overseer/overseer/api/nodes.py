@@ -0,0 +1,341 @@
+"""
+Node API endpoints.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Set
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from overseer.api.deployments import (
+    NDJSON_MEDIA_TYPE,
+    STATUS_MESSAGES,
+    deployment_annotations,
+    deployments,
+    get_k8s_client,
+    set_status,
+)
+from overseer.api.snapshots import take_snapshot
+from overseer.k8s.shards import ShardedKubernetesClient
+from overseer.models.deployment import DeploymentResponse, DeploymentStatus
+from overseer.models.node import DrainEvent, DrainEventType
+from overseer.quotas import DEFAULT_OWNER, admission, quota_manager
+from overseer.snapshots import snapshot_store
+from overseer.stats import fleet_stats
+from overseer.webhooks import webhook_dispatcher
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/nodes", tags=["nodes"])
+
+# Deployments migrated at the same time by a drain, unless the request asks for another number
+DRAIN_CONCURRENCY = int(os.getenv("OVERSEER_DRAIN_CONCURRENCY", "4"))
+# Maximum time to wait for a replacement to become ready
+DRAIN_READY_TIMEOUT_SECONDS = float(os.getenv("OVERSEER_DRAIN_READY_TIMEOUT_SECONDS", "600"))
+
+# Nodes being drained
+_draining: Set[str] = set()
+
+# Running drains (kept referenced until they finish, even if the client goes away)
+_drain_tasks: Set[asyncio.Task] = set()
+
+
+class MigrationFailed(RuntimeError):
+    """Raised when a deployment could not be moved off a drained node."""
+
+
+def _event(
+    event: DrainEventType,
+    node: str,
+    deployment_id: Optional[str] = None,
+    **kwargs,
+) -> DrainEvent:
+    """Create a drain event stamped with the current time."""
+    return DrainEvent(
+        event=event,
+        node=node,
+        deployment_id=deployment_id,
+        timestamp=datetime.utcnow().isoformat(),
+        **kwargs,
+    )
+
+
+async def _wait_until_running(deployment_id: str, k8s_client: ShardedKubernetesClient) -> None:
+    """Wait for a replacement deployment to become ready.
+
+    Args:
+        deployment_id: The ID of the replacement.
+        k8s_client: The Kubernetes client.
+
+    Raises:
+        MigrationFailed: If the replacement failed or did not become ready in time.
+    """
+    started = time.monotonic()
+    while time.monotonic() - started < DRAIN_READY_TIMEOUT_SECONDS:
+        k8s_status = await run_in_threadpool(k8s_client.get_deployment_status, deployment_id)
+        if k8s_status == DeploymentStatus.RUNNING:
+            return
+        if k8s_status != DeploymentStatus.CREATING:
+            raise MigrationFailed(f"Replacement {deployment_id} did not start: {k8s_status}")
+        await asyncio.sleep(1)
+    raise MigrationFailed(
+        f"Replacement {deployment_id} was not ready within {DRAIN_READY_TIMEOUT_SECONDS:g}s"
+    )
+
+
+async def _migrate(
+    node: str,
+    deployment: DeploymentResponse,
+    k8s_client: ShardedKubernetesClient,
+    events: asyncio.Queue,
+) -> None:
+    """Move a deployment off a node: snapshot it, start a replacement, switch over, delete it.
+
+    The original keeps running until its replacement is ready, and is left
+    alone if anything before the switch fails.
+
+    Args:
+        node: The name of the drained node.
+        deployment: The stored deployment to move.
+        k8s_client: The Kubernetes client.
+        events: Queue the progress is reported to.
+
+    Raises:
+        MigrationFailed: If the deployment could not be moved.
+    """
+    try:
+        snapshot = await run_in_threadpool(take_snapshot, deployment, k8s_client)
+    except Exception as e:
+        raise MigrationFailed(f"Error snapshotting {deployment.id}: {e}")
+    await events.put(
+        _event(DrainEventType.SNAPSHOTTED, node, deployment.id, snapshot_id=snapshot.id)
+    )
+
+    owner = deployment.owner or DEFAULT_OWNER
+    callback_url, callback_events = webhook_dispatcher.subscription(deployment.id) or (None, None)
+    try:
+        requirement, tools, data = await run_in_threadpool(k8s_client.get_task, deployment.id)
+        # Queue with the owner's other creates, the cordon keeps the node itself out
+        async with admission.admit(owner):
+            replacement_id, _ = await run_in_threadpool(
+                k8s_client.create_deployment,
+                environment_type=deployment.environment_type,
+                tools=tools,
+                data=data,
+                requirement=requirement,
+                snapshot_url=snapshot_store.archive_url(snapshot.id),
+                annotations=deployment_annotations(
+                    owner, snapshot.id, callback_url, callback_events
+                ),
+            )
+    except Exception as e:
+        raise MigrationFailed(f"Error creating a replacement for {deployment.id}: {e}")
+
+    replacement = DeploymentResponse(
+        id=replacement_id,
+        status=DeploymentStatus.CREATING,
+        environment_type=deployment.environment_type,
+        owner=deployment.owner,
+        from_snapshot=snapshot.id,
+        created_at=datetime.utcnow().isoformat(),
+        last_activity_at=datetime.utcnow().isoformat(),
+        message=f"Replacing {deployment.id} while node {node} is drained",
+    )
+    deployments[replacement_id] = replacement
+    fleet_stats.created(replacement_id, deployment.environment_type)
+    await events.put(
+        _event(
+            DrainEventType.REPLACEMENT_CREATED,
+            node,
+            deployment.id,
+            replacement_id=replacement_id,
+            snapshot_id=snapshot.id,
+        )
+    )
+
+    try:
+        await _wait_until_running(replacement_id, k8s_client)
+        connection_details = await run_in_threadpool(
+            k8s_client.get_connection_details, replacement_id, deployment.environment_type
+        )
+    except Exception as e:
+        try:
+            await run_in_threadpool(k8s_client.delete_deployment, replacement_id)
+        except Exception as delete_error:
+            logger.error(f"Error deleting replacement {replacement_id}: {delete_error}")
+        set_status(replacement, DeploymentStatus.TERMINATED)
+        replacement.message = f"Replacement of {deployment.id} failed: {e}"
+        raise MigrationFailed(str(e))
+
+    # Switch over: the replacement takes the callback and quota of the original,
+    # and connecting through the original ID leads to the replacement
+    webhook_dispatcher.copy_subscription(deployment.id, replacement_id)
+    quota_manager.transfer(deployment.id, replacement_id)
+    replacement.connection_details = connection_details
+    set_status(replacement, DeploymentStatus.RUNNING)
+    replacement.message = STATUS_MESSAGES[DeploymentStatus.RUNNING]
+    deployment.replaced_by = replacement_id
+    deployment.connection_details = connection_details
+    await events.put(
+        _event(DrainEventType.SWITCHED, node, deployment.id, replacement_id=replacement_id)
+    )
+
+    # Terminating from now on, so that a failed delete is retried by the status
+    # controller instead of leaving the original running next to its replacement
+    set_status(deployment, DeploymentStatus.TERMINATING)
+    deployment.message = f"Migrated to {replacement_id} while node {node} is drained, deleting"
+    try:
+        await run_in_threadpool(k8s_client.delete_deployment, deployment.id)
+    except Exception as e:
+        deployment.message = f"Migrated to {replacement_id}, deleting failed and is retried: {e}"
+        raise MigrationFailed(f"Switched to {replacement_id}, but deleting {deployment.id} failed: {e}")
+    set_status(deployment, DeploymentStatus.TERMINATED)
+    deployment.message = f"Migrated to {replacement_id} while node {node} was drained"
+    await events.put(
+        _event(DrainEventType.DELETED, node, deployment.id, replacement_id=replacement_id)
+    )
+
+
+async def _drain(
+    node: str,
+    deployment_ids: List[str],
+    concurrency: int,
+    k8s_client: ShardedKubernetesClient,
+    events: asyncio.Queue,
+) -> None:
+    """Migrate the deployments of a cordoned node with bounded concurrency.
+
+    Args:
+        node: The name of the node.
+        deployment_ids: The IDs of the deployments with a pod on the node.
+        concurrency: Maximum number of deployments migrated at the same time.
+        k8s_client: The Kubernetes client.
+        events: Queue the progress is reported to; None marks the end.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    migrated = failed = 0
+
+    async def migrate(deployment_id: str) -> None:
+        nonlocal migrated, failed
+        deployment = deployments.get(deployment_id)
+        if deployment is None or deployment.status != DeploymentStatus.RUNNING:
+            reason = "unknown to this service" if deployment is None else f"status is {deployment.status}"
+            await events.put(
+                _event(DrainEventType.SKIPPED, node, deployment_id, message=f"Not migrated, {reason}")
+            )
+            return
+
+        async with semaphore:
+            try:
+                await _migrate(node, deployment, k8s_client, events)
+                migrated += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"Error migrating deployment {deployment_id} off node {node}: {e}")
+                await events.put(_event(DrainEventType.FAILED, node, deployment_id, message=str(e)))
+
+    try:
+        await asyncio.gather(*(migrate(deployment_id) for deployment_id in deployment_ids))
+        logger.info(f"Drained node {node}: {migrated} migrated, {failed} failed")
+        await events.put(
+            _event(DrainEventType.COMPLETED, node, message=f"{migrated} migrated, {failed} failed")
+        )
+    finally:
+        _draining.discard(node)
+        await events.put(None)
+
+
+async def _stream_events(events: asyncio.Queue) -> AsyncIterator[str]:
+    """Yield drain events as newline-delimited JSON until the drain ends.
+
+    Args:
+        events: Queue the drain reports its progress to.
+
+    Yields:
+        One JSON-encoded event per line.
+    """
+    while True:
+        event = await events.get()
+        if event is None:
+            return
+        yield event.model_dump_json() + "\n"
+
+
+@router.post(
+    "/{node_name}/drain",
+    summary="Drain a node",
+    description=(
+        "Cordon a node and move every deployment running on it to other nodes: each one is "
+        "snapshotted, a replacement is started from the snapshot, connection details are "
+        "switched over once it is ready, and only then the original is deleted. Progress is "
+        "streamed as newline-delimited JSON events."
+    ),
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def drain_node(
+    node_name: str,
+    concurrency: int = DRAIN_CONCURRENCY,
+    k8s_client: ShardedKubernetesClient = Depends(get_k8s_client),
+) -> StreamingResponse:
+    """Drain a node.
+
+    The drain continues if the client stops reading the progress stream.
+
+    Args:
+        node_name: The name of the node.
+        concurrency: Maximum number of deployments migrated at the same time.
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        A stream of newline-delimited JSON drain events.
+    """
+    if concurrency < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="concurrency must be at least 1",
+        )
+    if node_name in _draining:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Node {node_name} is already being drained",
+        )
+    _draining.add(node_name)
+
+    try:
+        found = await run_in_threadpool(k8s_client.cordon_node, node_name)
+        deployment_ids = (
+            await run_in_threadpool(k8s_client.list_deployments_on_node, node_name) if found else []
+        )
+    except Exception as e:
+        _draining.discard(node_name)
+        logger.error(f"Error draining node: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error draining node: {str(e)}",
+        )
+    if not found:
+        _draining.discard(node_name)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Node {node_name} not found",
+        )
+
+    events: asyncio.Queue = asyncio.Queue()
+    await events.put(
+        _event(
+            DrainEventType.CORDONED,
+            node_name,
+            message=f"{len(deployment_ids)} deployments to migrate",
+        )
+    )
+    task = asyncio.create_task(_drain(node_name, deployment_ids, concurrency, k8s_client, events))
+    _drain_tasks.add(task)
+    task.add_done_callback(_drain_tasks.discard)
+
+    return StreamingResponse(_stream_events(events), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,219 @@
+"""
+Snapshot API endpoints.
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from overseer.api.deployments import deployments, get_k8s_client
+from overseer.k8s.shards import ShardedKubernetesClient
+from overseer.models.deployment import DeploymentResponse, DeploymentStatus
+from overseer.models.snapshot import SnapshotListResponse, SnapshotResponse
+from overseer.snapshots import snapshot_store
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["snapshots"])
+
+
+def take_snapshot(
+    deployment: DeploymentResponse, k8s_client: ShardedKubernetesClient
+) -> SnapshotResponse:
+    """Capture and store a snapshot of a running deployment.
+
+    Args:
+        deployment: The stored deployment.
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        The snapshot.
+
+    Raises:
+        LookupError: If the deployment has no running pod.
+    """
+    snapshot_id = snapshot_store.new_id()
+    started = time.monotonic()
+    size = _capture(deployment.id, snapshot_id, k8s_client)
+    capture_seconds = round(time.monotonic() - started, 3)
+
+    snapshot = SnapshotResponse(
+        id=snapshot_id,
+        deployment_id=deployment.id,
+        environment_type=deployment.environment_type,
+        created_at=datetime.utcnow().isoformat(),
+        size_bytes=size,
+        capture_seconds=capture_seconds,
+    )
+    snapshot_store.add(snapshot)
+    logger.info(f"Snapshot {snapshot_id} of {deployment.id}: {size} bytes in {capture_seconds}s")
+    return snapshot
+
+
+def _capture(deployment_id: str, snapshot_id: str, k8s_client: ShardedKubernetesClient) -> int:
+    """Write the archive of a snapshot, replacing it only once it is complete.
+
+    Args:
+        deployment_id: The ID of the deployment.
+        snapshot_id: The ID of the snapshot.
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        The size of the archive in bytes.
+    """
+    os.makedirs(snapshot_store.directory, exist_ok=True)
+    path = snapshot_store.archive_path(snapshot_id)
+    partial = f"{path}.partial"
+    try:
+        with open(partial, "wb") as f:
+            size = k8s_client.capture_home(deployment_id, f)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return size
+
+
+@router.post(
+    "/deployments/{deployment_id}/snapshots",
+    response_model=SnapshotResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Snapshot a deployment",
+    description="Capture the home directory of a running deployment so that new deployments can start from it.",
+)
+async def create_snapshot(
+    deployment_id: str, k8s_client: ShardedKubernetesClient = Depends(get_k8s_client)
+) -> SnapshotResponse:
+    """Create a snapshot of a deployment.
+
+    Args:
+        deployment_id: The ID of the deployment.
+        k8s_client: The Kubernetes client.
+
+    Returns:
+        The snapshot response.
+    """
+    # Check if deployment exists in memory
+    if deployment_id not in deployments:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deployment {deployment_id} not found",
+        )
+
+    deployment = deployments[deployment_id]
+    if deployment.status != DeploymentStatus.RUNNING:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Deployment {deployment_id} is not running (status: {deployment.status})",
+        )
+
+    try:
+        return await run_in_threadpool(take_snapshot, deployment, k8s_client)
+    except LookupError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
+    except Exception as e:
+        logger.error(f"Error creating snapshot: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating snapshot: {str(e)}",
+        )
+
+
+@router.get(
+    "/deployments/{deployment_id}/snapshots",
+    response_model=SnapshotListResponse,
+    summary="List deployment snapshots",
+    description="List the snapshots taken of a deployment.",
+)
+async def list_snapshots(deployment_id: str) -> SnapshotListResponse:
+    """List the snapshots of a deployment.
+
+    Args:
+        deployment_id: The ID of the deployment.
+
+    Returns:
+        The snapshot list response.
+    """
+    return SnapshotListResponse(snapshots=snapshot_store.list_for(deployment_id))
+
+
+@router.get(
+    "/snapshots/{snapshot_id}",
+    response_model=SnapshotResponse,
+    summary="Get snapshot",
+    description="Get the details of a snapshot.",
+)
+async def get_snapshot(snapshot_id: str) -> SnapshotResponse:
+    """Get a snapshot.
+
+    Args:
+        snapshot_id: The ID of the snapshot.
+
+    Returns:
+        The snapshot response.
+    """
+    snapshot = snapshot_store.get(snapshot_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Snapshot {snapshot_id} not found",
+        )
+    return snapshot
+
+
+@router.get(
+    "/snapshots/{snapshot_id}/archive",
+    summary="Download snapshot archive",
+    description=(
+        "Download the home directory tarball of a snapshot; used by restoring environments. "
+        "The endpoint is not authenticated: the random 128-bit snapshot ID is what protects "
+        "the archive, so treat snapshot IDs as secrets."
+    ),
+)
+async def get_snapshot_archive(snapshot_id: str) -> FileResponse:
+    """Download the archive of a snapshot.
+
+    Args:
+        snapshot_id: The ID of the snapshot.
+
+    Returns:
+        The gzip-compressed tarball.
+    """
+    if snapshot_store.get(snapshot_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Snapshot {snapshot_id} not found",
+        )
+    return FileResponse(
+        snapshot_store.archive_path(snapshot_id),
+        media_type="application/gzip",
+        filename=f"{snapshot_id}.tar.gz",
+    )
+
+
+@router.delete(
+    "/snapshots/{snapshot_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Delete snapshot",
+    description="Delete a snapshot and its archive.",
+)
+async def delete_snapshot(snapshot_id: str) -> None:
+    """Delete a snapshot.
+
+    Args:
+        snapshot_id: The ID of the snapshot.
+    """
+    if snapshot_store.get(snapshot_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Snapshot {snapshot_id} not found",
+        )
+    await run_in_threadpool(snapshot_store.delete, snapshot_id)
@@ -0,0 +1,27 @@
+"""
+Fleet statistics API endpoints.
+"""
+
+from fastapi import APIRouter
+
+from overseer.models.stats import FleetStatsResponse
+from overseer.stats import fleet_stats
+
+# Shares the /deployments prefix, so it must be included before the deployments
+# router for /deployments/stats not to be taken as a deployment ID
+router = APIRouter(prefix="/deployments", tags=["stats"])
+
+
+@router.get(
+    "/stats",
+    response_model=FleetStatsResponse,
+    summary="Get fleet statistics",
+    description="Get deployment counts by status and environment type, create and delete rates, and mean time-to-ready.",
+)
+async def get_fleet_stats() -> FleetStatsResponse:
+    """Get the statistics of all deployments.
+
+    Returns:
+        The fleet statistics response.
+    """
+    return fleet_stats.snapshot()
@@ -0,0 +1,70 @@
+"""
+Resource usage API endpoints.
+"""
+
+import logging
+
+from fastapi import APIRouter, HTTPException, status
+
+from overseer.api.deployments import deployments
+from overseer.controllers.usage import usage_collector
+from overseer.models.usage import DeploymentUsage, FleetUsageResponse
+
+logger = logging.getLogger(__name__)
+
+# Shares the /deployments prefix, so it must be included before the deployments
+# router for /deployments/usage not to be taken as a deployment ID
+router = APIRouter(prefix="/deployments", tags=["usage"])
+
+
+@router.get(
+    "/usage",
+    response_model=FleetUsageResponse,
+    summary="Get fleet resource usage",
+    description="Get the current and rolling CPU and memory usage of all deployments.",
+)
+async def get_fleet_usage() -> FleetUsageResponse:
+    """Get the resource usage of all deployments.
+
+    Returns:
+        The fleet usage response.
+    """
+    usages = [
+        usage
+        for usage in (
+            usage_collector.usage(deployment.id, deployment.environment_type)
+            for deployment in list(deployments.values())
+        )
+        if usage.samples
+    ]
+    return FleetUsageResponse(
+        refreshed_at=usage_collector.refreshed_at,
+        total_cpu_cores=sum(usage.cpu_cores or 0.0 for usage in usages),
+        total_memory_bytes=sum(usage.memory_bytes or 0 for usage in usages),
+        deployments=usages,
+    )
+
+
+@router.get(
+    "/{deployment_id}/usage",
+    response_model=DeploymentUsage,
+    summary="Get deployment resource usage",
+    description="Get the current and rolling CPU and memory usage of a specific deployment.",
+)
+async def get_deployment_usage(deployment_id: str) -> DeploymentUsage:
+    """Get the resource usage of a deployment.
+
+    Args:
+        deployment_id: The ID of the deployment.
+
+    Returns:
+        The deployment usage response.
+    """
+    # Check if deployment exists in memory
+    if deployment_id not in deployments:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Deployment {deployment_id} not found",
+        )
+
+    return usage_collector.usage(deployment_id, deployments[deployment_id].environment_type)
@@ -0,0 +1,87 @@
+"""
+Validation of the callback URLs deployments send their status changes to.
+
+Callbacks are POSTed from inside the cluster, so without these checks anyone who
+can create a deployment could make Overseer send requests to cluster services,
+the node or the cloud metadata endpoint.
+"""
+
+import asyncio
+import ipaddress
+import os
+from typing import Set, Union
+from urllib.parse import urlparse
+
+# Comma-separated hosts callbacks may be sent to even though they are internal
+CALLBACK_ALLOWED_HOSTS: Set[str] = {
+    host.strip().lower()
+    for host in os.getenv("OVERSEER_CALLBACK_ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+}
+
+# Names that resolve to cluster services or to the node, whatever they resolve to
+_INTERNAL_SUFFIXES = (".svc", ".cluster.local", ".local", ".internal", ".localhost")
+
+
+def _is_internal_address(address: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> bool:
+    """Check whether an address is not reachable on the public internet."""
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+        address = address.ipv4_mapped
+    return not address.is_global or address.is_multicast
+
+
+def check_callback_url(url: str) -> str:
+    """Check that a callback URL is an http(s) URL of a public host.
+
+    Hosts in OVERSEER_CALLBACK_ALLOWED_HOSTS are accepted as they are.
+
+    Args:
+        url: The callback URL.
+
+    Returns:
+        The URL.
+
+    Raises:
+        ValueError: If the URL is not absolute http(s) or names an internal host.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError(f"Invalid callback URL {url!r}: an absolute http(s) URL is required")
+
+    host = parsed.hostname.lower().rstrip(".")
+    if host in CALLBACK_ALLOWED_HOSTS:
+        return url
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        # Single-label names are completed with the cluster's search domains
+        if "." not in host or host == "localhost" or host.endswith(_INTERNAL_SUFFIXES):
+            raise ValueError(f"Invalid callback URL {url!r}: {host} is an internal host")
+    else:
+        if _is_internal_address(address):
+            raise ValueError(f"Invalid callback URL {url!r}: {host} is an internal address")
+    return url
+
+
+async def check_callback_address(url: str) -> None:
+    """Check that the host of a callback URL does not resolve to an internal address.
+
+    Called right before every delivery, so a public name that is later pointed
+    at an internal address is caught as well.
+
+    Args:
+        url: The callback URL, already accepted by check_callback_url.
+
+    Raises:
+        ValueError: If the host resolves to an internal address.
+        OSError: If the host cannot be resolved.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").lower().rstrip(".")
+    if host in CALLBACK_ALLOWED_HOSTS:
+        return
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    for *_, sockaddr in await asyncio.get_running_loop().getaddrinfo(host, port):
+        address = ipaddress.ip_address(str(sockaddr[0]).split("%")[0])
+        if _is_internal_address(address):
+            raise ValueError(f"Callback host {host} resolves to internal address {address}")
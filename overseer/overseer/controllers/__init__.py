@@ -0,0 +1,3 @@
+"""
+Background controllers for the Overseer service.
+"""
@@ -0,0 +1,85 @@
+"""
+Idle detection for the Overseer service.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+
+from overseer.api.deployments import (
+    deployments,
+    get_k8s_client,
+    pause_deployment_by_id,
+)
+from overseer.models.deployment import DeploymentStatus
+
+logger = logging.getLogger(__name__)
+
+IDLE_TIMEOUT_MINUTES = float(os.getenv("OVERSEER_IDLE_TIMEOUT_MINUTES", "0"))
+IDLE_CHECK_SECONDS = float(os.getenv("OVERSEER_IDLE_CHECK_SECONDS", "60"))
+
+
+class IdleController:
+    """Pauses running deployments that have had no VNC client and no agent activity."""
+
+    def __init__(
+        self,
+        idle_timeout_minutes: float = IDLE_TIMEOUT_MINUTES,
+        check_interval: float = IDLE_CHECK_SECONDS,
+    ):
+        """Initialize the idle controller.
+
+        Args:
+            idle_timeout_minutes: Minutes without activity after which a deployment is paused.
+            check_interval: Seconds between idle checks.
+        """
+        self.idle_timeout = timedelta(minutes=idle_timeout_minutes)
+        self.check_interval = check_interval
+
+    @property
+    def enabled(self) -> bool:
+        """Whether idle deployments are paused at all."""
+        return self.idle_timeout > timedelta(0)
+
+    async def run(self) -> None:
+        """Check for idle deployments until cancelled."""
+        logger.info(f"Pausing deployments after {self.idle_timeout} without activity")
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check_once()
+            except Exception as e:
+                logger.error(f"Error checking for idle deployments: {e}")
+
+    async def check_once(self) -> None:
+        """Pause every running deployment that has been idle for too long."""
+        k8s_client = await run_in_threadpool(get_k8s_client)
+        now = datetime.utcnow()
+
+        for deployment_id, deployment in list(deployments.items()):
+            if deployment.status != DeploymentStatus.RUNNING:
+                continue
+
+            try:
+                connections = await run_in_threadpool(
+                    k8s_client.count_vnc_connections, deployment_id
+                )
+            except Exception as e:
+                logger.warning(f"Could not count VNC clients of {deployment_id}: {e}")
+                continue
+
+            if connections:
+                deployment.last_activity_at = now.isoformat()
+                continue
+
+            last_activity = datetime.fromisoformat(
+                deployment.last_activity_at or deployment.created_at
+            )
+            if now - last_activity < self.idle_timeout:
+                continue
+
+            logger.info(f"Deployment {deployment_id} idle since {last_activity}, pausing")
+            await run_in_threadpool(pause_deployment_by_id, deployment_id, k8s_client)
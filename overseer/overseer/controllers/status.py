@@ -0,0 +1,91 @@
+"""
+Status synchronization for the Overseer service.
+"""
+
+import asyncio
+import logging
+import os
+
+from fastapi.concurrency import run_in_threadpool
+
+from overseer.api.deployments import (
+    STATUS_MESSAGES,
+    deployments,
+    get_k8s_client,
+    set_status,
+)
+from overseer.k8s.shards import ShardedKubernetesClient
+from overseer.models.deployment import DeploymentResponse, DeploymentStatus
+
+logger = logging.getLogger(__name__)
+
+STATUS_SYNC_SECONDS = float(os.getenv("OVERSEER_STATUS_SYNC_SECONDS", "10"))
+
+
+class StatusController:
+    """Keeps the stored statuses, and with them the fleet statistics, current.
+
+    Every sync lists the managed deployments with one call per shard, so
+    transitions are recorded even when nobody polls a deployment. Deployments
+    left terminating by a failed delete are deleted again on every sync.
+    """
+
+    def __init__(self, sync_interval: float = STATUS_SYNC_SECONDS):
+        """Initialize the status controller.
+
+        Args:
+            sync_interval: Seconds between status syncs.
+        """
+        self.sync_interval = sync_interval
+
+    @property
+    def enabled(self) -> bool:
+        """Whether statuses are synced at all."""
+        return self.sync_interval > 0
+
+    async def run(self) -> None:
+        """Sync statuses until cancelled."""
+        while True:
+            try:
+                await self.sync_once()
+            except Exception as e:
+                logger.error(f"Error syncing deployment statuses: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def sync_once(self) -> None:
+        """Update every stored deployment whose status has changed in Kubernetes."""
+        k8s_client = await run_in_threadpool(get_k8s_client)
+        statuses = await run_in_threadpool(k8s_client.list_deployment_statuses)
+
+        for deployment_id, deployment in list(deployments.items()):
+            if deployment.status == DeploymentStatus.TERMINATING:
+                await self._retry_delete(deployment, k8s_client)
+                continue
+            # Deployments missing from the listing are left to the next read,
+            # their shard may just have been unreachable
+            k8s_status = statuses.get(deployment_id)
+            if deployment.status == DeploymentStatus.TERMINATED or k8s_status is None:
+                continue
+            if k8s_status != deployment.status:
+                set_status(deployment, k8s_status)
+                deployment.message = STATUS_MESSAGES.get(k8s_status, deployment.message)
+
+    async def _retry_delete(
+        self, deployment: DeploymentResponse, k8s_client: ShardedKubernetesClient
+    ) -> None:
+        """Delete a deployment whose earlier delete failed.
+
+        Args:
+            deployment: The stored deployment.
+            k8s_client: The Kubernetes client.
+        """
+        try:
+            await run_in_threadpool(k8s_client.delete_deployment, deployment.id)
+        except Exception as e:
+            logger.warning(f"Error deleting terminating deployment {deployment.id}, retrying: {e}")
+            return
+        set_status(deployment, DeploymentStatus.TERMINATED)
+        if deployment.replaced_by:
+            deployment.message = f"Migrated to {deployment.replaced_by}"
+        else:
+            deployment.message = STATUS_MESSAGES[DeploymentStatus.TERMINATED]
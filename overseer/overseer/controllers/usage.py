@@ -0,0 +1,162 @@
+"""
+Resource usage collection for the Overseer service.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from overseer.api.deployments import deployments, get_k8s_client
+from overseer.environments import get_environment_registry
+from overseer.k8s.quantity import parse_quantity
+from overseer.models.deployment import DeploymentStatus
+from overseer.models.usage import DeploymentUsage
+
+logger = logging.getLogger(__name__)
+
+USAGE_REFRESH_SECONDS = float(os.getenv("OVERSEER_USAGE_REFRESH_SECONDS", "15"))
+USAGE_WINDOW_SECONDS = float(os.getenv("OVERSEER_USAGE_WINDOW_SECONDS", "300"))
+
+
+def resource_limits(environment_type: Optional[str]) -> Tuple[Optional[float], Optional[int]]:
+    """Get the CPU and memory limits of an environment type.
+
+    Args:
+        environment_type: The name of the environment type.
+
+    Returns:
+        The CPU limit in cores and the memory limit in bytes (None if unknown).
+    """
+    registry = get_environment_registry()
+    if environment_type not in registry.environments:
+        return None, None
+    limits = registry.get(environment_type).resources.limits
+    cpu = limits.get("cpu")
+    memory = limits.get("memory")
+    return (
+        float(parse_quantity(cpu)) if cpu else None,
+        int(parse_quantity(memory)) if memory else None,
+    )
+
+
+def is_running(deployment_id: str) -> bool:
+    """Check whether a deployment has a running pod whose usage can be reported.
+
+    Args:
+        deployment_id: The ID of the deployment.
+
+    Returns:
+        Whether the stored deployment is running.
+    """
+    deployment = deployments.get(deployment_id)
+    return deployment is not None and deployment.status == DeploymentStatus.RUNNING
+
+
+class UsageCollector:
+    """Keeps a rolling window of CPU and memory usage for every environment.
+
+    All environments are sampled together with one metrics API call per shard
+    on every refresh, and requests are answered from the cached samples.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = USAGE_REFRESH_SECONDS,
+        window: float = USAGE_WINDOW_SECONDS,
+    ):
+        """Initialize the usage collector.
+
+        Args:
+            refresh_interval: Seconds between metrics refreshes.
+            window: Seconds of samples kept for the rolling statistics.
+        """
+        self.refresh_interval = refresh_interval
+        self.window = window
+        self.refreshed_at: Optional[str] = None
+        # Deployment ID -> (monotonic time, CPU cores, memory bytes)
+        self._samples: Dict[str, Deque[Tuple[float, float, int]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether usage is collected at all."""
+        return self.refresh_interval > 0
+
+    async def run(self) -> None:
+        """Refresh the usage samples until cancelled."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing resource usage: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    async def refresh(self) -> None:
+        """Sample the current usage of all environments."""
+        k8s_client = await run_in_threadpool(get_k8s_client)
+        usage = await run_in_threadpool(k8s_client.list_pod_metrics)
+        now = time.monotonic()
+        self.refreshed_at = datetime.utcnow().isoformat()
+
+        for deployment_id, (cpu, memory) in usage.items():
+            self._samples.setdefault(deployment_id, deque()).append((now, cpu, memory))
+
+        # Drop samples that have left the window, and deployments without any.
+        # Stopped deployments lose their history, so a paused deployment does not
+        # report its last sample and a resumed one starts over.
+        for deployment_id in list(self._samples):
+            if not is_running(deployment_id):
+                del self._samples[deployment_id]
+                continue
+            samples = self._samples[deployment_id]
+            while samples and now - samples[0][0] > self.window:
+                samples.popleft()
+            if not samples:
+                del self._samples[deployment_id]
+
+    def usage(self, deployment_id: str, environment_type: Optional[str] = None) -> DeploymentUsage:
+        """Get the cached usage of a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            environment_type: Type of the deployed environment, for its limits.
+
+        Returns:
+            The current and rolling usage (empty if no samples are available or
+            the deployment is not running).
+        """
+        cpu_limit, memory_limit = resource_limits(environment_type)
+        samples = self._samples.get(deployment_id)
+        if not samples or not is_running(deployment_id):
+            return DeploymentUsage(
+                id=deployment_id,
+                refreshed_at=self.refreshed_at,
+                cpu_limit_cores=cpu_limit,
+                memory_limit_bytes=memory_limit,
+            )
+
+        _, cpu, memory = samples[-1]
+        cpus = [sample[1] for sample in samples]
+        memories = [sample[2] for sample in samples]
+        return DeploymentUsage(
+            id=deployment_id,
+            refreshed_at=self.refreshed_at,
+            samples=len(samples),
+            window_seconds=self.window,
+            cpu_cores=cpu,
+            cpu_avg_cores=sum(cpus) / len(cpus),
+            cpu_max_cores=max(cpus),
+            cpu_limit_cores=cpu_limit,
+            memory_bytes=memory,
+            memory_avg_bytes=sum(memories) // len(memories),
+            memory_max_bytes=max(memories),
+            memory_limit_bytes=memory_limit,
+        )
+
+
+usage_collector = UsageCollector()
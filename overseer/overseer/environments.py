@@ -0,0 +1,131 @@
+"""
+Registry of the environment types Overseer can deploy.
+"""
+
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+from overseer.models.environment import (
+    EnvironmentPort,
+    EnvironmentProbe,
+    EnvironmentType,
+)
+
+logger = logging.getLogger(__name__)
+
+# YAML or JSON file with the environment types; unset means only the built-in types
+ENVIRONMENTS_FILE = os.getenv("OVERSEER_ENVIRONMENTS_FILE")
+
+DEFAULT_ENVIRONMENTS = [
+    EnvironmentType(
+        name="claude",
+        image="a8s-claude:latest",
+        ports=[EnvironmentPort(name="novnc", container_port=6080)],
+        readiness_probe=EnvironmentProbe(port=6080),
+        log_files=["/tmp/streamlit_stdout.log", "/tmp/novnc.log"],
+    ),
+]
+
+
+class UnknownEnvironmentType(ValueError):
+    """Raised when a deployment requests an environment type that is not registered."""
+
+
+class EnvironmentRegistry:
+    """The environment types that can be deployed, by name."""
+
+    def __init__(self, environments: List[EnvironmentType]):
+        """Initialize the registry.
+
+        Args:
+            environments: The environment types.
+
+        Raises:
+            ValueError: If two environment types have the same name.
+        """
+        self.environments: Dict[str, EnvironmentType] = {}
+        for environment in environments:
+            if environment.name in self.environments:
+                raise ValueError(f"Duplicate environment type {environment.name!r}")
+            self.environments[environment.name] = environment
+
+    def get(self, name: str) -> EnvironmentType:
+        """Get an environment type.
+
+        Args:
+            name: The name of the environment type.
+
+        Returns:
+            The environment type.
+
+        Raises:
+            UnknownEnvironmentType: If no environment type has this name.
+        """
+        try:
+            return self.environments[name]
+        except KeyError:
+            raise UnknownEnvironmentType(
+                f"Unknown environment type {name!r}, expected one of: {', '.join(self.environments)}"
+            ) from None
+
+    def validate_tools(self, name: str, tools: List[str]) -> None:
+        """Check that the requested tools are allowed for an environment type.
+
+        Args:
+            name: The name of the environment type.
+            tools: The requested tools.
+
+        Raises:
+            UnknownEnvironmentType: If no environment type has this name.
+            ValueError: If a tool is not in the environment type's allowlist.
+        """
+        allowed = self.get(name).tools
+        disallowed = [tool for tool in tools if allowed and tool not in allowed]
+        if disallowed:
+            raise ValueError(
+                f"Tools not available for environment type {name!r}: {', '.join(disallowed)}"
+            )
+
+
+def load_environments(path: str) -> List[EnvironmentType]:
+    """Load environment types from a YAML or JSON file.
+
+    The file contains a list of environment types, or a mapping with an
+    ``environments`` key holding that list.
+
+    Args:
+        path: Path to the file.
+
+    Returns:
+        The validated environment types.
+    """
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml
+
+            content = yaml.safe_load(f)
+        else:
+            content = json.load(f)
+
+    if isinstance(content, dict):
+        content = content.get("environments", [])
+    return [EnvironmentType(**environment) for environment in content]
+
+
+@lru_cache(maxsize=None)
+def get_environment_registry() -> EnvironmentRegistry:
+    """Get the environment registry.
+
+    Loaded once per process; call at startup so that an invalid registry file
+    stops the service instead of failing the first deployment.
+
+    Returns:
+        The environment registry.
+    """
+    environments = load_environments(ENVIRONMENTS_FILE) if ENVIRONMENTS_FILE else DEFAULT_ENVIRONMENTS
+    registry = EnvironmentRegistry(environments)
+    logger.info(f"Loaded environment types: {', '.join(registry.environments)}")
+    return registry
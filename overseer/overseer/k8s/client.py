@@ -2,46 +2,212 @@
 Kubernetes client for the Overseer API.
 """
 
+from __future__ import annotations
+
+import json
 import logging
 import os
 import uuid
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-
-from kubernetes import client, config
-from kubernetes.client.exceptions import ApiException
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
+from overseer.environments import get_environment_registry
+from overseer.k8s.ingress import IngressMode, IngressRouting, SharedIngressManager
+from overseer.k8s.quantity import parse_quantity
+from overseer.k8s.task import pack_task_files, task_files, unpack_task_files
+from overseer.lazy import LazyModule
 from overseer.models.deployment import DeploymentStatus
+from overseer.models.environment import EnvironmentType
+
+# The kubernetes package is imported when the first client is created
+client = LazyModule("kubernetes.client")
+config = LazyModule("kubernetes.config")
+k8s_stream = LazyModule("kubernetes.stream")
+
+# Only imported for annotations, which are not evaluated at runtime
+if TYPE_CHECKING:
+    from kubernetes.client import (
+        ApiClient,
+        V1Deployment,
+        V1Ingress,
+        V1PersistentVolumeClaim,
+        V1Service,
+    )
 
 logger = logging.getLogger(__name__)
 
+BASE_DOMAIN = os.getenv("BASE_DOMAIN", "cluster.local")
+INGRESS_MODE = IngressMode(os.getenv("OVERSEER_INGRESS_MODE", IngressMode.PER_DEPLOYMENT.value))
+INGRESS_ROUTING = IngressRouting(os.getenv("OVERSEER_INGRESS_ROUTING", IngressRouting.HOST.value))
+INGRESS_SHARDS = int(os.getenv("OVERSEER_INGRESS_SHARDS", "1"))
+INGRESS_FLUSH_SECONDS = float(os.getenv("OVERSEER_INGRESS_FLUSH_SECONDS", "2.0"))
+INGRESS_HOST = os.getenv("OVERSEER_INGRESS_HOST")
+TASK_DIR = os.getenv("OVERSEER_TASK_DIR", "/var/run/a8s/task")
+TASK_CONFIGMAP_SLOTS = int(os.getenv("OVERSEER_TASK_CONFIGMAP_SLOTS", "8"))
+PERSISTENT_HOME = os.getenv("OVERSEER_PERSISTENT_HOME", "").lower() in ("true", "1", "yes")
+HOME_STORAGE_SIZE = os.getenv("OVERSEER_HOME_STORAGE_SIZE", "5Gi")
+HOME_STORAGE_CLASS = os.getenv("OVERSEER_HOME_STORAGE_CLASS")
+OVERSEER_URL = os.getenv("OVERSEER_URL", "http://overseer.a8s.svc.cluster.local:8000")
+
+# Home directory of the user inside agent environments
+HOME_DIR = "/home/computeruse"
+
+# Ports VNC clients connect to (VNC and noVNC)
+VNC_PORTS = (5900, 6080)
+
+# Label marking the Kubernetes objects that Overseer manages
+MANAGED_BY_LABEL = "app.kubernetes.io/managed-by"
+ENVIRONMENT_TYPE_LABEL = "a8s/environment-type"
+
+# Annotations recording what a deployment was created with, so that the
+# deployment store can be rebuilt from the cluster
+OWNER_ANNOTATION = "a8s/owner"
+FROM_SNAPSHOT_ANNOTATION = "a8s/from-snapshot"
+CALLBACK_URL_ANNOTATION = "a8s/callback-url"
+CALLBACK_EVENTS_ANNOTATION = "a8s/callback-events"
+
+# Size of the chunks logs are streamed in
+LOG_CHUNK_BYTES = 16 * 1024
+
+# Stands in for the deployment ID in manifest templates
+TEMPLATE_ID = "a8s-template-deployment-id"
+
+
+@dataclass(frozen=True)
+class ManifestTemplates:
+    """Pre-built manifests of an environment type, serialized as JSON.
+
+    Every occurrence of TEMPLATE_ID is replaced with the deployment ID when a
+    deployment is created.
+    """
+
+    deployment: str
+    service: str
+    ingress: str
+
+
+@dataclass(frozen=True)
+class ManagedDeployment:
+    """A deployment Overseer manages, as found in the cluster."""
+
+    id: str
+    environment_type: str
+    status: DeploymentStatus
+    # Naive UTC, like the timestamps of the deployment store
+    created_at: datetime
+    annotations: Dict[str, str]
+
+
+class LogStream(Iterator[bytes]):
+    """Chunks of a log stream, read from the API server as they are consumed.
+
+    A read can block for a long time while following, so the stream is ended by
+    closing its connection, which is safe from any thread and unblocks a read in
+    progress. The iterator itself must not be closed while another thread reads it.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], close: Callable[[], None]):
+        self._chunks = chunks
+        self._close = close
+
+    def __next__(self) -> bytes:
+        return next(self._chunks)
+
+    def close(self) -> None:
+        """Close the connection of the stream."""
+        self._close()
+
+# Separator between a deployment ID and the name of the shard it lives in
+SHARD_SEPARATOR = "--"
+
+# Deployment IDs name Services and ingress hosts and label every object, all of
+# which are limited to a 63 character DNS label
+MAX_DEPLOYMENT_ID_LENGTH = 63
+
 
 class KubernetesClient:
     """Client for interacting with Kubernetes."""
 
-    def __init__(self, namespace: str = "a8s"):
+    def __init__(
+        self,
+        namespace: str = "a8s",
+        context: Optional[str] = None,
+        shard_name: Optional[str] = None,
+        base_domain: str = BASE_DOMAIN,
+    ):
         """Initialize the Kubernetes client.
 
         Args:
             namespace: The namespace to use for deployments.
+            context: The kubeconfig context of the cluster, or None for the
+                in-cluster configuration (falling back to the current context).
+            shard_name: Name of the shard this client serves, appended to the IDs
+                of the deployments it creates.
+            base_domain: Domain under which deployment ingress hosts are created.
         """
         self.namespace = namespace
-        self._load_config()
-        self.core_api = client.CoreV1Api()
-        self.apps_api = client.AppsV1Api()
-        self.networking_api = client.NetworkingV1Api()
+        self.context = context
+        self.shard_name = shard_name
+        self.base_domain = base_domain
+        self.api_client = self._load_config()
+        self.core_api = client.CoreV1Api(self.api_client)
+        self.apps_api = client.AppsV1Api(self.api_client)
+        self.networking_api = client.NetworkingV1Api(self.api_client)
+        self.custom_api = client.CustomObjectsApi(self.api_client)
+        
+        # Build the manifests of every environment type once, so creating a
+        # deployment only has to fill in its ID and task payload
+        self.environments = get_environment_registry()
+        self.templates: Dict[str, ManifestTemplates] = {
+            name: self._build_templates(environment)
+            for name, environment in self.environments.environments.items()
+        }
+        self.shared_ingress: Optional[SharedIngressManager] = None
+        if INGRESS_MODE == IngressMode.SHARED:
+            self.shared_ingress = SharedIngressManager(
+                self.networking_api,
+                namespace=self.namespace,
+                base_domain=self.base_domain,
+                shards=INGRESS_SHARDS,
+                flush_interval=INGRESS_FLUSH_SECONDS,
+                routing=INGRESS_ROUTING,
+                shared_host=INGRESS_HOST,
+            )
 
-    def _load_config(self) -> None:
+    def _load_config(self) -> ApiClient:
         """Load Kubernetes configuration.
 
-        Tries to load in-cluster config first, falls back to kubeconfig.
+        Without a context, tries to load in-cluster config first and falls back to
+        kubeconfig. Each client gets its own API client, so clients for several
+        clusters can be used side by side.
+
+        Returns:
+            An API client for the cluster.
         """
-        try:
-            config.load_incluster_config()
-            logger.info("Loaded in-cluster Kubernetes configuration")
-        except config.ConfigException:
-            config.load_kube_config()
-            logger.info("Loaded kubeconfig Kubernetes configuration")
+        if self.context is None:
+            try:
+                configuration = client.Configuration()
+                config.load_incluster_config(client_configuration=configuration)
+                logger.info("Loaded in-cluster Kubernetes configuration")
+                return client.ApiClient(configuration)
+            except config.ConfigException:
+                pass
+        
+        api_client = config.new_client_from_config(context=self.context)
+        logger.info(f"Loaded kubeconfig Kubernetes configuration (context: {self.context or 'current'})")
+        return api_client
+
+    def count_deployments(self) -> int:
+        """Count the deployments Overseer manages in this client's namespace.
+
+        Returns:
+            The number of deployments.
+        """
+        deployments = self.apps_api.list_namespaced_deployment(
+            namespace=self.namespace, label_selector=f"{MANAGED_BY_LABEL}=overseer"
+        )
+        return len(deployments.items)
 
     def create_deployment(
         self,
@@ -50,59 +216,233 @@ class KubernetesClient:
         data: Dict[str, str],
         requirement: str,
         ttl_seconds: int = 3600,
+        snapshot_url: Optional[str] = None,
+        annotations: Optional[Dict[str, str]] = None,
     ) -> Tuple[str, Dict[str, str]]:
         """Create a new deployment.
 
+        The objects created before a failure are deleted again before the error
+        is raised.
+
         Args:
             environment_type: Type of environment to deploy.
             tools: List of tools to include in the environment.
             data: Data to pass to the environment.
             requirement: The requirement or task for the agent to execute.
             ttl_seconds: Time to live in seconds for the deployment.
+            snapshot_url: URL of a home directory snapshot to restore before starting.
+            annotations: Annotations to record on the Deployment object, returned
+                again by list_managed_deployments.
 
         Returns:
             Tuple of deployment ID and connection details.
+
+        Raises:
+            UnknownEnvironmentType: If the environment type is not registered.
+            TaskPayloadTooLarge: If the task payload does not fit into the task ConfigMaps.
         """
+        environment = self.environments.get(environment_type)
+        templates = self.templates[environment_type]
         deployment_id = f"a8s-{environment_type}-{uuid.uuid4().hex[:8]}"
+        if self.shard_name:
+            deployment_id = f"{deployment_id}{SHARD_SEPARATOR}{self.shard_name}"
         
-        # Create deployment
-        deployment = self._create_deployment_object(
-            deployment_id, environment_type, tools, data, requirement
+        # Pack the task payload before creating anything, so oversized payloads are rejected early
+        task_chunks = pack_task_files(
+            task_files(requirement, tools, data), slots=TASK_CONFIGMAP_SLOTS
         )
         
+        # Render deployment and add the tool list to the environment variables
+        deployment = self._render(templates.deployment, deployment_id)
+        if tools:
+            deployment["spec"]["template"]["spec"]["containers"][0]["env"].append(
+                {"name": "TOOLS", "value": ",".join(tools)}
+            )
+        if snapshot_url:
+            self._add_snapshot_restore(deployment, environment, snapshot_url)
+        if annotations:
+            deployment["metadata"].setdefault("annotations", {}).update(annotations)
+        
         try:
+            # Create the home volume claim, which outlives pauses of the deployment
+            if PERSISTENT_HOME:
+                self.core_api.create_namespaced_persistent_volume_claim(
+                    namespace=self.namespace,
+                    body=self._create_home_volume_claim_object(deployment_id),
+                )
+                logger.info(f"Created home volume claim for deployment {deployment_id}")
+            
+            # Create task ConfigMaps
+            self._write_task_config_maps(deployment_id, task_chunks, existing=set())
+            logger.info(
+                f"Created {len(task_chunks)} task ConfigMaps for deployment {deployment_id}"
+            )
+            
             self.apps_api.create_namespaced_deployment(
                 namespace=self.namespace, body=deployment
             )
             logger.info(f"Created deployment {deployment_id}")
             
             # Create service
-            service = self._create_service_object(deployment_id)
+            service = self._render(templates.service, deployment_id)
             self.core_api.create_namespaced_service(
                 namespace=self.namespace, body=service
             )
             logger.info(f"Created service for deployment {deployment_id}")
             
-            # Create ingress
-            ingress = self._create_ingress_object(deployment_id)
-            self.networking_api.create_namespaced_ingress(
-                namespace=self.namespace, body=ingress
-            )
-            logger.info(f"Created ingress for deployment {deployment_id}")
-            
-            # Return connection details
-            connection_details = {
-                "service_url": f"http://{deployment_id}.{self.namespace}.svc.cluster.local",
-                "ingress_host": f"{deployment_id}.example.com",  # This would be configured based on your ingress setup
-                "novnc_port": "6080",
-            }
+            # Create ingress, or queue a route on the shared ingress
+            if self.shared_ingress:
+                self.shared_ingress.add_route(
+                    deployment_id, port=environment.connect_port_number
+                )
+                logger.info(f"Queued shared ingress route for deployment {deployment_id}")
+            else:
+                ingress = self._render(templates.ingress, deployment_id)
+                self.networking_api.create_namespaced_ingress(
+                    namespace=self.namespace, body=ingress
+                )
+                logger.info(f"Created ingress for deployment {deployment_id}")
             
-            return deployment_id, connection_details
+            return deployment_id, self.get_connection_details(deployment_id, environment_type)
             
-        except ApiException as e:
-            logger.error(f"Error creating deployment: {e}")
+        except Exception as e:
+            logger.error(f"Error creating deployment {deployment_id}: {e}")
+            # Remove what was created so far, the caller never learns the ID to delete it
+            try:
+                self.delete_deployment(deployment_id)
+            except Exception as cleanup_error:
+                logger.error(
+                    f"Error cleaning up partially created deployment {deployment_id}: {cleanup_error}"
+                )
             raise
 
+    def get_connection_details(
+        self, deployment_id: str, environment_type: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Get the connection details of a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            environment_type: Type of the deployed environment, used to look up
+                the port users connect to (the noVNC port if not given).
+
+        Returns:
+            The connection details.
+        """
+        port = 6080
+        if environment_type in self.environments.environments:
+            port = self.environments.get(environment_type).connect_port_number
+        connection_details = {
+            "service_url": f"http://{deployment_id}.{self.namespace}.svc.cluster.local",
+            "ingress_host": f"{deployment_id}.{self.base_domain}",
+            "novnc_port": str(port),
+        }
+        if self.shared_ingress:
+            connection_details.update(self.shared_ingress.connection_details(deployment_id))
+        return connection_details
+
+    def update_task(
+        self,
+        deployment_id: str,
+        data: Dict[str, Optional[str]],
+        requirement: Optional[str] = None,
+    ) -> None:
+        """Update the task payload of a running deployment.
+
+        The task files are mounted from ConfigMaps, so the kubelet delivers the
+        new content to the running environment without restarting the pod.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            data: Data entries to set; entries set to None are removed.
+            requirement: The new requirement, if it changes.
+
+        Raises:
+            TaskPayloadTooLarge: If the updated payload does not fit into the task ConfigMaps.
+        """
+        config_maps = self.core_api.list_namespaced_config_map(
+            namespace=self.namespace, label_selector=f"app={deployment_id},a8s/task=true"
+        ).items
+        files = unpack_task_files([config_map.data or {} for config_map in config_maps])
+        
+        if requirement is not None:
+            files["requirement"] = requirement
+        for key, value in data.items():
+            if value is None:
+                files.pop(f"data.{key}", None)
+            else:
+                files[f"data.{key}"] = value
+        
+        task_chunks = pack_task_files(files, slots=TASK_CONFIGMAP_SLOTS)
+        self._write_task_config_maps(
+            deployment_id,
+            task_chunks,
+            existing={config_map.metadata.name for config_map in config_maps},
+        )
+        logger.info(f"Updated task payload of deployment {deployment_id}")
+
+    def get_task(self, deployment_id: str) -> Tuple[str, List[str], Dict[str, str]]:
+        """Read back the task payload of a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            The requirement, tools and data of the deployment.
+        """
+        config_maps = self.core_api.list_namespaced_config_map(
+            namespace=self.namespace, label_selector=f"app={deployment_id},a8s/task=true"
+        ).items
+        files = unpack_task_files([config_map.data or {} for config_map in config_maps])
+        
+        tools = [tool for tool in files.pop("tools", "").split(",") if tool]
+        requirement = files.pop("requirement", "")
+        data = {
+            name[len("data."):]: content
+            for name, content in files.items()
+            if name.startswith("data.")
+        }
+        return requirement, tools, data
+
+    def cordon_node(self, node_name: str) -> bool:
+        """Mark a node unschedulable, so that no new environments are placed on it.
+
+        Args:
+            node_name: The name of the node.
+
+        Returns:
+            Whether the node exists in this client's cluster.
+        """
+        try:
+            self.core_api.patch_node(name=node_name, body={"spec": {"unschedulable": True}})
+        except client.ApiException as e:
+            if e.status == 404:
+                return False
+            raise
+        logger.info(f"Cordoned node {node_name}")
+        return True
+
+    def list_deployments_on_node(self, node_name: str) -> List[str]:
+        """Get the managed deployments with a pod on a node.
+
+        Args:
+            node_name: The name of the node.
+
+        Returns:
+            The IDs of the deployments.
+        """
+        pods = self.core_api.list_namespaced_pod(
+            namespace=self.namespace,
+            label_selector=f"{MANAGED_BY_LABEL}=overseer",
+            field_selector=f"spec.nodeName={node_name}",
+        ).items
+        deployment_ids = {
+            pod.metadata.labels.get("app")
+            for pod in pods
+            if pod.status.phase not in ("Succeeded", "Failed")
+        }
+        return sorted(deployment_id for deployment_id in deployment_ids if deployment_id)
+
     def get_deployment_status(self, deployment_id: str) -> DeploymentStatus:
         """Get the status of a deployment.
 
@@ -116,125 +456,691 @@ class KubernetesClient:
             deployment = self.apps_api.read_namespaced_deployment(
                 name=deployment_id, namespace=self.namespace
             )
+            return self._status_of(deployment)
             
-            # Check if deployment is available
-            if deployment.status.available_replicas is None or deployment.status.available_replicas < 1:
-                return DeploymentStatus.CREATING
-            
-            return DeploymentStatus.RUNNING
-            
-        except ApiException as e:
+        except client.ApiException as e:
             if e.status == 404:
                 return DeploymentStatus.TERMINATED
             logger.error(f"Error getting deployment status: {e}")
             return DeploymentStatus.FAILED
 
-    def delete_deployment(self, deployment_id: str) -> None:
+    def list_deployment_statuses(self) -> Dict[str, DeploymentStatus]:
+        """Get the status of every deployment Overseer manages in this client's namespace.
+
+        Returns:
+            Deployment ID -> status.
+        """
+        deployments = self.apps_api.list_namespaced_deployment(
+            namespace=self.namespace, label_selector=f"{MANAGED_BY_LABEL}=overseer"
+        )
+        return {
+            deployment.metadata.name: self._status_of(deployment)
+            for deployment in deployments.items
+        }
+
+    def list_managed_deployments(self) -> List[ManagedDeployment]:
+        """Get every deployment Overseer manages in this client's namespace.
+
+        Returns:
+            The deployments, with their status and the annotations they were created with.
+        """
+        deployments = self.apps_api.list_namespaced_deployment(
+            namespace=self.namespace, label_selector=f"{MANAGED_BY_LABEL}=overseer"
+        )
+        managed = []
+        for deployment in deployments.items:
+            metadata = deployment.metadata
+            created_at = metadata.creation_timestamp or datetime.now(timezone.utc)
+            managed.append(
+                ManagedDeployment(
+                    id=metadata.name,
+                    environment_type=(metadata.labels or {}).get(ENVIRONMENT_TYPE_LABEL, ""),
+                    status=self._status_of(deployment),
+                    created_at=created_at.astimezone(timezone.utc).replace(tzinfo=None),
+                    annotations=dict(metadata.annotations or {}),
+                )
+            )
+        return managed
+
+    def _status_of(self, deployment: V1Deployment) -> DeploymentStatus:
+        """Derive the status of a deployment from its Kubernetes object.
+
+        Args:
+            deployment: The Kubernetes Deployment object.
+
+        Returns:
+            The status of the deployment.
+        """
+        # A deployment scaled to zero has been paused
+        if deployment.spec.replicas == 0:
+            return DeploymentStatus.PAUSED
+        
+        # Check if deployment is available
+        available = deployment.status.available_replicas if deployment.status else None
+        if available is None or available < 1:
+            return DeploymentStatus.CREATING
+        
+        return DeploymentStatus.RUNNING
+
+    def scale_deployment(self, deployment_id: str, replicas: int) -> None:
+        """Scale a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            replicas: The number of replicas to scale to.
+        """
+        self.apps_api.patch_namespaced_deployment_scale(
+            name=deployment_id,
+            namespace=self.namespace,
+            body={"spec": {"replicas": replicas}},
+        )
+        logger.info(f"Scaled deployment {deployment_id} to {replicas} replicas")
+
+    def count_vnc_connections(self, deployment_id: str) -> int:
+        """Count the VNC clients connected to a deployment.
+
+        Reads the TCP connection table inside the pod, so it works without any
+        networking tools installed in the environment image.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            The number of established connections to the VNC and noVNC ports.
+        """
+        pod_name = self._running_pod(deployment_id)
+        if not pod_name:
+            return 0
+        
+        output = k8s_stream.stream(
+            self.core_api.connect_get_namespaced_pod_exec,
+            name=pod_name,
+            namespace=self.namespace,
+            command=["cat", "/proc/net/tcp", "/proc/net/tcp6"],
+            stderr=False,
+            stdin=False,
+            stdout=True,
+            tty=False,
+        )
+        
+        connections = 0
+        for line in output.splitlines():
+            fields = line.split()
+            # Columns: sl local_address rem_address st ...; state 01 is ESTABLISHED
+            if len(fields) < 4 or fields[3] != "01":
+                continue
+            local_port = int(fields[1].rsplit(":", 1)[-1], 16)
+            if local_port in VNC_PORTS:
+                connections += 1
+        return connections
+
+    def stream_container_logs(
+        self,
+        deployment_id: str,
+        follow: bool = False,
+        since_seconds: Optional[int] = None,
+    ) -> LogStream:
+        """Stream the container logs of a deployment.
+
+        The request is sent before this returns, so a missing pod raises here
+        rather than in the middle of the stream. Chunks are read from the API
+        server only as fast as they are consumed.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            follow: Whether to keep streaming new log lines.
+            since_seconds: Only return logs newer than this many seconds.
+
+        Returns:
+            The log chunks; close the stream to end it.
+
+        Raises:
+            LookupError: If the deployment has no running pod.
+        """
+        pod_name = self._running_pod(deployment_id)
+        if not pod_name:
+            raise LookupError(f"Deployment {deployment_id} has no running pod")
+        
+        response = self.core_api.read_namespaced_pod_log(
+            name=pod_name,
+            namespace=self.namespace,
+            container=deployment_id,
+            follow=follow,
+            since_seconds=since_seconds,
+            _preload_content=False,
+        )
+        
+        def chunks() -> Iterator[bytes]:
+            try:
+                yield from response.stream(LOG_CHUNK_BYTES)
+            finally:
+                response.release_conn()
+        
+        def close() -> None:
+            # shutdown() (urllib3 2.3+) wakes up a read blocked in another thread
+            if hasattr(response, "shutdown"):
+                response.shutdown()
+            response.close()
+            response.release_conn()
+        
+        return LogStream(chunks(), close)
+
+    def stream_file(self, deployment_id: str, path: str, follow: bool = False) -> LogStream:
+        """Stream a file from inside the container of a deployment.
+
+        Runs ``tail`` in the container, following the file across rotations
+        when ``follow`` is set. Output is only read from the exec connection
+        as fast as it is consumed.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            path: Absolute path of the file in the container.
+            follow: Whether to keep streaming data appended to the file.
+
+        Returns:
+            The file chunks; close the stream to end it.
+
+        Raises:
+            LookupError: If the deployment has no running pod.
+        """
+        pod_name = self._running_pod(deployment_id)
+        if not pod_name:
+            raise LookupError(f"Deployment {deployment_id} has no running pod")
+        
+        command = ["tail", "-c", "+1"] + (["-F"] if follow else []) + [path]
+        response = k8s_stream.stream(
+            self.core_api.connect_get_namespaced_pod_exec,
+            name=pod_name,
+            namespace=self.namespace,
+            command=command,
+            stderr=True,
+            stdin=False,
+            stdout=True,
+            tty=False,
+            _preload_content=False,
+        )
+        
+        def chunks() -> Iterator[bytes]:
+            try:
+                while response.is_open():
+                    response.update(timeout=1)
+                    if response.peek_stdout():
+                        yield response.read_stdout().encode()
+                    if response.peek_stderr():
+                        logger.warning(
+                            f"tail {path} in {deployment_id}: {response.read_stderr().strip()}"
+                        )
+                # Drain what arrived together with the close frame
+                remaining = response.read_stdout()
+                if remaining:
+                    yield remaining.encode()
+            finally:
+                response.close()
+        
+        return LogStream(chunks(), response.close)
+
+    def capture_home(self, deployment_id: str, destination: BinaryIO) -> int:
+        """Write a compressed tarball of a deployment's home directory.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            destination: Binary file the tarball is written to.
+
+        Returns:
+            The number of bytes written.
+
+        Raises:
+            LookupError: If the deployment has no running pod.
+            RuntimeError: If tar fails in the container.
+        """
+        pod_name = self._running_pod(deployment_id)
+        if not pod_name:
+            raise LookupError(f"Deployment {deployment_id} has no running pod")
+        
+        response = k8s_stream.stream(
+            self.core_api.connect_get_namespaced_pod_exec,
+            name=pod_name,
+            namespace=self.namespace,
+            command=["tar", "-czf", "-", "--exclude=./.cache", "-C", HOME_DIR, "."],
+            stderr=True,
+            stdin=False,
+            stdout=True,
+            tty=False,
+            binary=True,
+            _preload_content=False,
+        )
+        
+        written = 0
+        errors = b""
+        try:
+            while response.is_open():
+                response.update(timeout=1)
+                if response.peek_stdout():
+                    written += destination.write(response.read_stdout())
+                if response.peek_stderr():
+                    errors += response.read_stderr()
+            written += destination.write(response.read_stdout() or b"")
+        finally:
+            response.close()
+        
+        # tar exits with 1 when files changed while being read, which is fine for a live desktop
+        if response.returncode not in (0, 1):
+            raise RuntimeError(
+                f"Capturing the home directory of {deployment_id} failed: "
+                f"{errors.decode(errors='replace').strip()}"
+            )
+        return written
+
+    def _running_pod(self, deployment_id: str) -> Optional[str]:
+        """Get the name of a running pod of a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            The pod name, or None if no pod is running.
+        """
+        pods = self.core_api.list_namespaced_pod(
+            namespace=self.namespace, label_selector=f"app={deployment_id}"
+        ).items
+        running = [pod for pod in pods if pod.status.phase == "Running"]
+        return running[0].metadata.name if running else None
+
+    def list_pod_metrics(self) -> Dict[str, Tuple[float, int]]:
+        """Get the current resource usage of all managed environments.
+
+        Uses a single call to the metrics API for the whole namespace.
+
+        Returns:
+            Deployment ID -> (CPU usage in cores, memory usage in bytes).
+        """
+        pod_metrics = self.custom_api.list_namespaced_custom_object(
+            group="metrics.k8s.io",
+            version="v1beta1",
+            namespace=self.namespace,
+            plural="pods",
+            label_selector=f"{MANAGED_BY_LABEL}=overseer",
+        )
+        
+        usage = {}
+        for item in pod_metrics.get("items", []):
+            deployment_id = item["metadata"].get("labels", {}).get("app")
+            if not deployment_id:
+                continue
+            cpu = sum(
+                float(parse_quantity(container["usage"]["cpu"]))
+                for container in item.get("containers", [])
+            )
+            memory = sum(
+                int(parse_quantity(container["usage"]["memory"]))
+                for container in item.get("containers", [])
+            )
+            usage[deployment_id] = (cpu, memory)
+        return usage
+
+    def delete_deployment(self, deployment_id: str) -> bool:
         """Delete a deployment.
 
+        Every object of the deployment is deleted on its own, so one that is
+        already gone (such as the ingress in shared ingress mode, or after a
+        partial create) does not leave the others behind.
+
         Args:
             deployment_id: The ID of the deployment.
+
+        Returns:
+            Whether any object of the deployment still existed.
         """
+        existed = False
+        
+        # Delete ingress, or queue removal of the shared ingress route
+        if self.shared_ingress:
+            self.shared_ingress.remove_route(deployment_id)
+            logger.info(f"Queued removal of shared ingress route for deployment {deployment_id}")
+        else:
+            existed |= self._delete_if_exists(
+                "ingress", self.networking_api.delete_namespaced_ingress, deployment_id
+            )
+        
+        existed |= self._delete_if_exists(
+            "service", self.core_api.delete_namespaced_service, deployment_id
+        )
+        existed |= self._delete_if_exists(
+            "deployment", self.apps_api.delete_namespaced_deployment, deployment_id
+        )
+        
+        # Delete task ConfigMaps
         try:
-            # Delete ingress
-            self.networking_api.delete_namespaced_ingress(
-                name=deployment_id, namespace=self.namespace
+            self.core_api.delete_collection_namespaced_config_map(
+                namespace=self.namespace, label_selector=f"app={deployment_id},a8s/task=true"
             )
-            logger.info(f"Deleted ingress for deployment {deployment_id}")
-            
-            # Delete service
-            self.core_api.delete_namespaced_service(
-                name=deployment_id, namespace=self.namespace
+            logger.info(f"Deleted task ConfigMaps for deployment {deployment_id}")
+        except client.ApiException as e:
+            logger.error(f"Error deleting task ConfigMaps of deployment {deployment_id}: {e}")
+            raise
+        
+        # Delete the home volume claim
+        if PERSISTENT_HOME:
+            existed |= self._delete_if_exists(
+                "home volume claim",
+                self.core_api.delete_namespaced_persistent_volume_claim,
+                f"{deployment_id}-home",
             )
-            logger.info(f"Deleted service for deployment {deployment_id}")
-            
-            # Delete deployment
-            self.apps_api.delete_namespaced_deployment(
-                name=deployment_id, namespace=self.namespace
+        
+        return existed
+
+    def _delete_if_exists(self, kind: str, delete: Callable[..., object], name: str) -> bool:
+        """Delete a namespaced object, ignoring that it does not exist.
+
+        Args:
+            kind: Kind of the object, for logging.
+            delete: The API method deleting objects of that kind.
+            name: The name of the object.
+
+        Returns:
+            Whether the object existed.
+        """
+        try:
+            delete(name=name, namespace=self.namespace)
+        except client.ApiException as e:
+            if e.status == 404:
+                return False
+            logger.error(f"Error deleting {kind} {name}: {e}")
+            raise
+        logger.info(f"Deleted {kind} {name}")
+        return True
+
+    def flush_ingress(self) -> None:
+        """Write the queued shared ingress route changes, e.g. before shutting down."""
+        if self.shared_ingress:
+            self.shared_ingress.close()
+
+    def _task_config_map_name(self, deployment_id: str, slot: int) -> str:
+        """Get the name of a task ConfigMap.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            slot: The slot of the ConfigMap in the task volume.
+
+        Returns:
+            The ConfigMap name.
+        """
+        return f"{deployment_id}-task-{slot}"
+
+    def _write_task_config_maps(
+        self, deployment_id: str, task_chunks: List[Dict[str, str]], existing: Set[str]
+    ) -> None:
+        """Write the task ConfigMaps of a deployment and remove unused ones.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            task_chunks: The data of each task ConfigMap, in slot order.
+            existing: Names of the task ConfigMaps that currently exist.
+        """
+        for slot, chunk in enumerate(task_chunks):
+            name = self._task_config_map_name(deployment_id, slot)
+            config_map = client.V1ConfigMap(
+                api_version="v1",
+                kind="ConfigMap",
+                metadata=client.V1ObjectMeta(
+                    name=name, labels={"app": deployment_id, "a8s/task": "true"}
+                ),
+                data=chunk,
             )
-            logger.info(f"Deleted deployment {deployment_id}")
-            
-        except ApiException as e:
-            if e.status != 404:  # Ignore 404 errors (not found)
-                logger.error(f"Error deleting deployment: {e}")
-                raise
+            if name in existing:
+                self.core_api.replace_namespaced_config_map(
+                    name=name, namespace=self.namespace, body=config_map
+                )
+            else:
+                self.core_api.create_namespaced_config_map(
+                    namespace=self.namespace, body=config_map
+                )
+        
+        unused = existing - {
+            self._task_config_map_name(deployment_id, slot) for slot in range(len(task_chunks))
+        }
+        for name in unused:
+            self.core_api.delete_namespaced_config_map(name=name, namespace=self.namespace)
+
+    def _build_templates(self, environment: EnvironmentType) -> ManifestTemplates:
+        """Build the manifest templates of an environment type.
+
+        Args:
+            environment: The environment type.
+
+        Returns:
+            The serialized manifests, with TEMPLATE_ID in place of the deployment ID.
+        """
+        def serialize(obj) -> str:
+            return json.dumps(self.api_client.sanitize_for_serialization(obj))
+        
+        return ManifestTemplates(
+            deployment=serialize(self._create_deployment_object(TEMPLATE_ID, environment)),
+            service=serialize(self._create_service_object(TEMPLATE_ID, environment)),
+            ingress=serialize(self._create_ingress_object(TEMPLATE_ID, environment)),
+        )
+
+    def _render(self, template: str, deployment_id: str) -> Dict:
+        """Render a manifest template for a deployment.
+
+        Args:
+            template: The serialized manifest template.
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            The manifest, ready to be sent to the API server.
+        """
+        return json.loads(template.replace(TEMPLATE_ID, deployment_id))
+
+    def _add_snapshot_restore(
+        self, deployment: Dict, environment: EnvironmentType, snapshot_url: str
+    ) -> None:
+        """Make a rendered deployment restore a home directory snapshot before starting.
+
+        Args:
+            deployment: The rendered deployment manifest.
+            environment: Type of environment deployed.
+            snapshot_url: URL of the snapshot tarball.
+        """
+        pod_spec = deployment["spec"]["template"]["spec"]
+        
+        # Without a home claim the restored home lives in an emptyDir volume
+        if not PERSISTENT_HOME:
+            pod_spec["volumes"].append({"name": "home", "emptyDir": {}})
+            pod_spec["containers"][0]["volumeMounts"].append(
+                {"name": "home", "mountPath": HOME_DIR}
+            )
+        
+        init_container = client.V1Container(
+            name="restore-snapshot",
+            image=environment.image,
+            image_pull_policy=environment.image_pull_policy,
+            command=[
+                "sh",
+                "-c",
+                "([ -e /mnt/home/.a8s-seeded ] || "
+                f"(cp -a {HOME_DIR}/. /mnt/home/ && touch /mnt/home/.a8s-seeded)) && "
+                'curl -sfL -o /tmp/snapshot.tar.gz "$SNAPSHOT_URL" && '
+                "tar -xzf /tmp/snapshot.tar.gz -C /mnt/home",
+            ],
+            env=[client.V1EnvVar(name="SNAPSHOT_URL", value=snapshot_url)],
+            volume_mounts=[client.V1VolumeMount(name="home", mount_path="/mnt/home")],
+        )
+        pod_spec.setdefault("initContainers", []).append(
+            self.api_client.sanitize_for_serialization(init_container)
+        )
 
     def _create_deployment_object(
         self,
         deployment_id: str,
-        environment_type: str,
-        tools: List[str],
-        data: Dict[str, str],
-        requirement: str,
-    ) -> client.V1Deployment:
+        environment: EnvironmentType,
+    ) -> V1Deployment:
         """Create a Kubernetes Deployment object.
 
         Args:
             deployment_id: The ID of the deployment.
-            environment_type: Type of environment to deploy.
-            tools: List of tools to include in the environment.
-            data: Data to pass to the environment.
-            requirement: The requirement or task for the agent to execute.
+            environment: Type of environment to deploy.
 
         Returns:
             A Kubernetes Deployment object.
         """
-        # Convert tools and data to environment variables
+        # The requirement and data are mounted as files from the task ConfigMaps,
+        # only their location and the (small) tool list are passed as variables.
+        # The agent reports its activity to the heartbeat endpoint of this deployment.
         env_vars = [
-            client.V1EnvVar(name="REQUIREMENT", value=requirement),
+            client.V1EnvVar(name="TASK_DIR", value=TASK_DIR),
+            client.V1EnvVar(name="OVERSEER_URL", value=OVERSEER_URL),
+            client.V1EnvVar(name="DEPLOYMENT_ID", value=deployment_id),
         ]
         
-        # Add tools as comma-separated list
-        if tools:
-            env_vars.append(client.V1EnvVar(name="TOOLS", value=",".join(tools)))
+        # Project every task ConfigMap slot into one directory. Unused slots are
+        # optional, so an update can grow into them without changing the pod spec.
+        task_volume = client.V1Volume(
+            name="task",
+            projected=client.V1ProjectedVolumeSource(
+                sources=[
+                    client.V1VolumeProjection(
+                        config_map=client.V1ConfigMapProjection(
+                            name=self._task_config_map_name(deployment_id, slot),
+                            optional=True,
+                        ),
+                    )
+                    for slot in range(TASK_CONFIGMAP_SLOTS)
+                ],
+            ),
+        )
         
-        # Add data as individual environment variables
-        for key, value in data.items():
-            env_vars.append(client.V1EnvVar(name=f"DATA_{key.upper()}", value=value))
+        # Create readiness probe
+        readiness_probe = None
+        if environment.readiness_probe:
+            probe = environment.readiness_probe
+            readiness_probe = client.V1Probe(
+                http_get=client.V1HTTPGetAction(path=probe.http_path, port=probe.port)
+                if probe.http_path
+                else None,
+                tcp_socket=None
+                if probe.http_path
+                else client.V1TCPSocketAction(port=probe.port),
+                initial_delay_seconds=probe.initial_delay_seconds,
+                period_seconds=probe.period_seconds,
+            )
         
         # Create container
         container = client.V1Container(
             name=deployment_id,
-            image=f"a8s-{environment_type}:latest",
+            image=environment.image,
             env=env_vars,
-            image_pull_policy="Never",
+            image_pull_policy=environment.image_pull_policy,
+            volume_mounts=[
+                client.V1VolumeMount(name="task", mount_path=TASK_DIR, read_only=True),
+            ],
             ports=[
-                client.V1ContainerPort(container_port=6080, name="novnc"),
+                client.V1ContainerPort(container_port=port.container_port, name=port.name)
+                for port in environment.ports
             ],
+            readiness_probe=readiness_probe,
             resources=client.V1ResourceRequirements(
-                requests={"cpu": "500m", "memory": "1Gi"},
-                limits={"cpu": "2", "memory": "4Gi"},
+                requests=environment.resources.requests,
+                limits=environment.resources.limits,
             ),
         )
         
+        volumes = [task_volume]
+        init_containers = None
+        if PERSISTENT_HOME:
+            # Keep the home directory on the claim, seeded from the image on first start
+            volumes.append(
+                client.V1Volume(
+                    name="home",
+                    persistent_volume_claim=client.V1PersistentVolumeClaimVolumeSource(
+                        claim_name=f"{deployment_id}-home",
+                    ),
+                )
+            )
+            container.volume_mounts.append(
+                client.V1VolumeMount(name="home", mount_path=HOME_DIR)
+            )
+            init_containers = [
+                client.V1Container(
+                    name="seed-home",
+                    image=container.image,
+                    image_pull_policy=container.image_pull_policy,
+                    command=[
+                        "sh",
+                        "-c",
+                        "[ -e /mnt/home/.a8s-seeded ] || "
+                        f"(cp -a {HOME_DIR}/. /mnt/home/ && touch /mnt/home/.a8s-seeded)",
+                    ],
+                    volume_mounts=[client.V1VolumeMount(name="home", mount_path="/mnt/home")],
+                ),
+            ]
+        
         # Create template
+        labels = {
+            "app": deployment_id,
+            MANAGED_BY_LABEL: "overseer",
+            ENVIRONMENT_TYPE_LABEL: environment.name,
+        }
         template = client.V1PodTemplateSpec(
-            metadata=client.V1ObjectMeta(labels={"app": deployment_id}),
-            spec=client.V1PodSpec(containers=[container]),
+            metadata=client.V1ObjectMeta(labels=labels),
+            spec=client.V1PodSpec(
+                containers=[container], init_containers=init_containers, volumes=volumes
+            ),
         )
         
-        # Create spec
+        # Create spec. A home volume can only be mounted by one pod at a time, so
+        # the old pod must be gone before a new one starts.
         spec = client.V1DeploymentSpec(
             replicas=1,
             selector=client.V1LabelSelector(match_labels={"app": deployment_id}),
             template=template,
+            strategy=client.V1DeploymentStrategy(type="Recreate") if PERSISTENT_HOME else None,
         )
         
         # Create deployment
         deployment = client.V1Deployment(
             api_version="apps/v1",
             kind="Deployment",
-            metadata=client.V1ObjectMeta(name=deployment_id),
+            metadata=client.V1ObjectMeta(name=deployment_id, labels=labels),
             spec=spec,
         )
         
         return deployment
 
-    def _create_service_object(self, deployment_id: str) -> client.V1Service:
+    def _create_home_volume_claim_object(
+        self, deployment_id: str
+    ) -> V1PersistentVolumeClaim:
+        """Create a Kubernetes PersistentVolumeClaim object for a home directory.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            A Kubernetes PersistentVolumeClaim object.
+        """
+        return client.V1PersistentVolumeClaim(
+            api_version="v1",
+            kind="PersistentVolumeClaim",
+            metadata=client.V1ObjectMeta(
+                name=f"{deployment_id}-home", labels={"app": deployment_id}
+            ),
+            spec=client.V1PersistentVolumeClaimSpec(
+                access_modes=["ReadWriteOnce"],
+                storage_class_name=HOME_STORAGE_CLASS,
+                resources=client.V1VolumeResourceRequirements(
+                    requests={"storage": HOME_STORAGE_SIZE}
+                ),
+            ),
+        )
+
+    def _create_service_object(
+        self, deployment_id: str, environment: EnvironmentType
+    ) -> V1Service:
         """Create a Kubernetes Service object.
 
         Args:
             deployment_id: The ID of the deployment.
+            environment: Type of environment deployed.
 
         Returns:
             A Kubernetes Service object.
@@ -247,18 +1153,26 @@ class KubernetesClient:
             spec=client.V1ServiceSpec(
                 selector={"app": deployment_id},
                 ports=[
-                    client.V1ServicePort(port=6080, target_port=6080, name="novnc"),
+                    client.V1ServicePort(
+                        port=port.container_port,
+                        target_port=port.container_port,
+                        name=port.name,
+                    )
+                    for port in environment.ports
                 ],
             ),
         )
         
         return service
 
-    def _create_ingress_object(self, deployment_id: str) -> client.V1Ingress:
+    def _create_ingress_object(
+        self, deployment_id: str, environment: EnvironmentType
+    ) -> V1Ingress:
         """Create a Kubernetes Ingress object.
 
         Args:
             deployment_id: The ID of the deployment.
+            environment: Type of environment deployed.
 
         Returns:
             A Kubernetes Ingress object.
@@ -271,7 +1185,7 @@ class KubernetesClient:
             spec=client.V1IngressSpec(
                 rules=[
                     client.V1IngressRule(
-                        host=f"{deployment_id}.example.com",  # This would be configured based on your ingress setup
+                        host=f"{deployment_id}.{self.base_domain}",
                         http=client.V1HTTPIngressRuleValue(
                             paths=[
                                 client.V1HTTPIngressPath(
@@ -281,7 +1195,7 @@ class KubernetesClient:
                                         service=client.V1IngressServiceBackend(
                                             name=deployment_id,
                                             port=client.V1ServiceBackendPort(
-                                                number=6080,
+                                                number=environment.connect_port_number,
                                             ),
                                         ),
                                     ),
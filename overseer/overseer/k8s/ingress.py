@@ -0,0 +1,358 @@
+"""
+Shared ingress management for the Overseer API.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import zlib
+from enum import Enum
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from overseer.lazy import LazyModule
+
+client = LazyModule("kubernetes.client")
+
+if TYPE_CHECKING:
+    from kubernetes.client import NetworkingV1Api, V1Ingress, V1IngressBackend
+
+logger = logging.getLogger(__name__)
+
+# Read-modify-write attempts for a shard written concurrently by other processes
+WRITE_ATTEMPTS = 5
+
+
+class IngressMode(str, Enum):
+    """How deployments are exposed through ingress."""
+
+    PER_DEPLOYMENT = "per-deployment"
+    SHARED = "shared"
+
+
+class IngressRouting(str, Enum):
+    """How a shared ingress tells deployments apart."""
+
+    HOST = "host"
+    PATH = "path"
+
+
+class SharedIngressManager:
+    """Maintains a small sharded set of Ingress objects for all deployments.
+
+    Deployments are assigned to a shard by a stable hash of their ID. Route
+    changes are queued per shard; queued changes are written to the API server
+    together once the flush interval has elapsed, so a burst of creates and
+    deletes results in a single ingress controller reload per shard.
+
+    Several processes (workers or replicas) write the same Ingress objects, so
+    each write reads the current object, applies only this process's queued
+    changes to it and replaces it at the version it read, retrying on conflict.
+    """
+
+    def __init__(
+        self,
+        networking_api: NetworkingV1Api,
+        namespace: str,
+        base_domain: str,
+        shards: int = 1,
+        flush_interval: float = 2.0,
+        routing: IngressRouting = IngressRouting.HOST,
+        shared_host: Optional[str] = None,
+        name_prefix: str = "a8s-shared",
+    ):
+        """Initialize the shared ingress manager.
+
+        Args:
+            networking_api: The networking API used to write Ingress objects.
+            namespace: The namespace the Ingress objects live in.
+            base_domain: Domain under which per-deployment hosts are created.
+            shards: Number of Ingress objects routes are spread across.
+            flush_interval: Seconds to coalesce route changes before writing.
+            routing: Whether deployments are routed by host or by path.
+            shared_host: Host used for path routing (defaults to base_domain).
+            name_prefix: Prefix for the names of the shared Ingress objects.
+        """
+        self.networking_api = networking_api
+        self.namespace = namespace
+        self.base_domain = base_domain
+        self.shards = max(1, shards)
+        self.flush_interval = flush_interval
+        self.routing = routing
+        self.shared_host = shared_host or base_domain
+        self.name_prefix = name_prefix
+
+        # Queued changes: deployment ID -> (service name, service port), or None
+        # for a removed route, per shard
+        self._pending: List[Dict[str, Optional[tuple]]] = [{} for _ in range(self.shards)]
+        self._dirty: Set[int] = set()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def shard_for(self, deployment_id: str) -> int:
+        """Get the shard a deployment is routed through.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            The shard index.
+        """
+        return zlib.crc32(deployment_id.encode()) % self.shards
+
+    def ingress_name(self, shard: int) -> str:
+        """Get the name of the Ingress object for a shard.
+
+        Args:
+            shard: The shard index.
+
+        Returns:
+            The Ingress object name.
+        """
+        return f"{self.name_prefix}-{shard}"
+
+    def connection_details(self, deployment_id: str) -> Dict[str, str]:
+        """Get the ingress part of a deployment's connection details.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            The ingress host, plus the path prefix when routing by path.
+        """
+        if self.routing == IngressRouting.PATH:
+            return {"ingress_host": self.shared_host, "ingress_path": f"/{deployment_id}/"}
+        return {"ingress_host": f"{deployment_id}.{self.base_domain}"}
+
+    def add_route(self, deployment_id: str, service_name: Optional[str] = None, port: int = 6080) -> None:
+        """Add or update the route for a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            service_name: The service to route to (defaults to the deployment ID).
+            port: The service port to route to.
+        """
+        shard = self.shard_for(deployment_id)
+        with self._lock:
+            self._pending[shard][deployment_id] = (service_name or deployment_id, port)
+            self._mark_dirty(shard)
+
+    def remove_route(self, deployment_id: str) -> None:
+        """Remove the route for a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+        """
+        shard = self.shard_for(deployment_id)
+        with self._lock:
+            self._pending[shard][deployment_id] = None
+            self._mark_dirty(shard)
+
+    def flush(self) -> None:
+        """Write all dirty shards to the API server."""
+        with self._lock:
+            self._timer = None
+            dirty = sorted(self._dirty)
+            self._dirty.clear()
+            changes = {shard: self._pending[shard] for shard in dirty}
+            for shard in dirty:
+                self._pending[shard] = {}
+
+        failed = {}
+        for shard, shard_changes in changes.items():
+            try:
+                routes = self._write_shard(shard, shard_changes)
+                logger.info(
+                    f"Updated shared ingress {self.ingress_name(shard)} with {routes} routes"
+                )
+            except Exception as e:
+                # Runs in a timer thread, so nothing else would see the error; the
+                # changes are kept and written with the next flush
+                logger.error(f"Error updating shared ingress {self.ingress_name(shard)}: {e}")
+                failed[shard] = shard_changes
+
+        if failed:
+            with self._lock:
+                for shard, shard_changes in failed.items():
+                    # Changes queued since the flush are newer than the failed ones
+                    self._pending[shard] = {**shard_changes, **self._pending[shard]}
+                    self._mark_dirty(shard)
+
+    def close(self) -> None:
+        """Write the queued route changes now instead of after the flush interval."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self.flush()
+
+    def _mark_dirty(self, shard: int) -> None:
+        """Mark a shard as dirty and schedule a flush. Must hold the lock."""
+        self._dirty.add(shard)
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _read_routes(self, name: str) -> Tuple[Dict[str, tuple], Optional[str]]:
+        """Read the routes of a shared Ingress object.
+
+        Args:
+            name: The name of the Ingress object.
+
+        Returns:
+            Deployment ID -> (service name, service port), and the resource version
+            that was read (None if the object does not exist).
+        """
+        try:
+            ingress = self.networking_api.read_namespaced_ingress(
+                name=name, namespace=self.namespace
+            )
+        except client.ApiException as e:
+            if e.status != 404:
+                raise
+            return {}, None
+
+        routes: Dict[str, tuple] = {}
+        for rule in (ingress.spec.rules if ingress.spec else None) or []:
+            for path in (rule.http.paths if rule.http else None) or []:
+                service = path.backend.service
+                # Every route written here points to the port of a service
+                if service is None or service.port is None:
+                    continue
+                if self.routing == IngressRouting.PATH:
+                    deployment_id = (path.path or "").lstrip("/").split("(", 1)[0]
+                else:
+                    deployment_id = (rule.host or "").removesuffix(f".{self.base_domain}")
+                routes[deployment_id] = (service.name, service.port.number)
+        return routes, ingress.metadata.resource_version if ingress.metadata else None
+
+    def _write_shard(self, shard: int, changes: Dict[str, Optional[tuple]]) -> int:
+        """Apply route changes to the Ingress object of a shard.
+
+        The object is read, changed and written back at the version that was
+        read; when another process wrote it in between, the write is retried on
+        the new version, so no process overwrites the routes of another.
+
+        Args:
+            shard: The shard index.
+            changes: Deployment ID -> (service name, service port), or None to
+                remove the route.
+
+        Returns:
+            The number of routes in the shard after the write.
+
+        Raises:
+            ApiException: If the object could not be written, or kept changing
+                for all attempts.
+        """
+        name = self.ingress_name(shard)
+        for attempt in range(WRITE_ATTEMPTS):
+            routes, resource_version = self._read_routes(name)
+            for deployment_id, route in changes.items():
+                if route is None:
+                    routes.pop(deployment_id, None)
+                else:
+                    routes[deployment_id] = route
+
+            try:
+                if resource_version is None:
+                    if routes:
+                        self.networking_api.create_namespaced_ingress(
+                            namespace=self.namespace,
+                            body=self._create_ingress_object(name, routes),
+                        )
+                elif not routes:
+                    self.networking_api.delete_namespaced_ingress(
+                        name=name,
+                        namespace=self.namespace,
+                        body=client.V1DeleteOptions(
+                            preconditions=client.V1Preconditions(
+                                resource_version=resource_version
+                            ),
+                        ),
+                    )
+                else:
+                    ingress = self._create_ingress_object(name, routes, resource_version)
+                    self.networking_api.replace_namespaced_ingress(
+                        name=name, namespace=self.namespace, body=ingress
+                    )
+                return len(routes)
+            except client.ApiException as e:
+                # 409: written or created by another process since it was read,
+                # 404: deleted by another process since it was read
+                if e.status not in (404, 409) or attempt == WRITE_ATTEMPTS - 1:
+                    raise
+                logger.info(f"Shared ingress {name} changed concurrently, retrying")
+        return 0
+
+    def _create_ingress_object(
+        self, name: str, routes: Dict[str, tuple], resource_version: Optional[str] = None
+    ) -> V1Ingress:
+        """Create a shared Kubernetes Ingress object.
+
+        Args:
+            name: The name of the Ingress object.
+            routes: Deployment ID -> (service name, service port).
+            resource_version: Version the object must have to be replaced, if any.
+
+        Returns:
+            A Kubernetes Ingress object.
+        """
+
+        def backend(service_name: str, port: int) -> V1IngressBackend:
+            return client.V1IngressBackend(
+                service=client.V1IngressServiceBackend(
+                    name=service_name,
+                    port=client.V1ServiceBackendPort(number=port),
+                ),
+            )
+
+        annotations = {}
+        if self.routing == IngressRouting.PATH:
+            annotations = {
+                "nginx.ingress.kubernetes.io/use-regex": "true",
+                "nginx.ingress.kubernetes.io/rewrite-target": "/$2",
+            }
+            rules = [
+                client.V1IngressRule(
+                    host=self.shared_host,
+                    http=client.V1HTTPIngressRuleValue(
+                        paths=[
+                            client.V1HTTPIngressPath(
+                                path=f"/{deployment_id}(/|$)(.*)",
+                                path_type="ImplementationSpecific",
+                                backend=backend(service_name, port),
+                            )
+                            for deployment_id, (service_name, port) in sorted(routes.items())
+                        ],
+                    ),
+                ),
+            ]
+        else:
+            rules = [
+                client.V1IngressRule(
+                    host=f"{deployment_id}.{self.base_domain}",
+                    http=client.V1HTTPIngressRuleValue(
+                        paths=[
+                            client.V1HTTPIngressPath(
+                                path="/",
+                                path_type="Prefix",
+                                backend=backend(service_name, port),
+                            ),
+                        ],
+                    ),
+                )
+                for deployment_id, (service_name, port) in sorted(routes.items())
+            ]
+
+        return client.V1Ingress(
+            api_version="networking.k8s.io/v1",
+            kind="Ingress",
+            metadata=client.V1ObjectMeta(
+                name=name,
+                annotations=annotations or None,
+                resource_version=resource_version,
+            ),
+            spec=client.V1IngressSpec(rules=rules),
+        )
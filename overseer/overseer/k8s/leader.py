@@ -0,0 +1,209 @@
+"""
+Lease-based leader election for the Overseer service.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from overseer.lazy import LazyModule
+
+client = LazyModule("kubernetes.client")
+
+if TYPE_CHECKING:
+    from kubernetes.client import CoordinationV1Api
+
+logger = logging.getLogger(__name__)
+
+LEADER_ELECTION = os.getenv("OVERSEER_LEADER_ELECTION", "").lower() in ("true", "1", "yes")
+LEASE_NAME = os.getenv("OVERSEER_LEASE_NAME", "overseer-leader")
+LEASE_NAMESPACE = os.getenv("OVERSEER_LEASE_NAMESPACE", os.getenv("POD_NAMESPACE", "a8s"))
+LEASE_DURATION_SECONDS = int(os.getenv("OVERSEER_LEASE_DURATION_SECONDS", "15"))
+LEASE_RETRY_SECONDS = float(os.getenv("OVERSEER_LEASE_RETRY_SECONDS", "2"))
+
+# Unique per replica; the pod name when set through the downward API
+IDENTITY = os.getenv("POD_NAME") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaderElector:
+    """Runs singleton controllers in exactly one replica, chosen through a Lease.
+
+    Every replica tries to acquire or renew the lease every retry period. The
+    holder runs the singleton controllers; the others take over once the lease
+    has not been renewed for its duration, as observed on their own clock so
+    that clock skew between nodes does not matter. A leader that cannot renew
+    stops its controllers before its lease can expire, and a leader shutting
+    down releases the lease so that another replica takes over right away.
+    """
+
+    def __init__(
+        self,
+        coordination_api: CoordinationV1Api,
+        singletons: List[Callable[[], Coroutine[Any, Any, None]]],
+        name: str = LEASE_NAME,
+        namespace: str = LEASE_NAMESPACE,
+        identity: str = IDENTITY,
+        lease_duration: int = LEASE_DURATION_SECONDS,
+        retry_period: float = LEASE_RETRY_SECONDS,
+    ):
+        """Initialize the leader elector.
+
+        Args:
+            coordination_api: The coordination API used to read and write the lease.
+            singletons: Controllers to run while leading, as coroutine functions.
+            name: The name of the Lease object.
+            namespace: The namespace of the Lease object.
+            identity: The identity of this replica.
+            lease_duration: Seconds a lease is valid without being renewed.
+            retry_period: Seconds between acquire or renew attempts.
+        """
+        self.coordination_api = coordination_api
+        self.singletons = singletons
+        self.name = name
+        self.namespace = namespace
+        self.identity = identity
+        self.lease_duration = lease_duration
+        self.retry_period = retry_period
+
+        self.holder: Optional[str] = None
+        self._leading = False
+        self._tasks: List[asyncio.Task] = []
+        self._renewed_at = 0.0
+        # Last observed (holder, renew time) of the lease and when it was observed
+        self._observed: Optional[Tuple[Optional[str], Optional[datetime]]] = None
+        self._observed_at = 0.0
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this replica is running the singleton controllers."""
+        return self._leading
+
+    async def run(self) -> None:
+        """Take part in the election until cancelled."""
+        logger.info(f"Taking part in leader election for lease {self.namespace}/{self.name} as {self.identity}")
+        try:
+            while True:
+                try:
+                    leading = await run_in_threadpool(self.try_acquire_or_renew)
+                except Exception as e:
+                    logger.error(f"Error renewing lease {self.name}: {e}")
+                    # Keep leading only while the lease we hold is certainly still valid
+                    leading = (
+                        self.is_leader
+                        and time.monotonic() - self._renewed_at < self.lease_duration * 2 / 3
+                    )
+
+                if leading and not self.is_leader:
+                    logger.info(f"Became leader, starting {len(self.singletons)} controllers")
+                    self._leading = True
+                    self._tasks = [asyncio.create_task(singleton()) for singleton in self.singletons]
+                elif not leading and self.is_leader:
+                    logger.warning("Lost leadership, stopping controllers")
+                    await self._stop()
+
+                await asyncio.sleep(self.retry_period)
+        finally:
+            if self.is_leader:
+                await self._stop()
+                try:
+                    await run_in_threadpool(self.release)
+                except Exception as e:
+                    logger.warning(f"Error releasing lease {self.name}: {e}")
+
+    def try_acquire_or_renew(self) -> bool:
+        """Acquire the lease if it is free or expired, or renew it if held.
+
+        Returns:
+            Whether this replica holds the lease.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            lease = self.coordination_api.read_namespaced_lease(name=self.name, namespace=self.namespace)
+        except client.ApiException as e:
+            if e.status != 404:
+                raise
+            return self._create(now)
+
+        spec = lease.spec or client.V1LeaseSpec()
+        lease.spec = spec
+        observed = (spec.holder_identity, spec.renew_time)
+        if observed != self._observed:
+            self._observed = observed
+            self._observed_at = time.monotonic()
+        self.holder = spec.holder_identity
+
+        if spec.holder_identity and spec.holder_identity != self.identity:
+            duration = spec.lease_duration_seconds or self.lease_duration
+            if time.monotonic() - self._observed_at < duration:
+                return False
+            logger.info(f"Lease {self.name} of {spec.holder_identity} expired, taking over")
+
+        if spec.holder_identity != self.identity:
+            spec.holder_identity = self.identity
+            spec.acquire_time = now
+            spec.lease_transitions = (spec.lease_transitions or 0) + 1
+        spec.renew_time = now
+        spec.lease_duration_seconds = self.lease_duration
+
+        # The resource version in the metadata makes this fail if another replica wrote first
+        try:
+            self.coordination_api.replace_namespaced_lease(
+                name=self.name, namespace=self.namespace, body=lease
+            )
+        except client.ApiException as e:
+            if e.status == 409:
+                return False
+            raise
+        self.holder = self.identity
+        self._renewed_at = time.monotonic()
+        return True
+
+    def release(self) -> None:
+        """Give up the lease so that another replica can take over immediately."""
+        lease = self.coordination_api.read_namespaced_lease(name=self.name, namespace=self.namespace)
+        if lease.spec is None or lease.spec.holder_identity != self.identity:
+            return
+        lease.spec.holder_identity = None
+        self.coordination_api.replace_namespaced_lease(
+            name=self.name, namespace=self.namespace, body=lease
+        )
+        self.holder = None
+        logger.info(f"Released lease {self.name}")
+
+    def _create(self, now: datetime) -> bool:
+        """Create the lease held by this replica."""
+        lease = client.V1Lease(
+            metadata=client.V1ObjectMeta(name=self.name, namespace=self.namespace),
+            spec=client.V1LeaseSpec(
+                holder_identity=self.identity,
+                lease_duration_seconds=self.lease_duration,
+                acquire_time=now,
+                renew_time=now,
+                lease_transitions=0,
+            ),
+        )
+        try:
+            self.coordination_api.create_namespaced_lease(namespace=self.namespace, body=lease)
+        except client.ApiException as e:
+            if e.status == 409:
+                return False
+            raise
+        self.holder = self.identity
+        self._renewed_at = time.monotonic()
+        return True
+
+    async def _stop(self) -> None:
+        """Cancel the singleton controllers."""
+        self._leading = False
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,62 @@
+"""
+Parsing of Kubernetes resource quantities.
+
+Follows ``kubernetes.utils.quantity.parse_quantity``, so that validating
+resource settings does not import the kubernetes client package.
+"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Union
+
+_EXPONENTS = {
+    "n": -3,
+    "u": -2,
+    "m": -1,
+    "K": 1,
+    "k": 1,
+    "M": 2,
+    "G": 3,
+    "T": 4,
+    "P": 5,
+    "E": 6,
+}
+
+
+def parse_quantity(quantity: Union[str, int, float, Decimal]) -> Decimal:
+    """Parse a quantity such as ``500m`` or ``4Gi``.
+
+    Supports the binary suffixes Ki, Mi, Gi, Ti, Pi and Ei and the decimal
+    suffixes n, u, m, k, M, G, T, P and E.
+
+    Args:
+        quantity: The quantity.
+
+    Returns:
+        The value of the quantity.
+
+    Raises:
+        ValueError: If the quantity is malformed or has an unknown suffix.
+    """
+    if isinstance(quantity, (int, float, Decimal)):
+        return Decimal(quantity)
+
+    quantity = str(quantity)
+    number, suffix = quantity, ""
+    if len(quantity) >= 2 and quantity[-1] == "i" and quantity[-2] in _EXPONENTS:
+        number, suffix = quantity[:-2], quantity[-2:]
+    elif quantity and quantity[-1] in _EXPONENTS:
+        number, suffix = quantity[:-1], quantity[-1]
+
+    try:
+        value = Decimal(number)
+    except InvalidOperation:
+        raise ValueError(f"Invalid number format: {number}")
+
+    if not suffix:
+        return value
+    # Binary suffixes are only defined from Ki upwards
+    if suffix == "ki" or (len(suffix) == 2 and _EXPONENTS[suffix[0]] < 1):
+        raise ValueError(f"{quantity} has unknown suffix")
+
+    base = 1024 if len(suffix) == 2 else 1000
+    return value * (base ** Decimal(_EXPONENTS[suffix[0]]))
@@ -0,0 +1,347 @@
+"""
+Sharding of deployments across several clusters and namespaces.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, field_validator
+
+from overseer.k8s.client import (
+    BASE_DOMAIN,
+    MAX_DEPLOYMENT_ID_LENGTH,
+    SHARD_SEPARATOR,
+    KubernetesClient,
+    LogStream,
+    ManagedDeployment,
+)
+from overseer.models.deployment import DeploymentStatus
+from overseer.models.environment import MAX_ENVIRONMENT_NAME_LENGTH
+
+logger = logging.getLogger(__name__)
+
+# JSON list of shard configurations; unset means a single in-cluster shard
+SHARDS = os.getenv("OVERSEER_SHARDS")
+
+_SHARD_NAME_RE = re.compile(r"^[a-z0-9]+$")
+
+# Deployment IDs are a8s-<environment type>-<8 hex digits>--<shard>, so the
+# shard name gets what the longest environment type name leaves of a DNS label
+MAX_SHARD_NAME_LENGTH = MAX_DEPLOYMENT_ID_LENGTH - len(
+    f"a8s-{'x' * MAX_ENVIRONMENT_NAME_LENGTH}-{'0' * 8}{SHARD_SEPARATOR}"
+)
+
+
+class NoCapacityError(RuntimeError):
+    """Raised when no shard has capacity for another deployment."""
+
+
+class ShardConfig(BaseModel):
+    """Configuration of a cluster/namespace target."""
+
+    name: str = Field(..., description="Short name of the shard, encoded in deployment IDs")
+    context: Optional[str] = Field(
+        None, description="Kubeconfig context of the cluster (None for in-cluster)"
+    )
+    namespace: str = Field("a8s", description="Namespace deployments are created in")
+    capacity: Optional[int] = Field(
+        None, description="Maximum number of deployments in this shard (None for unlimited)"
+    )
+    base_domain: str = Field(BASE_DOMAIN, description="Domain for deployment ingress hosts")
+
+    @field_validator("name")
+    @classmethod
+    def _check_name(cls, name: str) -> str:
+        if not _SHARD_NAME_RE.match(name):
+            raise ValueError(f"Invalid shard name {name!r}: only lowercase letters and digits are allowed")
+        if len(name) > MAX_SHARD_NAME_LENGTH:
+            raise ValueError(
+                f"Invalid shard name {name!r}: at most {MAX_SHARD_NAME_LENGTH} characters are "
+                f"allowed, longer names make deployment IDs exceed {MAX_DEPLOYMENT_ID_LENGTH} characters"
+            )
+        return name
+
+
+def load_shard_configs() -> List[ShardConfig]:
+    """Load the shard configurations from the environment.
+
+    Returns:
+        The shard configurations, in order of preference.
+    """
+    if not SHARDS:
+        return []
+    return [ShardConfig(**shard) for shard in json.loads(SHARDS)]
+
+
+class ShardedKubernetesClient:
+    """Routes deployment operations to the cluster/namespace shard they live in.
+
+    The shard name is encoded in the deployment ID (``<id>--<shard>``), so every
+    operation on an existing deployment finds its shard with a dictionary lookup.
+    IDs without a shard suffix belong to the first shard. New deployments are
+    placed on the shard with the lowest load relative to its capacity.
+
+    The load of a shard is the number of deployments found in it by the last
+    listing, plus the deployments being created in it since. Every call to
+    list_deployment_statuses (made by the status controller on each sync)
+    recounts the listed deployments, so deletes and deployments removed
+    outside Overseer free their slots without any bookkeeping.
+    """
+
+    def __init__(self, shard_configs: Optional[List[ShardConfig]] = None):
+        """Initialize the sharded client.
+
+        Args:
+            shard_configs: The shards to manage. Without any, a single shard using
+                the in-cluster configuration and the "a8s" namespace is used, and
+                deployment IDs carry no shard suffix.
+        """
+        self.shards: Dict[str, KubernetesClient] = {}
+        self.capacity: Dict[str, Optional[int]] = {}
+        self.load: Dict[str, int] = {}
+        self._listed: Dict[str, int] = {}
+        self._creating: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        if not shard_configs:
+            self.shards[""] = KubernetesClient()
+            self.capacity[""] = None
+        for shard_config in shard_configs or []:
+            self.shards[shard_config.name] = KubernetesClient(
+                namespace=shard_config.namespace,
+                context=shard_config.context,
+                shard_name=shard_config.name,
+                base_domain=shard_config.base_domain,
+            )
+            self.capacity[shard_config.name] = shard_config.capacity
+        self.default_shard = next(iter(self.shards))
+
+        for name, shard in self.shards.items():
+            self._creating[name] = 0
+            try:
+                self._listed[name] = shard.count_deployments()
+            except Exception as e:
+                logger.error(f"Error counting deployments of shard {name or 'default'}: {e}")
+                self._listed[name] = 0
+            self.load[name] = self._listed[name]
+            logger.info(
+                f"Shard {name or 'default'} ({shard.context or 'in-cluster'}/{shard.namespace}): "
+                f"{self.load[name]} deployments, capacity {self.capacity[name] or 'unlimited'}"
+            )
+
+    def shard_name_of(self, deployment_id: str) -> str:
+        """Get the name of the shard a deployment lives in.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            The shard name.
+        """
+        _, separator, name = deployment_id.rpartition(SHARD_SEPARATOR)
+        if separator and name in self.shards:
+            return name
+        return self.default_shard
+
+    def for_deployment(self, deployment_id: str) -> KubernetesClient:
+        """Get the client of the shard a deployment lives in.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            The Kubernetes client of the shard.
+        """
+        return self.shards[self.shard_name_of(deployment_id)]
+
+    def place(self) -> str:
+        """Choose the shard for a new deployment and reserve a slot in it.
+
+        Returns:
+            The shard name.
+
+        Raises:
+            NoCapacityError: If every shard is at capacity.
+        """
+        with self._lock:
+            candidates: List[Tuple[float, int, str]] = []
+            for order, name in enumerate(self.shards):
+                capacity = self.capacity[name]
+                if capacity is not None and self.load[name] >= capacity:
+                    continue
+                utilization = self.load[name] / capacity if capacity else 0.0
+                candidates.append((utilization, order, name))
+            if not candidates:
+                raise NoCapacityError("All shards are at capacity")
+            _, _, name = min(candidates)
+            self._creating[name] += 1
+            self.load[name] += 1
+            return name
+
+    def release(self, shard_name: str, created: bool = False) -> None:
+        """Release a slot reserved in a shard once the deployment has been created or failed.
+
+        Args:
+            shard_name: The shard name.
+            created: Whether the deployment was created, in which case it counts
+                as listed until the next listing of the shard.
+        """
+        with self._lock:
+            self._creating[shard_name] = max(0, self._creating[shard_name] - 1)
+            if created:
+                self._listed[shard_name] += 1
+            self.load[shard_name] = self._listed[shard_name] + self._creating[shard_name]
+
+    def _set_listed(self, shard_name: str, count: int) -> None:
+        """Set the number of deployments a listing found in a shard.
+
+        Args:
+            shard_name: The shard name.
+            count: The number of listed deployments.
+        """
+        with self._lock:
+            self._listed[shard_name] = count
+            self.load[shard_name] = count + self._creating[shard_name]
+
+    def create_deployment(self, **kwargs) -> Tuple[str, Dict[str, str]]:
+        """Create a new deployment on the least loaded shard.
+
+        Args:
+            **kwargs: Arguments for KubernetesClient.create_deployment.
+
+        Returns:
+            Tuple of deployment ID and connection details.
+        """
+        name = self.place()
+        try:
+            result = self.shards[name].create_deployment(**kwargs)
+        except Exception:
+            self.release(name)
+            raise
+        self.release(name, created=True)
+        return result
+
+    def delete_deployment(self, deployment_id: str) -> bool:
+        """Delete a deployment from its shard.
+
+        Its slot is freed by the next listing of the shard.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Returns:
+            Whether the deployment existed and was deleted.
+        """
+        return self.for_deployment(deployment_id).delete_deployment(deployment_id)
+
+    def flush_ingress(self) -> None:
+        """Write the queued shared ingress route changes of all shards."""
+        for name, shard in self.shards.items():
+            try:
+                shard.flush_ingress()
+            except Exception as e:
+                logger.warning(f"Error flushing ingress routes of shard {name or 'default'}: {e}")
+
+    def get_deployment_status(self, deployment_id: str) -> DeploymentStatus:
+        """Get the status of a deployment from its shard."""
+        return self.for_deployment(deployment_id).get_deployment_status(deployment_id)
+
+    def list_deployment_statuses(self) -> Dict[str, DeploymentStatus]:
+        """Get the status of every managed deployment in all shards.
+
+        Shards that cannot be listed are left out rather than failing the call.
+        The load of every listed shard is recounted from the listing.
+        """
+        statuses: Dict[str, DeploymentStatus] = {}
+        for name, shard in self.shards.items():
+            try:
+                shard_statuses = shard.list_deployment_statuses()
+            except Exception as e:
+                logger.warning(f"Error listing deployments of shard {name or 'default'}: {e}")
+                continue
+            self._set_listed(name, len(shard_statuses))
+            statuses.update(shard_statuses)
+        return statuses
+
+    def list_managed_deployments(self) -> List[ManagedDeployment]:
+        """Get every managed deployment in all shards.
+
+        Shards that cannot be listed are left out rather than failing the call.
+        """
+        managed: List[ManagedDeployment] = []
+        for name, shard in self.shards.items():
+            try:
+                managed.extend(shard.list_managed_deployments())
+            except Exception as e:
+                logger.warning(f"Error listing deployments of shard {name or 'default'}: {e}")
+        return managed
+
+    def get_connection_details(
+        self, deployment_id: str, environment_type: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Get the connection details of a deployment from its shard."""
+        return self.for_deployment(deployment_id).get_connection_details(
+            deployment_id, environment_type
+        )
+
+    def update_task(self, deployment_id: str, *args, **kwargs) -> None:
+        """Update the task payload of a deployment in its shard."""
+        self.for_deployment(deployment_id).update_task(deployment_id, *args, **kwargs)
+
+    def get_task(self, deployment_id: str) -> Tuple[str, List[str], Dict[str, str]]:
+        """Read back the task payload of a deployment from its shard."""
+        return self.for_deployment(deployment_id).get_task(deployment_id)
+
+    def cordon_node(self, node_name: str) -> bool:
+        """Cordon a node in every shard whose cluster has it.
+
+        Returns:
+            Whether any shard's cluster has the node.
+        """
+        found = False
+        for shard in self.shards.values():
+            found = shard.cordon_node(node_name) or found
+        return found
+
+    def list_deployments_on_node(self, node_name: str) -> List[str]:
+        """Get the managed deployments with a pod on a node, in all shards."""
+        deployment_ids: List[str] = []
+        for shard in self.shards.values():
+            deployment_ids.extend(shard.list_deployments_on_node(node_name))
+        return deployment_ids
+
+    def scale_deployment(self, deployment_id: str, replicas: int) -> None:
+        """Scale a deployment in its shard."""
+        self.for_deployment(deployment_id).scale_deployment(deployment_id, replicas)
+
+    def count_vnc_connections(self, deployment_id: str) -> int:
+        """Count the VNC clients connected to a deployment in its shard."""
+        return self.for_deployment(deployment_id).count_vnc_connections(deployment_id)
+
+    def stream_container_logs(self, deployment_id: str, *args, **kwargs) -> LogStream:
+        """Stream the container logs of a deployment from its shard."""
+        return self.for_deployment(deployment_id).stream_container_logs(
+            deployment_id, *args, **kwargs
+        )
+
+    def stream_file(self, deployment_id: str, *args, **kwargs) -> LogStream:
+        """Stream a file from inside the container of a deployment in its shard."""
+        return self.for_deployment(deployment_id).stream_file(deployment_id, *args, **kwargs)
+
+    def capture_home(self, deployment_id: str, destination: BinaryIO) -> int:
+        """Write a tarball of a deployment's home directory from its shard."""
+        return self.for_deployment(deployment_id).capture_home(deployment_id, destination)
+
+    def list_pod_metrics(self) -> Dict[str, Tuple[float, int]]:
+        """Get the current resource usage of all managed environments in all shards."""
+        usage: Dict[str, Tuple[float, int]] = {}
+        for name, shard in self.shards.items():
+            try:
+                usage.update(shard.list_pod_metrics())
+            except Exception as e:
+                logger.warning(f"Error reading pod metrics of shard {name or 'default'}: {e}")
+        return usage
@@ -0,0 +1,122 @@
+"""
+Packing of task payloads into ConfigMaps for the Overseer API.
+
+The requirement, tools and data of a deployment are delivered to the
+environment as files in a projected volume. ConfigMaps are limited to 1MiB, so
+the files are spread over several ConfigMaps, and values that do not fit into a
+single ConfigMap are split into numbered parts that the environment joins back
+together (``<name>.part-0000``, ``<name>.part-0001``, ...).
+"""
+
+import re
+from typing import Dict, List
+
+# Leave headroom below the 1MiB ConfigMap limit for keys and metadata
+CONFIGMAP_BUDGET_BYTES = 900 * 1024
+
+PART_SUFFIX = ".part-"
+_PART_RE = re.compile(r"^(?P<name>.+)\.part-(?P<index>\d{4})$")
+
+
+class TaskPayloadTooLarge(ValueError):
+    """Raised when a task payload does not fit into the available ConfigMaps."""
+
+
+def task_files(requirement: str, tools: List[str], data: Dict[str, str]) -> Dict[str, str]:
+    """Get the files a task payload is delivered as.
+
+    Args:
+        requirement: The requirement or task for the agent to execute.
+        tools: List of tools to include in the environment.
+        data: Data to pass to the environment.
+
+    Returns:
+        File name -> file content.
+    """
+    files = {"requirement": requirement, "tools": ",".join(tools)}
+    for key, value in data.items():
+        files[f"data.{key}"] = value
+    return files
+
+
+def pack_task_files(
+    files: Dict[str, str], slots: int, budget: int = CONFIGMAP_BUDGET_BYTES
+) -> List[Dict[str, str]]:
+    """Spread task files over at most ``slots`` ConfigMap data dictionaries.
+
+    Args:
+        files: File name -> file content.
+        slots: Maximum number of ConfigMaps to use.
+        budget: Maximum number of bytes per ConfigMap.
+
+    Returns:
+        The data of each ConfigMap, in slot order.
+
+    Raises:
+        TaskPayloadTooLarge: If the files do not fit into the available slots.
+    """
+    pieces = []
+    for name, content in files.items():
+        encoded = content.encode()
+        if len(encoded) <= budget:
+            pieces.append((name, content, len(encoded)))
+            continue
+        for index, part in enumerate(_split_utf8(encoded, budget)):
+            pieces.append((f"{name}{PART_SUFFIX}{index:04d}", part.decode(), len(part)))
+
+    # First-fit decreasing keeps the number of ConfigMaps close to the minimum
+    bins: List[Dict[str, str]] = []
+    sizes: List[int] = []
+    for name, content, size in sorted(pieces, key=lambda piece: piece[2], reverse=True):
+        for index, used in enumerate(sizes):
+            if used + size <= budget:
+                bins[index][name] = content
+                sizes[index] += size
+                break
+        else:
+            bins.append({name: content})
+            sizes.append(size)
+
+    if len(bins) > slots:
+        raise TaskPayloadTooLarge(
+            f"Task payload of {sum(sizes)} bytes does not fit into {slots} ConfigMaps"
+        )
+    return bins
+
+
+def unpack_task_files(chunks: List[Dict[str, str]]) -> Dict[str, str]:
+    """Reassemble task files from the data of their ConfigMaps.
+
+    Args:
+        chunks: The data of each ConfigMap.
+
+    Returns:
+        File name -> file content.
+    """
+    files: Dict[str, str] = {}
+    parts: Dict[str, Dict[int, str]] = {}
+    for chunk in chunks:
+        for name, content in chunk.items():
+            match = _PART_RE.match(name)
+            if match:
+                parts.setdefault(match["name"], {})[int(match["index"])] = content
+            else:
+                files[name] = content
+
+    for name, indexed in parts.items():
+        files[name] = "".join(indexed[index] for index in sorted(indexed))
+    return files
+
+
+def _split_utf8(encoded: bytes, budget: int) -> List[bytes]:
+    """Split UTF-8 bytes into parts of at most ``budget`` bytes on character boundaries."""
+    parts = []
+    start = 0
+    while start < len(encoded):
+        end = min(start + budget, len(encoded))
+        # Never cut inside a multi-byte character (continuation bytes are 10xxxxxx)
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end])
+        start = end
+    return parts
@@ -0,0 +1,40 @@
+"""
+Deferred imports of heavy modules for the Overseer service.
+"""
+
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule:
+    """Stands in for a module that is only imported on first attribute access.
+
+    The kubernetes client package takes longer to import than the rest of the
+    service together, so modules that need it refer to it through a proxy and
+    processes only pay for it once they talk to a cluster.
+    """
+
+    def __init__(self, name: str):
+        """Initialize the proxy.
+
+        Args:
+            name: The fully qualified name of the module.
+        """
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attribute: str) -> Any:
+        module = self._module
+        if module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+                module = self._module
+        return getattr(module, attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
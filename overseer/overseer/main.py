@@ -2,16 +2,31 @@
 Main FastAPI application for the Overseer service.
 """
 
+import asyncio
 import logging
-import os
-from typing import Dict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, List, Optional
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 
 from overseer import __version__
+from overseer.api.deployments import get_k8s_client, k8s_client_initialized, restore_deployments
 from overseer.api.deployments import router as deployments_router
+from overseer.api.logs import router as logs_router
+from overseer.api.nodes import router as nodes_router
+from overseer.api.snapshots import router as snapshots_router
+from overseer.api.stats import router as stats_router
+from overseer.api.usage import router as usage_router
+from overseer.controllers.idle import IdleController
+from overseer.controllers.status import StatusController
+from overseer.controllers.usage import usage_collector
+from overseer.environments import get_environment_registry
+from overseer.k8s.leader import IDENTITY, LEADER_ELECTION, LeaderElector
+from overseer.lazy import LazyModule
+from overseer.webhooks import webhook_dispatcher
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +35,103 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+client = LazyModule("kubernetes.client")
+
+# Set once leader election has started
+leader_elector: Optional[LeaderElector] = None
+
+
+async def init_k8s_client() -> None:
+    """Create the Kubernetes client in the background, retrying until it succeeds."""
+    while True:
+        try:
+            await run_in_threadpool(get_k8s_client)
+            logger.info("Kubernetes client initialized")
+            return
+        except Exception as e:
+            logger.error(f"Error initializing Kubernetes client: {e}")
+            await asyncio.sleep(5)
+
+
+async def restore_stored_deployments() -> None:
+    """Add the deployments found in Kubernetes to the store, retrying until the listing succeeds."""
+    await init_k8s_client()
+    while True:
+        try:
+            restored = await run_in_threadpool(restore_deployments, get_k8s_client())
+            logger.info(f"Restored {restored} deployments from Kubernetes")
+            return
+        except Exception as e:
+            logger.error(f"Error restoring deployments from Kubernetes: {e}")
+            await asyncio.sleep(5)
+
+
+async def elect_leader(singletons: List[Callable[[], Coroutine[Any, Any, None]]]) -> None:
+    """Take part in leader election once the Kubernetes client is ready.
+
+    Args:
+        singletons: Controllers to run while leading.
+    """
+    global leader_elector
+
+    await init_k8s_client()
+    k8s_client = get_k8s_client()
+    coordination_api = client.CoordinationV1Api(
+        k8s_client.shards[k8s_client.default_shard].api_client
+    )
+    leader_elector = LeaderElector(coordination_api, singletons)
+    await leader_elector.run()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run the background controllers for the lifetime of the application.
+
+    The deployment store is rebuilt from Kubernetes at startup, so deployments
+    survive restarts. Controllers that must not run more than once across
+    replicas only run in the elected leader when leader election is enabled,
+    and a replica that becomes leader first adopts the deployments created
+    through other replicas since it started. Webhook delivery runs in every
+    replica, as each one has its own outbox. The Kubernetes client is created
+    in the background, so the service answers health checks while it is still
+    connecting to the clusters.
+
+    Args:
+        app: The FastAPI application.
+    """
+    # Load the environment types first, an invalid registry stops the service
+    get_environment_registry()
+
+    singletons = []
+    idle_controller = IdleController()
+    if idle_controller.enabled:
+        singletons.append(idle_controller.run)
+    if usage_collector.enabled:
+        singletons.append(usage_collector.run)
+    status_controller = StatusController()
+    if status_controller.enabled:
+        singletons.append(status_controller.run)
+
+    tasks = [
+        asyncio.create_task(webhook_dispatcher.run()),
+        asyncio.create_task(restore_stored_deployments()),
+    ]
+    if LEADER_ELECTION:
+        tasks.append(asyncio.create_task(elect_leader([restore_stored_deployments, *singletons])))
+    else:
+        tasks.extend(asyncio.create_task(singleton()) for singleton in singletons)
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Route changes still waiting for the flush interval would be lost otherwise
+    if k8s_client_initialized():
+        await run_in_threadpool(get_k8s_client().flush_ingress)
+
+
 # Create FastAPI application
 app = FastAPI(
     title="Overseer API",
@@ -27,6 +139,7 @@ app = FastAPI(
     version=__version__,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -38,18 +151,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
+# Include routers. The stats and usage routers must precede the deployments
+# router, or GET /deployments/stats and GET /deployments/usage would be matched
+# as GET /deployments/{deployment_id}. The logs and snapshots routes do not
+# collide with any deployments route.
+app.include_router(stats_router)
+app.include_router(usage_router)
+app.include_router(logs_router)
+app.include_router(snapshots_router)
 app.include_router(deployments_router)
+app.include_router(nodes_router)
 
 
 @app.get("/", tags=["health"])
-async def health_check() -> Dict[str, str]:
+async def health_check() -> Dict[str, Any]:
     """Health check endpoint.
 
     Returns:
-        A dictionary with the service status.
+        A dictionary with the service status, leadership of this replica and
+        whether the Kubernetes client is ready.
     """
-    return {"status": "ok", "version": __version__}
+    if not LEADER_ELECTION:
+        leader, leader_identity = True, IDENTITY
+    elif leader_elector is None:
+        leader, leader_identity = False, None
+    else:
+        leader, leader_identity = leader_elector.is_leader, leader_elector.holder
+    return {
+        "status": "ok",
+        "version": __version__,
+        "kubernetes": "ready" if k8s_client_initialized() else "initializing",
+        "identity": IDENTITY,
+        "leader": leader,
+        "leader_identity": leader_identity,
+    }
 
 
 @app.get("/version", tags=["health"])
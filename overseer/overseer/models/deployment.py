@@ -2,10 +2,33 @@
 Deployment models for the Overseer API.
 """
 
+import re
 from enum import Enum
 from typing import Dict, List, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from overseer.callback_urls import check_callback_url
+
+# Data keys become file names in the task volume, so they must be valid ConfigMap keys
+DATA_KEY_RE = re.compile(r"^[-._a-zA-Z0-9]+$")
+# Names of the parts large task files are split into, which a key must not look like
+DATA_KEY_PART_RE = re.compile(r"\.part-\d{4}$")
+
+
+def _validate_data_keys(data: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    """Check that every data key can be used as a task file name."""
+    for key in data:
+        if not DATA_KEY_RE.match(key):
+            raise ValueError(
+                f"Invalid data key {key!r}: only letters, digits, '-', '_' and '.' are allowed"
+            )
+        if DATA_KEY_PART_RE.search(key):
+            raise ValueError(
+                f"Invalid data key {key!r}: keys ending in '.part-NNNN' are reserved "
+                "for the parts of split task files"
+            )
+    return data
 
 
 class DeploymentStatus(str, Enum):
@@ -14,6 +37,7 @@ class DeploymentStatus(str, Enum):
     PENDING = "pending"
     CREATING = "creating"
     RUNNING = "running"
+    PAUSED = "paused"
     FAILED = "failed"
     TERMINATING = "terminating"
     TERMINATED = "terminated"
@@ -37,6 +61,49 @@ class DeploymentRequest(BaseModel):
     ttl_seconds: Optional[int] = Field(
         default=3600, description="Time to live in seconds for the deployment"
     )
+    owner: Optional[str] = Field(
+        None,
+        description=(
+            "User or tenant the deployment counts against (quotas, fair-share admission); "
+            "trusted as given, it is not authenticated"
+        ),
+    )
+    from_snapshot: Optional[str] = Field(
+        None, description="ID of a snapshot whose home directory the environment starts from"
+    )
+    callback_url: Optional[str] = Field(
+        None,
+        description=(
+            "URL that status changes of the deployment are POSTed to; internal hosts "
+            "and addresses are rejected unless listed in OVERSEER_CALLBACK_ALLOWED_HOSTS"
+        ),
+    )
+    callback_events: Optional[List[DeploymentStatus]] = Field(
+        None, description="Statuses to send callbacks for (all if not given)"
+    )
+
+    _check_data_keys = field_validator("data")(_validate_data_keys)
+
+    @field_validator("callback_url")
+    @classmethod
+    def _check_callback_url(cls, url: Optional[str]) -> Optional[str]:
+        if url is not None:
+            check_callback_url(url)
+        return url
+
+
+class DeploymentDataUpdate(BaseModel):
+    """Request model for updating the task payload of a running deployment."""
+
+    data: Dict[str, Optional[str]] = Field(
+        default_factory=dict,
+        description="Data entries to set; entries set to null are removed",
+    )
+    requirement: Optional[str] = Field(
+        None, description="The new requirement or task for the agent to execute"
+    )
+
+    _check_data_keys = field_validator("data")(_validate_data_keys)
 
 
 class DeploymentResponse(BaseModel):
@@ -45,11 +112,27 @@ class DeploymentResponse(BaseModel):
     id: str = Field(..., description="Unique identifier for the deployment")
     status: DeploymentStatus = Field(..., description="Current status of the deployment")
     environment_type: str = Field(..., description="Type of environment deployed")
+    owner: Optional[str] = Field(None, description="User or tenant the deployment belongs to")
     created_at: str = Field(..., description="Timestamp when the deployment was created")
     connection_details: Optional[Dict[str, str]] = Field(
         None, description="Connection details for the deployment"
     )
     message: Optional[str] = Field(None, description="Additional information or error message")
+    last_activity_at: Optional[str] = Field(
+        None, description="Timestamp of the last VNC connection, connect call or agent heartbeat"
+    )
+    resume_seconds: Optional[float] = Field(
+        None, description="Seconds the last resume took until the deployment was ready again"
+    )
+    from_snapshot: Optional[str] = Field(
+        None, description="ID of the snapshot the deployment was restored from"
+    )
+    ready_seconds: Optional[float] = Field(
+        None, description="Seconds from creation until the deployment first ran"
+    )
+    replaced_by: Optional[str] = Field(
+        None, description="ID of the deployment that replaced this one when its node was drained"
+    )
 
 
 class DeploymentStatusResponse(BaseModel):
@@ -0,0 +1,116 @@
+"""
+Environment type models for the Overseer API.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from overseer.k8s.quantity import parse_quantity
+
+# Environment type names become part of Kubernetes object names
+MAX_ENVIRONMENT_NAME_LENGTH = 30
+_ENVIRONMENT_NAME_RE = re.compile(
+    rf"^[a-z0-9]([a-z0-9-]{{0,{MAX_ENVIRONMENT_NAME_LENGTH - 2}}}[a-z0-9])?$"
+)
+
+
+class EnvironmentPort(BaseModel):
+    """A port exposed by an environment container."""
+
+    name: str = Field(..., description="Name of the port (e.g., 'novnc')")
+    container_port: int = Field(..., ge=1, le=65535, description="Port number in the container")
+
+
+class EnvironmentProbe(BaseModel):
+    """A readiness probe for an environment container."""
+
+    port: int = Field(..., ge=1, le=65535, description="Port to probe")
+    http_path: Optional[str] = Field(
+        None, description="Path for an HTTP GET probe; a TCP probe is used if not set"
+    )
+    initial_delay_seconds: int = Field(5, ge=0, description="Delay before the first probe")
+    period_seconds: int = Field(5, ge=1, description="Interval between probes")
+
+
+class EnvironmentResources(BaseModel):
+    """Resource requests and limits of an environment container."""
+
+    requests: Dict[str, str] = Field(
+        default_factory=lambda: {"cpu": "500m", "memory": "1Gi"},
+        description="Resources reserved for the container",
+    )
+    limits: Dict[str, str] = Field(
+        default_factory=lambda: {"cpu": "2", "memory": "4Gi"},
+        description="Resources the container may use at most",
+    )
+
+    @field_validator("requests", "limits")
+    @classmethod
+    def _check_quantities(cls, quantities: Dict[str, str]) -> Dict[str, str]:
+        for resource, quantity in quantities.items():
+            try:
+                parse_quantity(quantity)
+            except ValueError as e:
+                raise ValueError(f"Invalid {resource} quantity {quantity!r}: {e}")
+        return quantities
+
+
+class EnvironmentType(BaseModel):
+    """A type of environment that can be deployed."""
+
+    name: str = Field(..., description="Name of the environment type (e.g., 'claude')")
+    image: str = Field(..., description="Container image of the environment")
+    image_pull_policy: str = Field("Never", description="Image pull policy of the container")
+    ports: List[EnvironmentPort] = Field(
+        default_factory=lambda: [EnvironmentPort(name="novnc", container_port=6080)],
+        description="Ports exposed by the container and its service",
+    )
+    connect_port: str = Field(
+        "novnc", description="Name of the port users connect to through ingress"
+    )
+    readiness_probe: Optional[EnvironmentProbe] = Field(
+        None, description="Probe deciding when the environment is ready"
+    )
+    resources: EnvironmentResources = Field(
+        default_factory=EnvironmentResources, description="Resources of the container"
+    )
+    tools: List[str] = Field(
+        default_factory=list,
+        description="Tools that may be requested for this environment type (empty allows any)",
+    )
+    log_files: List[str] = Field(
+        default_factory=list,
+        description="Files in the container that may be streamed through the logs endpoint",
+    )
+
+    @field_validator("name")
+    @classmethod
+    def _check_name(cls, name: str) -> str:
+        if not _ENVIRONMENT_NAME_RE.match(name):
+            raise ValueError(
+                f"Invalid environment type name {name!r}: use up to 30 lowercase letters, digits and '-'"
+            )
+        return name
+
+    @field_validator("log_files")
+    @classmethod
+    def _check_log_files(cls, log_files: List[str]) -> List[str]:
+        for path in log_files:
+            if not path.startswith("/"):
+                raise ValueError(f"Invalid log file {path!r}: an absolute path is required")
+        return log_files
+
+    @model_validator(mode="after")
+    def _check_connect_port(self) -> "EnvironmentType":
+        if self.connect_port not in {port.name for port in self.ports}:
+            raise ValueError(
+                f"Connect port {self.connect_port!r} of environment type {self.name!r} is not one of its ports"
+            )
+        return self
+
+    @property
+    def connect_port_number(self) -> int:
+        """Number of the port users connect to."""
+        return next(port.container_port for port in self.ports if port.name == self.connect_port)
@@ -0,0 +1,33 @@
+"""
+Node models for the Overseer API.
+"""
+
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class DrainEventType(str, Enum):
+    """Steps of a node drain reported to the client."""
+
+    CORDONED = "cordoned"
+    SNAPSHOTTED = "snapshotted"
+    REPLACEMENT_CREATED = "replacement_created"
+    SWITCHED = "switched"
+    DELETED = "deleted"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+    COMPLETED = "completed"
+
+
+class DrainEvent(BaseModel):
+    """Progress of a node drain, streamed as one JSON object per line."""
+
+    event: DrainEventType = Field(..., description="The step that was reached")
+    node: str = Field(..., description="Name of the drained node")
+    deployment_id: Optional[str] = Field(None, description="Deployment the step applies to")
+    replacement_id: Optional[str] = Field(None, description="Deployment replacing it")
+    snapshot_id: Optional[str] = Field(None, description="Snapshot the replacement starts from")
+    message: Optional[str] = Field(None, description="Additional information or error message")
+    timestamp: str = Field(..., description="Timestamp of the step")
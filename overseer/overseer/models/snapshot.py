@@ -0,0 +1,26 @@
+"""
+Snapshot models for the Overseer API.
+"""
+
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class SnapshotResponse(BaseModel):
+    """Response model for a snapshot of a deployment's home directory."""
+
+    id: str = Field(..., description="Unique identifier for the snapshot")
+    deployment_id: str = Field(..., description="Deployment the snapshot was taken of")
+    environment_type: str = Field(..., description="Type of environment the snapshot belongs to")
+    created_at: str = Field(..., description="Timestamp when the snapshot was taken")
+    size_bytes: int = Field(..., description="Size of the compressed archive in bytes")
+    capture_seconds: float = Field(..., description="Seconds it took to capture the snapshot")
+
+
+class SnapshotListResponse(BaseModel):
+    """Response model for the snapshots of a deployment."""
+
+    snapshots: List[SnapshotResponse] = Field(
+        default_factory=list, description="The snapshots, oldest first"
+    )
@@ -0,0 +1,32 @@
+"""
+Fleet statistics models for the Overseer API.
+"""
+
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class FleetStatsResponse(BaseModel):
+    """Response model for the statistics of all deployments."""
+
+    total: int = Field(..., description="Number of deployments that have not been terminated")
+    by_status: Dict[str, int] = Field(
+        default_factory=dict, description="Number of deployments per status"
+    )
+    by_environment_type: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Number of deployments per environment type, excluding terminated ones",
+    )
+    creates_per_minute: int = Field(
+        0, description="Deployments created during the last minute"
+    )
+    deletes_per_minute: int = Field(
+        0, description="Deployments terminated during the last minute"
+    )
+    mean_time_to_ready_seconds: Optional[float] = Field(
+        None, description="Mean time from creation until a deployment first ran"
+    )
+    ready_samples: int = Field(
+        0, description="Number of deployments the mean time-to-ready is computed over"
+    )
@@ -0,0 +1,55 @@
+"""
+Resource usage models for the Overseer API.
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class DeploymentUsage(BaseModel):
+    """Response model for the resource usage of a deployment."""
+
+    id: str = Field(..., description="Unique identifier for the deployment")
+    refreshed_at: Optional[str] = Field(
+        None, description="Timestamp of the last metrics refresh"
+    )
+    samples: int = Field(0, description="Number of samples in the rolling window")
+    window_seconds: Optional[float] = Field(
+        None, description="Length of the rolling window in seconds"
+    )
+    cpu_cores: Optional[float] = Field(None, description="Current CPU usage in cores")
+    cpu_avg_cores: Optional[float] = Field(
+        None, description="Average CPU usage over the window in cores"
+    )
+    cpu_max_cores: Optional[float] = Field(
+        None, description="Maximum CPU usage over the window in cores"
+    )
+    cpu_limit_cores: Optional[float] = Field(
+        None, description="CPU limit of the environment in cores"
+    )
+    memory_bytes: Optional[int] = Field(None, description="Current memory usage in bytes")
+    memory_avg_bytes: Optional[int] = Field(
+        None, description="Average memory usage over the window in bytes"
+    )
+    memory_max_bytes: Optional[int] = Field(
+        None, description="Maximum memory usage over the window in bytes"
+    )
+    memory_limit_bytes: Optional[int] = Field(
+        None, description="Memory limit of the environment in bytes"
+    )
+
+
+class FleetUsageResponse(BaseModel):
+    """Response model for the resource usage of all deployments."""
+
+    refreshed_at: Optional[str] = Field(
+        None, description="Timestamp of the last metrics refresh"
+    )
+    total_cpu_cores: float = Field(..., description="Current CPU usage of all deployments in cores")
+    total_memory_bytes: int = Field(
+        ..., description="Current memory usage of all deployments in bytes"
+    )
+    deployments: List[DeploymentUsage] = Field(
+        ..., description="Usage of each deployment with samples"
+    )
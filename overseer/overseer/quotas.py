@@ -0,0 +1,377 @@
+"""
+Per-owner quotas and fair-share admission for the Overseer service.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field, field_validator
+
+from overseer.k8s.quantity import parse_quantity
+from overseer.models.deployment import DeploymentStatus
+from overseer.models.environment import EnvironmentType
+
+logger = logging.getLogger(__name__)
+
+# JSON mapping of owner -> quota; the "*" entry applies to owners without their own
+QUOTAS = os.getenv("OVERSEER_QUOTAS")
+# Deployments created at the same time; further requests queue fairly across owners
+MAX_CONCURRENT_CREATES = int(os.getenv("OVERSEER_MAX_CONCURRENT_CREATES", "8"))
+ADMISSION_TIMEOUT_SECONDS = float(os.getenv("OVERSEER_ADMISSION_TIMEOUT_SECONDS", "60"))
+
+DEFAULT_OWNER = "default"
+DEFAULT_QUOTA_KEY = "*"
+
+
+class QuotaExceeded(RuntimeError):
+    """Raised when a deployment would take an owner over their quota."""
+
+
+class AdmissionTimeout(RuntimeError):
+    """Raised when a queued create request is not admitted in time."""
+
+
+class Quota(BaseModel):
+    """Limits on the deployments of an owner; unset limits are unlimited."""
+
+    deployments: Optional[int] = Field(
+        None, ge=0, description="Maximum number of deployments that have not been terminated"
+    )
+    cpu: Optional[str] = Field(
+        None, description="Maximum CPU requested by running deployments (e.g., '8')"
+    )
+    memory: Optional[str] = Field(
+        None, description="Maximum memory requested by running deployments (e.g., '32Gi')"
+    )
+
+    @field_validator("cpu", "memory")
+    @classmethod
+    def _check_quantity(cls, quantity: Optional[str]) -> Optional[str]:
+        if quantity is not None:
+            parse_quantity(quantity)
+        return quantity
+
+
+def load_quotas() -> Dict[str, Quota]:
+    """Load the quotas from the environment.
+
+    Returns:
+        Owner -> quota.
+    """
+    if not QUOTAS:
+        return {}
+    return {owner: Quota(**quota) for owner, quota in json.loads(QUOTAS).items()}
+
+
+def resource_requests(environment: EnvironmentType) -> Tuple[float, float]:
+    """Get the CPU and memory a deployment of an environment type requests.
+
+    Args:
+        environment: The environment type.
+
+    Returns:
+        The CPU cores and memory bytes.
+    """
+    requests = environment.resources.requests
+    cpu = float(parse_quantity(requests["cpu"])) if "cpu" in requests else 0.0
+    memory = float(parse_quantity(requests["memory"])) if "memory" in requests else 0.0
+    return cpu, memory
+
+
+class QuotaManager:
+    """Tracks what every owner holds and checks it against their quota.
+
+    The counters are updated on creation and on every status transition, so a
+    quota check never has to scan the stored deployments. Deployments count
+    against the deployment limit until terminated, and their resource requests
+    count against the CPU and memory limits while they are not paused.
+    """
+
+    def __init__(self, quotas: Optional[Dict[str, Quota]] = None):
+        """Initialize the quota manager.
+
+        Args:
+            quotas: Owner -> quota; the "*" entry applies to all other owners.
+        """
+        self.quotas = quotas or {}
+        self._lock = threading.Lock()
+        # Owner -> [deployments, CPU cores, memory bytes]
+        self._usage: Dict[str, List[float]] = {}
+        # Deployment ID -> (owner, CPU cores, memory bytes, whether resources are held)
+        self._holdings: Dict[str, Tuple[str, float, float, bool]] = {}
+        # Reservations of creates in progress, by owner
+        self._reserved: Dict[str, List[float]] = {}
+
+    def quota_for(self, owner: str) -> Optional[Quota]:
+        """Get the quota that applies to an owner.
+
+        Args:
+            owner: The owner.
+
+        Returns:
+            The quota, or None if the owner is unlimited.
+        """
+        return self.quotas.get(owner, self.quotas.get(DEFAULT_QUOTA_KEY))
+
+    def usage(self, owner: str) -> Tuple[int, float, float]:
+        """Get what an owner currently holds.
+
+        Args:
+            owner: The owner.
+
+        Returns:
+            The number of deployments, CPU cores and memory bytes.
+        """
+        with self._lock:
+            deployments, cpu, memory = self._usage.get(owner, [0, 0.0, 0.0])
+            return int(deployments), cpu, memory
+
+    def reserve(self, owner: str, cpu: float, memory: float) -> None:
+        """Reserve a new deployment for an owner, or fail if it exceeds their quota.
+
+        Args:
+            owner: The owner.
+            cpu: CPU cores requested by the deployment.
+            memory: Memory bytes requested by the deployment.
+
+        Raises:
+            QuotaExceeded: If the deployment does not fit into the owner's quota.
+        """
+        with self._lock:
+            self._check(owner, 1, cpu, memory)
+            self._add(self._reserved, owner, 1, cpu, memory)
+
+    def cancel(self, owner: str, cpu: float, memory: float) -> None:
+        """Give back a reservation whose deployment was not created.
+
+        Args:
+            owner: The owner.
+            cpu: CPU cores of the reservation.
+            memory: Memory bytes of the reservation.
+        """
+        with self._lock:
+            self._add(self._reserved, owner, -1, -cpu, -memory)
+
+    def created(self, deployment_id: str, owner: str, cpu: float, memory: float) -> None:
+        """Turn a reservation into a deployment held by its owner.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            owner: The owner.
+            cpu: CPU cores requested by the deployment.
+            memory: Memory bytes requested by the deployment.
+        """
+        with self._lock:
+            self._add(self._reserved, owner, -1, -cpu, -memory)
+            self._add(self._usage, owner, 1, cpu, memory)
+            self._holdings[deployment_id] = (owner, cpu, memory, True)
+
+    def restored(
+        self, deployment_id: str, owner: str, cpu: float, memory: float, held: bool
+    ) -> None:
+        """Count a deployment that was created before this process started.
+
+        Restored deployments are counted even if they exceed the owner's quota,
+        they exist already.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            owner: The owner.
+            cpu: CPU cores requested by the deployment.
+            memory: Memory bytes requested by the deployment.
+            held: Whether the deployment holds its resources (is not paused).
+        """
+        with self._lock:
+            if deployment_id in self._holdings:
+                return
+            self._add(
+                self._usage, owner, 1, cpu if held else 0.0, memory if held else 0.0
+            )
+            self._holdings[deployment_id] = (owner, cpu, memory, held)
+
+    def resume(self, deployment_id: str) -> None:
+        """Take back the resources of a paused deployment that is being resumed.
+
+        Args:
+            deployment_id: The ID of the deployment.
+
+        Raises:
+            QuotaExceeded: If the resources do not fit into the owner's quota.
+        """
+        with self._lock:
+            holding = self._holdings.get(deployment_id)
+            if holding and not holding[3]:
+                owner, cpu, memory, _ = holding
+                self._check(owner, 0, cpu, memory)
+                self._add(self._usage, owner, 0, cpu, memory)
+                self._holdings[deployment_id] = (owner, cpu, memory, True)
+
+    def transfer(self, deployment_id: str, new_deployment_id: str) -> None:
+        """Move what a deployment holds to the deployment replacing it.
+
+        Args:
+            deployment_id: The ID of the replaced deployment.
+            new_deployment_id: The ID of the replacement.
+        """
+        with self._lock:
+            holding = self._holdings.pop(deployment_id, None)
+            if holding:
+                self._holdings[new_deployment_id] = holding
+
+    def transition(self, deployment_id: str, new_status: DeploymentStatus) -> None:
+        """Update the counters for a status change of a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            new_status: The status the deployment has now.
+        """
+        with self._lock:
+            holding = self._holdings.get(deployment_id)
+            if not holding:
+                return
+            owner, cpu, memory, held = holding
+
+            if new_status == DeploymentStatus.TERMINATED:
+                del self._holdings[deployment_id]
+                self._add(self._usage, owner, -1, -cpu if held else 0.0, -memory if held else 0.0)
+                return
+
+            hold = new_status != DeploymentStatus.PAUSED
+            if hold != held:
+                sign = 1 if hold else -1
+                self._add(self._usage, owner, 0, sign * cpu, sign * memory)
+                self._holdings[deployment_id] = (owner, cpu, memory, hold)
+
+    def _check(self, owner: str, deployments: int, cpu: float, memory: float) -> None:
+        """Raise QuotaExceeded if adding to an owner's holdings exceeds their quota. Must hold the lock."""
+        quota = self.quota_for(owner)
+        if quota is None:
+            return
+
+        used = [
+            held + reserved
+            for held, reserved in zip(
+                self._usage.get(owner, [0, 0.0, 0.0]), self._reserved.get(owner, [0, 0.0, 0.0])
+            )
+        ]
+        limits = [
+            ("deployments", quota.deployments, deployments),
+            ("cpu", float(parse_quantity(quota.cpu)) if quota.cpu else None, cpu),
+            ("memory", float(parse_quantity(quota.memory)) if quota.memory else None, memory),
+        ]
+        for (name, limit, requested), current in zip(limits, used):
+            if limit is not None and requested and current + requested > limit:
+                raise QuotaExceeded(
+                    f"Quota of {owner!r} exceeded: {name} would be {current + requested:g} of {limit:g}"
+                )
+
+    def _add(
+        self, counters: Dict[str, List[float]], owner: str, deployments: int, cpu: float, memory: float
+    ) -> None:
+        """Add to the counters of an owner. Must hold the lock."""
+        current = counters.setdefault(owner, [0, 0.0, 0.0])
+        current[0] += deployments
+        current[1] += cpu
+        current[2] += memory
+        if current[0] == 0 and abs(current[1]) < 1e-9 and abs(current[2]) < 1:
+            del counters[owner]
+
+
+class FairShareAdmission:
+    """Limits concurrent creates and admits queued requests round-robin across owners.
+
+    Each owner has their own FIFO queue; when a slot frees up it goes to the
+    next owner in turn, so an owner with many queued requests cannot delay
+    everyone else's by more than one request per round.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_CREATES):
+        """Initialize the admission queue.
+
+        Args:
+            max_concurrent: Maximum number of admitted requests at the same time.
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self._active = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {}
+        # Owners with queued requests, in the order they get their next slot
+        self._turns: Deque[str] = deque()
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for admission."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    @asynccontextmanager
+    async def admit(self, owner: str, timeout: float = ADMISSION_TIMEOUT_SECONDS) -> AsyncIterator[None]:
+        """Wait for a slot and hold it for the duration of the block.
+
+        Args:
+            owner: The owner of the request.
+            timeout: Seconds to wait for a slot.
+
+        Raises:
+            AdmissionTimeout: If no slot became free in time.
+        """
+        if self._active < self.max_concurrent and not self._turns:
+            self._active += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            if owner not in self._queues:
+                self._queues[owner] = deque()
+                self._turns.append(owner)
+            self._queues[owner].append(waiter)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    # Admitted just as the wait ended, hand the slot on
+                    self._release()
+                else:
+                    waiter.cancel()
+                    self._discard(owner, waiter)
+                if isinstance(e, asyncio.TimeoutError):
+                    raise AdmissionTimeout(
+                        f"Not admitted within {timeout:g}s, {self.queued} requests are queued"
+                    ) from None
+                raise
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        """Pass a slot to the next owner in turn, or free it."""
+        while self._turns:
+            owner = self._turns.popleft()
+            queue = self._queues[owner]
+            waiter = queue.popleft()
+            if queue:
+                self._turns.append(owner)
+            else:
+                del self._queues[owner]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _discard(self, owner: str, waiter: asyncio.Future) -> None:
+        """Remove a waiter that gave up from its owner's queue."""
+        queue = self._queues.get(owner)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[owner]
+            self._turns.remove(owner)
+
+
+quota_manager = QuotaManager(load_quotas())
+admission = FairShareAdmission()
@@ -0,0 +1,100 @@
+"""
+Storage of deployment snapshots for the Overseer service.
+
+A snapshot is a gzip-compressed tarball of an environment's home directory,
+kept in a local directory next to a JSON file with its metadata.
+"""
+
+import logging
+import os
+import secrets
+import threading
+from typing import Dict, List, Optional
+
+from overseer.models.snapshot import SnapshotResponse
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.getenv("OVERSEER_SNAPSHOT_DIR", "snapshots")
+# Base URL environments download snapshot archives from when restoring
+OVERSEER_URL = os.getenv("OVERSEER_URL", "http://overseer.a8s.svc.cluster.local:8000")
+
+
+class SnapshotStore:
+    """Snapshot archives and their metadata in a local directory."""
+
+    def __init__(self, directory: str = SNAPSHOT_DIR):
+        """Initialize the snapshot store, loading the metadata of existing snapshots.
+
+        Args:
+            directory: Directory the snapshots are kept in.
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, SnapshotResponse] = {}
+
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    with open(os.path.join(directory, name)) as f:
+                        snapshot = SnapshotResponse.model_validate_json(f.read())
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable snapshot metadata {name}: {e}")
+                    continue
+                if os.path.exists(self.archive_path(snapshot.id)):
+                    self._snapshots[snapshot.id] = snapshot
+
+    def new_id(self) -> str:
+        """Generate the ID of a new snapshot.
+
+        Archives are downloaded without authentication by the ID alone, so it
+        carries 128 random bits from a cryptographically secure source.
+        """
+        return f"snap-{secrets.token_hex(16)}"
+
+    def archive_path(self, snapshot_id: str) -> str:
+        """Get the path of a snapshot's archive."""
+        return os.path.join(self.directory, f"{snapshot_id}.tar.gz")
+
+    def archive_url(self, snapshot_id: str) -> str:
+        """Get the URL environments download a snapshot's archive from."""
+        return f"{OVERSEER_URL}/snapshots/{snapshot_id}/archive"
+
+    def add(self, snapshot: SnapshotResponse) -> None:
+        """Record a snapshot whose archive has been written.
+
+        Args:
+            snapshot: The snapshot metadata.
+        """
+        with open(os.path.join(self.directory, f"{snapshot.id}.json"), "w") as f:
+            f.write(snapshot.model_dump_json())
+        with self._lock:
+            self._snapshots[snapshot.id] = snapshot
+
+    def get(self, snapshot_id: str) -> Optional[SnapshotResponse]:
+        """Get a snapshot by ID."""
+        with self._lock:
+            return self._snapshots.get(snapshot_id)
+
+    def list_for(self, deployment_id: str) -> List[SnapshotResponse]:
+        """Get the snapshots of a deployment, oldest first."""
+        with self._lock:
+            return sorted(
+                (s for s in self._snapshots.values() if s.deployment_id == deployment_id),
+                key=lambda s: s.created_at,
+            )
+
+    def delete(self, snapshot_id: str) -> None:
+        """Delete a snapshot and its archive."""
+        with self._lock:
+            self._snapshots.pop(snapshot_id, None)
+        for path in (self.archive_path(snapshot_id), os.path.join(self.directory, f"{snapshot_id}.json")):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+snapshot_store = SnapshotStore()
@@ -0,0 +1,139 @@
+"""
+Incrementally maintained fleet statistics for the Overseer service.
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Optional
+
+from overseer.models.deployment import DeploymentStatus
+from overseer.models.stats import FleetStatsResponse
+
+# Window the create and delete rates are counted over
+RATE_WINDOW_SECONDS = 60.0
+
+
+class FleetStats:
+    """Counters over all deployments, updated on every status transition.
+
+    Reading the statistics costs the same no matter how many deployments
+    exist: nothing is aggregated and nothing is read from Kubernetes.
+    """
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self._lock = threading.Lock()
+        self._by_status: Counter = Counter()
+        self._by_type: Counter = Counter()
+        # Deployment ID -> monotonic creation time, until it first runs
+        self._pending: Dict[str, float] = {}
+        self._creates: Deque[float] = deque()
+        self._deletes: Deque[float] = deque()
+        self._ready_seconds = 0.0
+        self._ready_samples = 0
+
+    def created(self, deployment_id: str, environment_type: str) -> None:
+        """Record the creation of a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            environment_type: Type of the deployed environment.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._by_status[DeploymentStatus.CREATING.value] += 1
+            self._by_type[environment_type] += 1
+            self._pending[deployment_id] = now
+            self._creates.append(now)
+            self._prune(self._creates, now)
+
+    def restored(
+        self, deployment_id: str, environment_type: str, status: DeploymentStatus
+    ) -> None:
+        """Count a deployment that was created before this process started.
+
+        It is not counted as a create, and only takes part in the time-to-ready
+        if it is still being created.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            environment_type: Type of the deployed environment.
+            status: The status the deployment has.
+        """
+        with self._lock:
+            self._by_status[DeploymentStatus(status).value] += 1
+            self._by_type[environment_type] += 1
+            if status == DeploymentStatus.CREATING:
+                self._pending[deployment_id] = time.monotonic()
+
+    def transition(
+        self,
+        deployment_id: str,
+        environment_type: str,
+        old_status: DeploymentStatus,
+        new_status: DeploymentStatus,
+    ) -> None:
+        """Record a status change of a deployment.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            environment_type: Type of the deployed environment.
+            old_status: The status the deployment had.
+            new_status: The status the deployment has now.
+        """
+        if old_status == new_status:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            self._by_status[DeploymentStatus(old_status).value] -= 1
+            self._by_status[DeploymentStatus(new_status).value] += 1
+
+            # Time-to-ready is measured up to the first status after creating
+            if new_status != DeploymentStatus.CREATING:
+                created = self._pending.pop(deployment_id, None)
+                if created is not None and new_status == DeploymentStatus.RUNNING:
+                    self._ready_seconds += now - created
+                    self._ready_samples += 1
+
+            if new_status == DeploymentStatus.TERMINATED:
+                self._by_type[environment_type] -= 1
+                if not self._by_type[environment_type]:
+                    del self._by_type[environment_type]
+                self._deletes.append(now)
+                self._prune(self._deletes, now)
+
+    def snapshot(self) -> FleetStatsResponse:
+        """Get the current statistics.
+
+        Returns:
+            The fleet statistics response.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._prune(self._creates, now)
+            self._prune(self._deletes, now)
+
+            by_status = {status: count for status, count in self._by_status.items() if count}
+            mean_time_to_ready: Optional[float] = None
+            if self._ready_samples:
+                mean_time_to_ready = round(self._ready_seconds / self._ready_samples, 3)
+
+            return FleetStatsResponse(
+                total=sum(by_status.values()) - by_status.get(DeploymentStatus.TERMINATED.value, 0),
+                by_status=by_status,
+                by_environment_type=dict(self._by_type),
+                creates_per_minute=len(self._creates),
+                deletes_per_minute=len(self._deletes),
+                mean_time_to_ready_seconds=mean_time_to_ready,
+                ready_samples=self._ready_samples,
+            )
+
+    def _prune(self, events: Deque[float], now: float) -> None:
+        """Drop events that have left the rate window. Must hold the lock."""
+        while events and now - events[0] > RATE_WINDOW_SECONDS:
+            events.popleft()
+
+
+fleet_stats = FleetStats()
@@ -0,0 +1,322 @@
+"""
+Webhook callbacks on deployment status changes for the Overseer service.
+
+Events are written to a SQLite outbox before they are delivered, so callbacks
+that have not been acknowledged yet survive restarts of the service. All outbox
+reads and writes run on a single thread of their own, in the order they were
+made, so status changes on the event loop never wait for the disk.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, TypeVar
+
+import httpx
+
+from overseer.callback_urls import check_callback_address
+from overseer.models.deployment import DeploymentStatus
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+WEBHOOK_OUTBOX = os.getenv("OVERSEER_WEBHOOK_OUTBOX", "overseer-webhooks.db")
+WEBHOOK_CONCURRENCY = int(os.getenv("OVERSEER_WEBHOOK_CONCURRENCY", "8"))
+WEBHOOK_TIMEOUT_SECONDS = float(os.getenv("OVERSEER_WEBHOOK_TIMEOUT_SECONDS", "10"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("OVERSEER_WEBHOOK_MAX_ATTEMPTS", "10"))
+# Optional secret the request body is signed with (HMAC-SHA256)
+WEBHOOK_SECRET = os.getenv("OVERSEER_WEBHOOK_SECRET")
+
+SIGNATURE_HEADER = "X-A8s-Signature"
+
+# Retry delays grow exponentially from the base up to the maximum
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 300.0
+
+# Seconds between outbox scans when no new event wakes the dispatcher
+POLL_SECONDS = 5.0
+
+
+class WebhookDispatcher:
+    """Delivers deployment status changes to the callback URLs of their deployments.
+
+    Events are queued from any thread and delivered by an async worker with a
+    bounded number of concurrent requests. Failed deliveries are retried with
+    exponential backoff until they succeed or run out of attempts.
+    """
+
+    def __init__(
+        self,
+        outbox_path: str = WEBHOOK_OUTBOX,
+        concurrency: int = WEBHOOK_CONCURRENCY,
+        timeout: float = WEBHOOK_TIMEOUT_SECONDS,
+        max_attempts: int = WEBHOOK_MAX_ATTEMPTS,
+        secret: Optional[str] = WEBHOOK_SECRET,
+    ):
+        """Initialize the webhook dispatcher.
+
+        Args:
+            outbox_path: Path of the SQLite outbox database.
+            concurrency: Maximum number of callbacks delivered at the same time.
+            timeout: Seconds to wait for a callback response.
+            max_attempts: Number of delivery attempts before an event is dropped.
+            secret: Secret to sign request bodies with, if any.
+        """
+        self.outbox_path = outbox_path
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.secret = secret
+
+        # Deployment ID -> (callback URL, statuses to notify; None for all)
+        self._subscriptions: Dict[str, Tuple[str, Optional[Set[DeploymentStatus]]]] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._in_flight: Set[int] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # The only thread touching the outbox, which keeps events in order
+        self._outbox_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webhooks")
+
+    def subscribe(
+        self,
+        deployment_id: str,
+        url: str,
+        events: Optional[List[DeploymentStatus]] = None,
+    ) -> None:
+        """Send the status changes of a deployment to a callback URL.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            url: The callback URL.
+            events: Statuses to notify (all if not given).
+        """
+        with self._lock:
+            self._subscriptions[deployment_id] = (url, set(events) if events else None)
+
+    def subscription(
+        self, deployment_id: str
+    ) -> Optional[Tuple[str, Optional[Set[DeploymentStatus]]]]:
+        """Get the callback URL and notified statuses (None for all) of a deployment, if subscribed."""
+        with self._lock:
+            return self._subscriptions.get(deployment_id)
+
+    def copy_subscription(self, deployment_id: str, new_deployment_id: str) -> None:
+        """Send the status changes of another deployment to the same callback URL.
+
+        Args:
+            deployment_id: The ID of the subscribed deployment.
+            new_deployment_id: The ID of the deployment to subscribe as well.
+        """
+        with self._lock:
+            subscription = self._subscriptions.get(deployment_id)
+            if subscription:
+                self._subscriptions[new_deployment_id] = subscription
+
+    def notify(
+        self,
+        deployment_id: str,
+        environment_type: str,
+        previous_status: Optional[DeploymentStatus],
+        new_status: DeploymentStatus,
+        message: Optional[str] = None,
+    ) -> None:
+        """Queue a callback for a status change, if the deployment subscribed to it.
+
+        Args:
+            deployment_id: The ID of the deployment.
+            environment_type: Type of the deployed environment.
+            previous_status: The status the deployment had (None when created).
+            new_status: The status the deployment has now.
+            message: Message describing the new status.
+        """
+        with self._lock:
+            subscription = self._subscriptions.get(deployment_id)
+            # Terminated deployments never change status again
+            if new_status == DeploymentStatus.TERMINATED:
+                self._subscriptions.pop(deployment_id, None)
+        if not subscription:
+            return
+
+        url, events = subscription
+        if events is not None and new_status not in events:
+            return
+
+        payload = {
+            "event": "deployment.status",
+            "deployment_id": deployment_id,
+            "environment_type": environment_type,
+            "previous_status": previous_status.value if previous_status else None,
+            "status": new_status.value,
+            "message": message,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        self._enqueue(url, payload)
+
+    async def run(self) -> None:
+        """Deliver queued callbacks until cancelled."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        deliveries: Set[asyncio.Task] = set()
+
+        async with httpx.AsyncClient(timeout=self.timeout) as http_client:
+            try:
+                while True:
+                    self._wakeup.clear()
+                    for row in await self._in_outbox_thread(self._due, self.concurrency * 4):
+                        await semaphore.acquire()
+                        task = asyncio.create_task(self._deliver(http_client, row))
+                        task.add_done_callback(lambda _: semaphore.release())
+                        deliveries.add(task)
+                        task.add_done_callback(deliveries.discard)
+
+                    try:
+                        await asyncio.wait_for(
+                            self._wakeup.wait(), timeout=await self._in_outbox_thread(self._next_wait)
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                for task in deliveries:
+                    task.cancel()
+                await asyncio.gather(*deliveries, return_exceptions=True)
+
+    async def _in_outbox_thread(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a function on the outbox thread and wait for its result."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._outbox_executor, func, *args
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the outbox database, creating its table if needed. Must hold the lock."""
+        if self._db is None:
+            directory = os.path.dirname(self.outbox_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.outbox_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "url TEXT NOT NULL, "
+                "payload TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "next_attempt_at REAL NOT NULL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _enqueue(self, url: str, payload: Dict) -> None:
+        """Queue an event to be written to the outbox on the outbox thread."""
+        self._outbox_executor.submit(self._write, url, json.dumps(payload))
+
+    def _write(self, url: str, payload: str) -> None:
+        """Write an event to the outbox and wake the worker. Runs on the outbox thread."""
+        try:
+            with self._lock:
+                db = self._connect()
+                db.execute(
+                    "INSERT INTO outbox (url, payload, next_attempt_at) VALUES (?, ?, ?)",
+                    (url, payload, time.time()),
+                )
+                db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing callback to {url} to the outbox: {e}")
+            return
+
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _due(self, limit: int) -> List[Tuple[int, str, str, int]]:
+        """Claim events whose next delivery attempt is due."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, url, payload, attempts FROM outbox "
+                "WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (time.time(), limit + len(self._in_flight)),
+            ).fetchall()
+            rows = [row for row in rows if row[0] not in self._in_flight][:limit]
+            self._in_flight.update(row[0] for row in rows)
+        return rows
+
+    def _next_wait(self) -> float:
+        """Get the seconds until the next retry is due, at most POLL_SECONDS."""
+        with self._lock:
+            (next_attempt_at,) = self._connect().execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE attempts > 0"
+            ).fetchone()
+        if next_attempt_at is None:
+            return POLL_SECONDS
+        return min(POLL_SECONDS, max(0.0, next_attempt_at - time.time()))
+
+    def _record_attempt(
+        self, event_id: int, url: str, attempts: int, error: Optional[Exception]
+    ) -> None:
+        """Remove a delivered event from the outbox or schedule a retry. Runs on the outbox thread."""
+        with self._lock:
+            db = self._connect()
+            if error is None:
+                db.execute("DELETE FROM outbox WHERE id = ?", (event_id,))
+            elif attempts >= self.max_attempts:
+                logger.error(f"Dropping callback to {url} after {attempts} attempts: {error}")
+                db.execute("DELETE FROM outbox WHERE id = ?", (event_id,))
+            else:
+                delay = min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS)
+                delay *= random.uniform(0.5, 1.0)
+                logger.warning(f"Callback to {url} failed ({error}), retrying in {delay:.1f}s")
+                db.execute(
+                    "UPDATE outbox SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+                    (attempts, time.time() + delay, event_id),
+                )
+            db.commit()
+
+    async def _deliver(self, http_client: httpx.AsyncClient, row: Tuple[int, str, str, int]) -> None:
+        """Deliver one event and remove it from the outbox or schedule a retry."""
+        event_id, url, payload, attempts = row
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            signature = hmac.new(self.secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+            headers[SIGNATURE_HEADER] = f"sha256={signature}"
+
+        try:
+            error: Optional[Exception] = None
+            try:
+                # Checked on every attempt, the host may have been pointed elsewhere since
+                await check_callback_address(url)
+            except ValueError as e:
+                # An internal address never becomes deliverable, so it is not retried
+                attempts = self.max_attempts - 1
+                error = e
+            except Exception as e:
+                error = e
+            if error is None:
+                try:
+                    response = await http_client.post(url, content=payload, headers=headers)
+                    response.raise_for_status()
+                except Exception as e:
+                    # Anything that fails the attempt (a bad URL, an unexpected error in
+                    # the client) is retried like an HTTP error
+                    error = e
+
+            await self._in_outbox_thread(self._record_attempt, event_id, url, attempts + 1, error)
+        finally:
+            # Otherwise the event would never be picked up again
+            with self._lock:
+                self._in_flight.discard(event_id)
+
+        # Let the worker pick up the new retry time
+        if error is not None and self._wakeup is not None:
+            self._wakeup.set()
+
+
+webhook_dispatcher = WebhookDispatcher()
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+
+from overseer.api import deployments as deployments_api
+from overseer.k8s.client import ManagedDeployment
+from overseer.models.deployment import DeploymentStatus
+from overseer.quotas import QuotaManager
+from overseer.stats import FleetStats
+from overseer.webhooks import WebhookDispatcher
+
+
+class FakeK8sClient:
+    def __init__(self, managed):
+        self.managed = managed
+
+    def list_managed_deployments(self):
+        return list(self.managed)
+
+    def get_connection_details(self, deployment_id, environment_type=None):
+        return {"ingress_host": f"{deployment_id}.example.com"}
+
+
+@pytest.fixture
+def restored(monkeypatch, tmp_path):
+    quota_manager = QuotaManager()
+    fleet_stats = FleetStats()
+    dispatcher = WebhookDispatcher(outbox_path=str(tmp_path / "webhooks.db"))
+    monkeypatch.setattr(deployments_api, "quota_manager", quota_manager)
+    monkeypatch.setattr(deployments_api, "fleet_stats", fleet_stats)
+    monkeypatch.setattr(deployments_api, "webhook_dispatcher", dispatcher)
+    yield quota_manager, fleet_stats, dispatcher
+    deployments_api.deployments.clear()
+
+
+def managed(deployment_id, status, annotations):
+    return ManagedDeployment(
+        id=deployment_id,
+        environment_type="claude",
+        status=status,
+        created_at=datetime(2026, 1, 1, 12, 0),
+        annotations=annotations,
+    )
+
+
+def test_restore_deployments_from_annotations(restored):
+    quota_manager, fleet_stats, dispatcher = restored
+    k8s_client = FakeK8sClient(
+        [
+            managed(
+                "a8s-claude-1",
+                DeploymentStatus.RUNNING,
+                deployments_api.deployment_annotations(
+                    "alice",
+                    "snap-1",
+                    "https://hooks.example.com/a8s",
+                    [DeploymentStatus.RUNNING, DeploymentStatus.FAILED],
+                ),
+            ),
+            managed("a8s-claude-2", DeploymentStatus.PAUSED, {}),
+        ]
+    )
+
+    assert deployments_api.restore_deployments(k8s_client) == 2
+    # Deployments already in the store are left alone
+    assert deployments_api.restore_deployments(k8s_client) == 0
+
+    running = deployments_api.deployments["a8s-claude-1"]
+    assert running.owner == "alice"
+    assert running.from_snapshot == "snap-1"
+    assert running.created_at == "2026-01-01T12:00:00"
+    assert running.connection_details == {"ingress_host": "a8s-claude-1.example.com"}
+    assert dispatcher.subscription("a8s-claude-1") == (
+        "https://hooks.example.com/a8s",
+        {DeploymentStatus.RUNNING, DeploymentStatus.FAILED},
+    )
+
+    paused = deployments_api.deployments["a8s-claude-2"]
+    assert paused.owner == "default"
+    assert paused.connection_details is None
+    assert dispatcher.subscription("a8s-claude-2") is None
+
+    # Both count against their owners, the paused one without its resources
+    assert quota_manager.usage("alice") == (1, 0.5, 1024**3)
+    assert quota_manager.usage("default") == (1, 0.0, 0.0)
+    stats = fleet_stats.snapshot()
+    assert stats.by_status == {"running": 1, "paused": 1}
@@ -0,0 +1,158 @@
+import copy
+import itertools
+
+import pytest
+from kubernetes.client import ApiException
+
+from overseer.k8s.ingress import IngressRouting, SharedIngressManager
+
+
+class FakeNetworkingApi:
+    """Stores Ingress objects like the API server, with resource versions."""
+
+    def __init__(self):
+        self.objects = {}
+        self.versions = itertools.count(1)
+        self.writes = 0
+        # Called before every write, to simulate other writers or failures
+        self.before_write = None
+
+    def read_namespaced_ingress(self, name, namespace):
+        if name not in self.objects:
+            raise ApiException(status=404)
+        return copy.deepcopy(self.objects[name])
+
+    def create_namespaced_ingress(self, namespace, body):
+        self._before_write()
+        if body.metadata.name in self.objects:
+            raise ApiException(status=409)
+        self._store(body)
+
+    def replace_namespaced_ingress(self, name, namespace, body):
+        self._before_write()
+        if name not in self.objects:
+            raise ApiException(status=404)
+        if body.metadata.resource_version != self.objects[name].metadata.resource_version:
+            raise ApiException(status=409)
+        self._store(body)
+
+    def delete_namespaced_ingress(self, name, namespace, body):
+        self._before_write()
+        if name not in self.objects:
+            raise ApiException(status=404)
+        expected = body.preconditions.resource_version
+        if expected != self.objects[name].metadata.resource_version:
+            raise ApiException(status=409)
+        del self.objects[name]
+
+    def _before_write(self):
+        if self.before_write:
+            self.before_write()
+
+    def _store(self, body):
+        self.writes += 1
+        body = copy.deepcopy(body)
+        body.metadata.resource_version = str(next(self.versions))
+        self.objects[body.metadata.name] = body
+
+
+def manager(api, **kwargs):
+    # The tests flush by hand, the timer never fires
+    return SharedIngressManager(
+        api, "a8s", "example.com", flush_interval=3600, **kwargs
+    )
+
+
+def routes(ingress_manager, shard=0):
+    return ingress_manager._read_routes(ingress_manager.ingress_name(shard))[0]
+
+
+@pytest.mark.parametrize("routing", [IngressRouting.HOST, IngressRouting.PATH])
+def test_read_routes_round_trip(routing):
+    api = FakeNetworkingApi()
+    first = manager(api, routing=routing)
+    first.add_route("a8s-claude-1")
+    first.add_route("a8s-claude-2", "other-service", 8080)
+    first.flush()
+
+    assert routes(first) == {
+        "a8s-claude-1": ("a8s-claude-1", 6080),
+        "a8s-claude-2": ("other-service", 8080),
+    }
+
+
+def test_writers_keep_each_others_routes():
+    api = FakeNetworkingApi()
+    first, second = manager(api), manager(api)
+    first.add_route("a8s-claude-1")
+    second.add_route("a8s-claude-2")
+    first.flush()
+    second.flush()
+
+    assert set(routes(first)) == {"a8s-claude-1", "a8s-claude-2"}
+
+    second.remove_route("a8s-claude-1")
+    second.flush()
+    assert set(routes(first)) == {"a8s-claude-2"}
+
+
+def test_concurrent_write_is_retried_on_the_new_version():
+    api = FakeNetworkingApi()
+    first, second = manager(api), manager(api)
+    first.add_route("a8s-claude-1")
+    first.flush()
+
+    # Another replica writes between the read and the write of the first one
+    def other_writer():
+        api.before_write = None
+        second.add_route("a8s-claude-2")
+        second.flush()
+
+    api.before_write = other_writer
+    first.add_route("a8s-claude-3")
+    first.flush()
+
+    assert set(routes(first)) == {"a8s-claude-1", "a8s-claude-2", "a8s-claude-3"}
+
+
+def test_removing_the_last_route_deletes_the_ingress():
+    api = FakeNetworkingApi()
+    ingress_manager = manager(api)
+    ingress_manager.add_route("a8s-claude-1")
+    ingress_manager.flush()
+    ingress_manager.remove_route("a8s-claude-1")
+    ingress_manager.flush()
+
+    assert api.objects == {}
+
+
+@pytest.mark.parametrize("error", [ApiException(status=500), ConnectionError("reset")])
+def test_failed_changes_are_queued_again(error):
+    api = FakeNetworkingApi()
+    ingress_manager = manager(api)
+    ingress_manager.add_route("a8s-claude-1")
+    ingress_manager.add_route("a8s-claude-2")
+
+    def fail():
+        raise error
+
+    api.before_write = fail
+    ingress_manager.flush()
+    assert api.objects == {}
+
+    # A change queued after the failed flush wins over the failed one
+    ingress_manager.remove_route("a8s-claude-2")
+    api.before_write = None
+    ingress_manager.flush()
+
+    assert set(routes(ingress_manager)) == {"a8s-claude-1"}
+
+
+def test_close_writes_queued_changes():
+    api = FakeNetworkingApi()
+    ingress_manager = manager(api)
+    ingress_manager.add_route("a8s-claude-1")
+    ingress_manager.close()
+
+    assert set(routes(ingress_manager)) == {"a8s-claude-1"}
+    assert ingress_manager._timer is None
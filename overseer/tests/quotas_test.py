@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from overseer.api import deployments as deployments_api
+from overseer.models.deployment import DeploymentStatus
+from overseer.quotas import FairShareAdmission, Quota, QuotaExceeded, QuotaManager
+
+GiB = 1024**3
+
+
+class FakeK8sClient:
+    def __init__(self, error=None):
+        self.error = error
+
+    def create_deployment(self, **kwargs):
+        if self.error:
+            raise self.error
+        return "a8s-claude-1", {}
+
+
+@pytest.fixture
+def quota_manager(monkeypatch):
+    quota_manager = QuotaManager({"alice": Quota(deployments=1), "*": Quota(cpu="1")})
+    monkeypatch.setattr(deployments_api, "quota_manager", quota_manager)
+    yield quota_manager
+    deployments_api.deployments.clear()
+
+
+def api(k8s_client):
+    app = FastAPI()
+    app.include_router(deployments_api.router)
+    app.dependency_overrides[deployments_api.get_k8s_client] = lambda: k8s_client
+    return TestClient(app)
+
+
+def create(client, owner):
+    return client.post(
+        "/deployments",
+        json={"environment_type": "claude", "requirement": "Say hi", "owner": owner},
+    )
+
+
+def test_over_quota_is_rejected(quota_manager):
+    quota_manager.reserve("alice", 0.5, GiB)
+    quota_manager.created("a8s-claude-1", "alice", 0.5, GiB)
+    with pytest.raises(QuotaExceeded):
+        quota_manager.reserve("alice", 0.5, GiB)
+
+    # Other owners fall back to the "*" quota, which limits CPU
+    quota_manager.reserve("bob", 0.5, GiB)
+    quota_manager.reserve("bob", 0.5, GiB)
+    with pytest.raises(QuotaExceeded):
+        quota_manager.reserve("bob", 0.5, GiB)
+
+    # Paused deployments give back their resources, but still count as deployments
+    quota_manager.created("a8s-claude-2", "bob", 0.5, GiB)
+    quota_manager.transition("a8s-claude-2", DeploymentStatus.PAUSED)
+    quota_manager.reserve("bob", 0.5, GiB)
+
+
+def test_over_quota_create_is_rejected_with_429(quota_manager):
+    client = api(FakeK8sClient())
+    assert create(client, "alice").status_code == 201
+    response = create(client, "alice")
+    assert response.status_code == 429
+    assert "Quota of 'alice' exceeded" in response.json()["detail"]
+
+
+def test_failed_create_cancels_the_reservation(quota_manager):
+    response = create(api(FakeK8sClient(RuntimeError("cluster unreachable"))), "alice")
+    assert response.status_code == 500
+    assert quota_manager.usage("alice") == (0, 0.0, 0.0)
+
+    # The reservation no longer counts against the quota
+    assert create(api(FakeK8sClient()), "alice").status_code == 201
+    assert quota_manager.usage("alice")[0] == 1
+
+
+def test_migration_transfers_the_holding(quota_manager):
+    quota_manager.reserve("alice", 0.5, GiB)
+    quota_manager.created("a8s-claude-1", "alice", 0.5, GiB)
+    quota_manager.transfer("a8s-claude-1", "a8s-claude-2")
+
+    # Terminating the original no longer frees anything, the replacement holds it
+    quota_manager.transition("a8s-claude-1", DeploymentStatus.TERMINATED)
+    assert quota_manager.usage("alice") == (1, 0.5, GiB)
+    quota_manager.transition("a8s-claude-2", DeploymentStatus.TERMINATED)
+    assert quota_manager.usage("alice") == (0, 0.0, 0.0)
+
+
+def test_admission_is_round_robin_across_owners():
+    async def run():
+        admission = FairShareAdmission(max_concurrent=1)
+        admitted = []
+        release = asyncio.Event()
+
+        async def request(owner, index):
+            async with admission.admit(owner, timeout=5):
+                admitted.append(f"{owner}-{index}")
+                if not release.is_set():
+                    await release.wait()
+
+        holder = asyncio.create_task(request("holder", 0))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(request("alice", index)) for index in range(3)]
+        waiters.append(asyncio.create_task(request("bob", 0)))
+        await asyncio.sleep(0)
+        assert admission.queued == 4
+
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return admitted
+
+    # Bob's single request does not wait for all of Alice's
+    assert asyncio.run(run()) == ["holder-0", "alice-0", "bob-0", "alice-1", "alice-2"]
@@ -0,0 +1,88 @@
+from unittest import mock
+
+import pytest
+from pydantic import ValidationError
+
+from overseer.k8s.shards import MAX_SHARD_NAME_LENGTH, ShardConfig, ShardedKubernetesClient
+from overseer.models.deployment import DeploymentStatus
+
+
+class FakeShard:
+    """Keeps the deployments of a shard in a dictionary instead of a cluster."""
+
+    def __init__(self, namespace, context, shard_name, base_domain):
+        self.namespace = namespace
+        self.context = context
+        self.shard_name = shard_name
+        self.statuses = {}
+        self.fail_create = False
+
+    def count_deployments(self):
+        return len(self.statuses)
+
+    def list_deployment_statuses(self):
+        return dict(self.statuses)
+
+    def create_deployment(self, **kwargs):
+        if self.fail_create:
+            raise RuntimeError("create failed")
+        deployment_id = f"a8s-claude-{len(self.statuses)}--{self.shard_name}"
+        self.statuses[deployment_id] = DeploymentStatus.CREATING
+        return deployment_id, {}
+
+    def delete_deployment(self, deployment_id):
+        return self.statuses.pop(deployment_id, None) is not None
+
+
+@pytest.fixture
+def sharded():
+    with mock.patch("overseer.k8s.shards.KubernetesClient", FakeShard):
+        yield ShardedKubernetesClient(
+            [ShardConfig(name="east", capacity=2), ShardConfig(name="west", capacity=2)]
+        )
+
+
+def test_created_deployments_count_until_listed(sharded):
+    sharded.create_deployment()
+    sharded.create_deployment()
+    assert sharded.load == {"east": 1, "west": 1}
+
+    sharded.list_deployment_statuses()
+    assert sharded.load == {"east": 1, "west": 1}
+
+
+def test_listing_frees_slots_of_deleted_deployments(sharded):
+    for _ in range(4):
+        sharded.create_deployment()
+    assert sharded.load == {"east": 2, "west": 2}
+
+    # Deleted through Overseer, and removed from the cluster behind its back
+    deployment_id = next(iter(sharded.shards["east"].statuses))
+    sharded.delete_deployment(deployment_id)
+    sharded.shards["west"].statuses.clear()
+    sharded.list_deployment_statuses()
+
+    assert sharded.load == {"east": 1, "west": 0}
+    assert sharded.place() == "west"
+
+
+def test_failed_create_releases_its_slot(sharded):
+    sharded.shards["east"].fail_create = True
+    with pytest.raises(RuntimeError):
+        sharded.create_deployment()
+    assert sharded.load == {"east": 0, "west": 0}
+
+
+def test_listing_keeps_deployments_being_created(sharded):
+    assert sharded.place() == "east"
+    sharded.list_deployment_statuses()
+    assert sharded.load["east"] == 1
+
+    sharded.release("east")
+    assert sharded.load["east"] == 0
+
+
+def test_shard_name_length_is_limited():
+    ShardConfig(name="a" * MAX_SHARD_NAME_LENGTH)
+    with pytest.raises(ValidationError):
+        ShardConfig(name="a" * (MAX_SHARD_NAME_LENGTH + 1))
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from overseer.api import deployments as deployments_api
+from overseer.controllers import status as status_controller
+from overseer.controllers.status import StatusController
+from overseer.models.deployment import DeploymentResponse, DeploymentStatus
+
+
+class FakeK8sClient:
+    def __init__(self):
+        self.statuses = {}
+        self.failing_deletes = 0
+        self.deleted = []
+
+    def list_deployment_statuses(self):
+        return dict(self.statuses)
+
+    def get_deployment_status(self, deployment_id):
+        return self.statuses[deployment_id]
+
+    def delete_deployment(self, deployment_id):
+        if self.failing_deletes:
+            self.failing_deletes -= 1
+            raise RuntimeError("API server unavailable")
+        self.deleted.append(deployment_id)
+        return self.statuses.pop(deployment_id, None) is not None
+
+
+@pytest.fixture
+def k8s_client(monkeypatch):
+    k8s_client = FakeK8sClient()
+    monkeypatch.setattr(status_controller, "get_k8s_client", lambda: k8s_client)
+    yield k8s_client
+    deployments_api.deployments.clear()
+
+
+def test_failed_delete_of_migrated_deployment_is_retried(k8s_client):
+    # The original of a migration whose delete failed after the switch
+    k8s_client.statuses["a8s-claude-1"] = DeploymentStatus.RUNNING
+    k8s_client.failing_deletes = 1
+    original = DeploymentResponse(
+        id="a8s-claude-1",
+        status=DeploymentStatus.TERMINATING,
+        environment_type="claude",
+        created_at="2026-01-01T00:00:00",
+        replaced_by="a8s-claude-2",
+    )
+    deployments_api.deployments[original.id] = original
+
+    # Reads do not take it back to running while it is still being deleted
+    deployments_api.refresh_deployment(original, k8s_client)
+    controller = StatusController()
+    asyncio.run(controller.sync_once())
+    assert original.status == DeploymentStatus.TERMINATING
+
+    asyncio.run(controller.sync_once())
+    assert original.status == DeploymentStatus.TERMINATED
+    assert original.message == "Migrated to a8s-claude-2"
+    assert k8s_client.deleted == ["a8s-claude-1"]
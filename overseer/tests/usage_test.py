@@ -0,0 +1,55 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from overseer.api.deployments import deployments
+from overseer.controllers.usage import UsageCollector
+from overseer.models.deployment import DeploymentResponse, DeploymentStatus
+
+
+class FakeK8sClient:
+    def __init__(self):
+        self.metrics = {}
+
+    def list_pod_metrics(self):
+        return dict(self.metrics)
+
+
+@pytest.fixture
+def k8s_client():
+    k8s_client = FakeK8sClient()
+    with mock.patch("overseer.controllers.usage.get_k8s_client", return_value=k8s_client):
+        yield k8s_client
+    deployments.clear()
+
+
+def store(deployment_id, status):
+    deployments[deployment_id] = DeploymentResponse(
+        id=deployment_id,
+        status=status,
+        environment_type="unknown",
+        created_at="2026-01-01T00:00:00",
+    )
+
+
+def test_paused_deployment_reports_no_usage(k8s_client):
+    collector = UsageCollector(window=300)
+    store("a8s-claude-1", DeploymentStatus.RUNNING)
+    k8s_client.metrics = {"a8s-claude-1": (0.5, 1024)}
+    asyncio.run(collector.refresh())
+    assert collector.usage("a8s-claude-1").cpu_cores == 0.5
+
+    # Reported as empty right away, and the samples are dropped on the next refresh
+    deployments["a8s-claude-1"].status = DeploymentStatus.PAUSED
+    assert collector.usage("a8s-claude-1").samples == 0
+    k8s_client.metrics = {}
+    asyncio.run(collector.refresh())
+
+    # A resumed deployment starts a new window
+    deployments["a8s-claude-1"].status = DeploymentStatus.RUNNING
+    k8s_client.metrics = {"a8s-claude-1": (0.25, 512)}
+    asyncio.run(collector.refresh())
+    usage = collector.usage("a8s-claude-1")
+    assert usage.samples == 1
+    assert usage.cpu_max_cores == 0.25
@@ -0,0 +1,58 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+
+from overseer.callback_urls import check_callback_address, check_callback_url
+from overseer.models.deployment import DeploymentStatus
+from overseer.webhooks import WebhookDispatcher
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://169.254.169.254/latest/meta-data/",
+        "http://127.0.0.1:8000/",
+        "http://10.0.0.12/hook",
+        "http://[::1]/hook",
+        "http://[::ffff:10.0.0.1]/hook",
+        "http://localhost/hook",
+        "http://overseer:8000/hook",
+        "http://kubernetes.default.svc/api",
+        "http://api.a8s.svc.cluster.local/hook",
+        "http://metadata.google.internal/",
+        "ftp://example.com/hook",
+    ],
+)
+def test_internal_callback_urls_are_rejected(url):
+    with pytest.raises(ValueError):
+        check_callback_url(url)
+
+
+def test_public_and_allowed_callback_urls_are_accepted():
+    assert check_callback_url("https://hooks.example.com/a8s") == "https://hooks.example.com/a8s"
+    with mock.patch("overseer.callback_urls.CALLBACK_ALLOWED_HOSTS", {"receiver.a8s.svc"}):
+        check_callback_url("http://receiver.a8s.svc/hook")
+
+
+def test_callback_host_resolving_to_internal_address_is_rejected():
+    async def resolve(host, port):
+        return [(None, None, None, "", ("10.1.2.3", port))]
+
+    async def check():
+        with mock.patch.object(asyncio.get_running_loop(), "getaddrinfo", side_effect=resolve):
+            await check_callback_address("https://hooks.example.com/a8s")
+
+    with pytest.raises(ValueError):
+        asyncio.run(check())
+
+
+def test_events_are_written_in_order_off_the_caller(tmp_path):
+    dispatcher = WebhookDispatcher(outbox_path=str(tmp_path / "data" / "webhooks.db"))
+    dispatcher.subscribe("a8s-claude-1", "https://hooks.example.com/a8s")
+    for status in (DeploymentStatus.CREATING, DeploymentStatus.RUNNING, DeploymentStatus.PAUSED):
+        dispatcher.notify("a8s-claude-1", "claude", None, status)
+
+    rows = dispatcher._outbox_executor.submit(dispatcher._due, 10).result()
+    assert [json.loads(row[2])["status"] for row in rows] == ["creating", "running", "paused"]